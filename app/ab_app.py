@@ -4,15 +4,30 @@ Interactive A/B Test Analyzer - Streamlit App
 This Streamlit application provides an interactive interface for analyzing A/B test results.
 Users can input test data and get real-time statistical analysis.
 Fully implements the UI/UX system specification from specs/ui-system/
+
+Expensive work is cached with st.cache_data and the power card runs as an
+st.fragment, so moving the MDE slider only re-runs that card and changing
+alpha never re-reads an uploaded file. Slow analyses (bootstrap) run on a
+background JobRunner (see jobs.py) and report progress from a polling fragment.
+Row-level uploads with a timestamp column also get a cumulative lift chart,
+and their daily traffic feeds the duration forecast.
+
+Set ABTEST_INSTRUMENT=1 to record loader/statistics spans and full-page
+render time; they are served in Prometheus format on ABTEST_METRICS_PORT
+(default 9464) at /metrics.
 """
 
 import sys
 import os
+import time
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
+import numpy as np
 import streamlit as st
-from abtest import ztest_two_prop, power, load_aggregated_data, load_row_level_data
-import pandas as pd
+from abtest import ztest_two_prop, power, bootstrap_lift_ci, load_counts, instrument, parse_size, srm_test
+from abtest import analyze_timeseries, forecast_duration, load_timeseries
+from abtest.batch import SRM_ALPHA
+from jobs import JobRunner
 
 st.set_page_config(
     page_title="A/B Test Analyzer",
@@ -20,9 +35,8 @@ st.set_page_config(
     layout="wide"
 )
 
-# Inject complete Bosk8 design system from style.md and specifications
-st.markdown(
-    """
+# Complete Bosk8 design system from style.md and specifications
+DESIGN_SYSTEM_CSS = """
     <style>
     /* CSS Variables - Complete Token Map from style.md */
     :root {
@@ -270,9 +284,312 @@ st.markdown(
       color: var(--text-muted);
     }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+
+@st.cache_resource
+def start_metrics_server():
+    """Serve the instrument registry once per Streamlit server process."""
+    return instrument.serve_metrics(port=int(os.environ.get('ABTEST_METRICS_PORT', 9464)))
+
+
+@st.cache_data(show_spinner=False)
+def cached_ztest(success_a, total_a, success_b, total_b, alpha):
+    """Cached wrapper around ztest_two_prop keyed on the input counts and alpha."""
+    return ztest_two_prop(success_a, total_a, success_b, total_b, alpha=alpha)
+
+
+@st.cache_data(show_spinner=False)
+def cached_srm(total_a, total_b, share_b):
+    """Cached sample ratio mismatch check against the designed share of B (in %)."""
+    return srm_test((total_a, total_b), allocation=(100 - share_b, share_b))
+
+
+@st.cache_data(show_spinner=False)
+def cached_power(total_a, total_b, p_control, mde, alpha):
+    """Cached wrapper around power keyed on sample sizes, baseline, MDE and alpha."""
+    return power(total_a, total_b, p_control, min_detectable_diff=mde, alpha=alpha)
+
+
+# Row-level uploads are streamed within this memory budget (e.g. "512MB"), with
+# chunk sizes chosen to fit unless ABTEST_UPLOAD_CHUNKSIZE fixes them
+UPLOAD_MAX_MEMORY = parse_size(os.environ.get('ABTEST_UPLOAD_MAX_MEMORY', '512MiB'))
+UPLOAD_CHUNKSIZE = int(os.environ['ABTEST_UPLOAD_CHUNKSIZE']) if os.environ.get('ABTEST_UPLOAD_CHUNKSIZE') else None
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_uploaded_counts(file_id, _uploaded_file):
+    """
+    Load (success_a, total_a, success_b, total_b) from an uploaded CSV.
+
+    Keyed on the upload's file_id so the file is parsed once per upload rather
+    than on every script run. The upload buffer is read in place: no copy of
+    its bytes is made, and row-level files are streamed through the chunked
+    aggregator so the whole DataFrame is never materialized.
+    """
+    _uploaded_file.seek(0)
+    return load_counts(_uploaded_file, chunksize=UPLOAD_CHUNKSIZE, max_memory=UPLOAD_MAX_MEMORY)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_uploaded_timeseries(file_id, _uploaded_file, freq):
+    """
+    Per-period counts of a row-level upload with a timestamp column, or None.
+
+    Keyed on the upload's file_id and the bin width; streamed within the same
+    budget as load_uploaded_counts.
+    """
+    _uploaded_file.seek(0)
+    header = _uploaded_file.readline().decode('utf-8-sig').strip().split(',')
+    if not {'group', 'converted', 'timestamp'} <= set(header):
+        return None
+    _uploaded_file.seek(0)
+    return load_timeseries(_uploaded_file, freq=freq, chunksize=UPLOAD_CHUNKSIZE, max_memory=UPLOAD_MAX_MEMORY)
+
+
+def on_upload():
+    """
+    File uploader callback: load counts into session state.
+
+    Runs before the script body, so the count widgets can still be updated and
+    the file is only read when the upload actually changes.
+    """
+    uploaded_file = st.session_state.get('uploaded_file')
+    st.session_state.upload_error = None
+    if uploaded_file is None:
+        st.session_state.file_loaded = None
+        return
+    try:
+        sa, ta, sb, tb = load_uploaded_counts(uploaded_file.file_id, uploaded_file)
+    except Exception as e:
+        st.session_state.upload_error = str(e)
+        return
+    st.session_state.success_a = sa
+    st.session_state.success_b = sb
+    st.session_state.total_a = ta
+    st.session_state.total_b = tb
+    st.session_state.file_loaded = uploaded_file.name
+
+
+@st.fragment
+def power_card(total_a, total_b, p_control, alpha):
+    """Power analysis card; the MDE slider lives here so it only re-runs this card."""
+    st.markdown("<div class=\"card\">", unsafe_allow_html=True)
+    st.markdown("<div class=\"meta-sm\">POWER ANALYSIS</div>", unsafe_allow_html=True)
+    mde_for_power = st.slider(
+        "MDE for power calculation (pp)",
+        min_value=0.1,
+        max_value=10.0,
+        value=2.0,
+        step=0.1,
+        key="mde_pp",
+        help="Minimum detectable effect for power analysis in percentage points"
+    ) / 100
+    current_power = cached_power(total_a, total_b, p_control, mde_for_power, alpha)
+    st.metric(
+        f"Power to detect {mde_for_power*100:.1f}pp difference",
+        f"{current_power:.1%}",
+        delta=None
+    )
+    
+    if current_power < 0.8:
+        st.markdown(
+            f'<div class="alert" role="status">⚠️ Power is below the recommended 80% threshold. Consider increasing sample sizes.</div>',
+            unsafe_allow_html=True,
+        )
+    else:
+        st.markdown(
+            f'<div class="alert" style="color: var(--accent-success);" role="status">✅ Power is sufficient (≥80%) for detecting a {mde_for_power*100:.1f}pp difference.</div>',
+            unsafe_allow_html=True,
+        )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# Allocations (share of traffic in B, %) offered by the duration forecast
+FORECAST_SHARES = [50, 60, 70, 80, 90]
+
+
+@st.fragment
+def duration_card(p_control, alpha):
+    """Duration forecast card; its inputs only re-run this card."""
+    st.markdown("<div class=\"card\">", unsafe_allow_html=True)
+    st.markdown("<div class=\"meta-sm\">DURATION FORECAST</div>", unsafe_allow_html=True)
+    
+    # Daily traffic of a timestamped upload, else a constant rate
+    uploaded_file = st.session_state.get('uploaded_file')
+    periods = None
+    if uploaded_file is not None and st.session_state.get('file_loaded'):
+        try:
+            periods = load_uploaded_timeseries(uploaded_file.file_id, uploaded_file, '1D')
+        except (ValueError, MemoryError):
+            periods = None
+    if periods is not None:
+        traffic = (periods['total_a'] + periods['total_b']).to_numpy()
+        source = f"daily traffic of {st.session_state.file_loaded} ({len(traffic)} days, repeated to fill the horizon)"
+    else:
+        traffic = [st.number_input("Users per day", min_value=1, value=1000, step=100, key="forecast_traffic")]
+        source = "a constant daily traffic"
+    
+    mde_range = st.slider("MDE range (pp)", min_value=0.1, max_value=10.0, value=(0.5, 3.0), step=0.1,
+                          key="forecast_mde")
+    shares = st.multiselect("Share in B (%)", FORECAST_SHARES, default=[50, 70, 90], key="forecast_shares")
+    target_power = st.slider("Target power", min_value=0.5, max_value=0.99, value=0.8, step=0.01,
+                             key="forecast_power")
+    horizon = st.number_input("Horizon (days)", min_value=7, max_value=730, value=90, step=7, key="forecast_horizon")
+    
+    mde = np.round(np.arange(mde_range[0], mde_range[1] + 1e-9, 0.1), 1)
+    try:
+        if not shares:
+            raise ValueError("select at least one allocation")
+        forecast = forecast_duration(traffic, p_control, mde / 100, np.array(shares) / 100, alpha=alpha,
+                                     target_power=target_power, horizon=int(horizon))
+    except ValueError as e:
+        st.markdown(f'<div class="alert" role="status">⚠️ Cannot forecast: {e}</div>', unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+    
+    forecast['MDE (pp)'] = np.round(forecast['mde'] * 100, 1)
+    forecast['split'] = [f"{100 - s:.0f}/{s:.0f}" for s in forecast['share_b'] * 100]
+    days = forecast.pivot(index='MDE (pp)', columns='split', values='days').astype(float)
+    st.line_chart(days, x_label="MDE (pp)", y_label=f"Days to {target_power:.0%} power")
+    unreached = int(forecast['days'].isna().sum())
+    note = f" {unreached} scenario(s) need more than {int(horizon)} days and are left out." if unreached else ""
+    st.markdown(
+        f"<div style=\"color: var(--text-subtle); font-size: 0.875rem;\">Based on {source}, the control rate "
+        f"of {p_control:.2%} and α = {alpha:.2f}.{note}</div>",
+        unsafe_allow_html=True,
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# Bin widths offered for the cumulative lift chart
+TIMESERIES_FREQS = {'1D': 'Daily', '1h': 'Hourly'}
+
+
+@st.fragment
+def timeseries_card(alpha):
+    """Cumulative lift over time for timestamped uploads; the bin selector only re-runs this card."""
+    uploaded_file = st.session_state.get('uploaded_file')
+    if uploaded_file is None or not st.session_state.get('file_loaded'):
+        return
+    freq = st.session_state.get('timeseries_freq', '1D')
+    try:
+        periods = load_uploaded_timeseries(uploaded_file.file_id, uploaded_file, freq)
+    except (ValueError, MemoryError) as e:
+        st.markdown(
+            f"<div class=\"alert alert-error\" role=\"alert\">❌ Error loading timestamps: {e}</div>",
+            unsafe_allow_html=True,
+        )
+        return
+    if periods is None:
+        return
+    
+    st.markdown("<div class=\"card\">", unsafe_allow_html=True)
+    st.markdown("<div class=\"meta-sm\">CUMULATIVE LIFT OVER TIME</div>", unsafe_allow_html=True)
+    st.radio("Bin size", list(TIMESERIES_FREQS), format_func=TIMESERIES_FREQS.get, key="timeseries_freq",
+             horizontal=True)
+    series = analyze_timeseries(periods, alpha=alpha).set_index('period')
+    st.line_chart(series[['lift', 'ci_lower', 'ci_upper']] * 100, x_label="End of period (UTC)",
+                  y_label="Cumulative lift (pp)")
+    st.markdown(
+        f"<div style=\"color: var(--text-subtle); font-size: 0.875rem;\">Each point uses all data up to the end of "
+        f"that period, with its {1 - alpha:.0%} confidence interval. Stopping as soon as a point looks significant "
+        f"is sequential peeking; decide at the planned end of the test.</div>",
+        unsafe_allow_html=True,
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.cache_resource
+def get_job_runner():
+    """Process-wide background runner shared by all sessions."""
+    return JobRunner(max_workers=2)
+
+
+def render_bootstrap_job(runner, job_args, job_kwargs):
+    """Progress/result view for a bootstrap job; polled while the job is running."""
+    # Look the job up on every run: a fragment replays its original arguments,
+    # so a Job passed in would go stale after "Run again"
+    job = runner.lookup(bootstrap_lift_ci, *job_args, **job_kwargs)
+    if job is None:
+        # Evicted from the runner's cache by other sessions' jobs: run it
+        # again and refresh the card so it watches and polls the new job
+        runner.submit(bootstrap_lift_ci, *job_args, **job_kwargs)
+        st.rerun()
+    if job.status in ("pending", "running"):
+        st.progress(job.progress, text=f"Resampling… {job.progress:.0%}")
+        if st.button("Cancel", key="bootstrap_cancel"):
+            job.cancel()
+    elif job.status == "done":
+        ci = job.result['ci']
+        st.markdown(
+            f"""
+            <div style="
+                font-family: var(--font-ui);
+                font-size: var(--fs-base);
+                color: var(--text-primary);
+                background-color: var(--surface-card);
+                padding: var(--space-1);
+                border: var(--border-w) solid var(--border-color);
+                border-radius: var(--r-sm);
+            ">
+            <strong>{ci[0]:.6f}</strong> to <strong>{ci[1]:.6f}</strong><br>
+            ({ci[0]*100:+.3f} pp to {ci[1]*100:+.3f} pp, {job.result['n_resamples']:,} resamples)
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    else:
+        message = "Bootstrap cancelled." if job.status == "cancelled" else f"Bootstrap failed: {job.error}"
+        st.markdown(f'<div class="alert" role="status">⚠️ {message}</div>', unsafe_allow_html=True)
+        if st.button("Run again", key="bootstrap_rerun"):
+            runner.submit(bootstrap_lift_ci, *job_args, **job_kwargs)
+            # Full rerun so the card watches and polls the new job
+            st.rerun()
+    
+    # Once the job settles, refresh the whole card so polling stops
+    if job.done and st.session_state.get('bootstrap_polling'):
+        st.session_state.bootstrap_polling = False
+        st.rerun()
+
+
+@st.fragment
+def bootstrap_card(success_a, total_a, success_b, total_b, alpha):
+    """Bootstrap CI card; the resampling runs in the background and never blocks other cards."""
+    st.markdown("<div class=\"card\">", unsafe_allow_html=True)
+    st.markdown(f"<div class=\"meta-sm\">{1 - alpha:.0%} BOOTSTRAP CONFIDENCE INTERVAL</div>", unsafe_allow_html=True)
+    n_resamples = st.select_slider(
+        "Bootstrap resamples",
+        options=[10_000, 100_000, 1_000_000, 10_000_000],
+        value=100_000,
+        key="n_resamples",
+        help="More resamples give a more stable interval but take longer"
+    )
+    runner = get_job_runner()
+    job_args = (success_a, total_a, success_b, total_b)
+    job_kwargs = {'alpha': alpha, 'n_resamples': n_resamples, 'seed': 0}
+    job = runner.lookup(bootstrap_lift_ci, *job_args, **job_kwargs)
+    if job is None:
+        job = runner.submit(bootstrap_lift_ci, *job_args, **job_kwargs)
+    previous = st.session_state.get('bootstrap_job')
+    if previous is not job:
+        # Inputs changed or the job was rerun: release the old job, which is
+        # cancelled if no other session with the same inputs still shows it,
+        # so abandoned runs don't hold the pool's workers
+        runner.watch(job)
+        if previous is not None:
+            runner.release(previous)
+        st.session_state.bootstrap_job = job
+    st.session_state.bootstrap_polling = not job.done
+    st.fragment(render_bootstrap_job, run_every=None if job.done else 0.5)(runner, job_args, job_kwargs)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+if instrument.enabled():
+    start_metrics_server()
+render_start = time.perf_counter()
+
+st.markdown(DESIGN_SYSTEM_CSS, unsafe_allow_html=True)
 
 # Start container
 st.markdown("<div class=\"bosk8-container\">", unsafe_allow_html=True)
@@ -294,13 +611,16 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# Default counts (uploads overwrite these from the on_upload callback)
+for key, default in (('success_a', 123), ('total_a', 5000), ('success_b', 155), ('total_b', 5000)):
+    st.session_state.setdefault(key, default)
+
 # Sidebar for inputs
 with st.sidebar:
     st.markdown("<div class=\"meta-sm\">VARIANT A (CONTROL)</div>", unsafe_allow_html=True)
     success_a = st.number_input(
         "Successes (conversions)",
         min_value=0,
-        value=st.session_state.get('success_a', 123),
         step=1,
         key="success_a",
         help="Number of successful conversions in variant A"
@@ -308,7 +628,6 @@ with st.sidebar:
     total_a = st.number_input(
         "Total observations",
         min_value=1,
-        value=st.session_state.get('total_a', 5000),
         step=1,
         key="total_a",
         help="Total number of observations in variant A"
@@ -318,7 +637,6 @@ with st.sidebar:
     success_b = st.number_input(
         "Successes (conversions)",
         min_value=0,
-        value=st.session_state.get('success_b', 155),
         step=1,
         key="success_b",
         help="Number of successful conversions in variant B"
@@ -326,7 +644,6 @@ with st.sidebar:
     total_b = st.number_input(
         "Total observations",
         min_value=1,
-        value=st.session_state.get('total_b', 5000),
         step=1,
         key="total_b",
         help="Total number of observations in variant B"
@@ -342,81 +659,32 @@ with st.sidebar:
         help="Significance level for statistical test"
     )
     st.markdown(f"<div style=\"color: var(--text-subtle); font-size: 0.875rem; margin-bottom: var(--space-1);\">α = {alpha:.2f}</div>", unsafe_allow_html=True)
-    
-    mde_for_power = st.slider(
-        "MDE for power calculation (pp)",
-        min_value=0.1,
-        max_value=10.0,
-        value=2.0,
-        step=0.1,
-        help="Minimum detectable effect for power analysis in percentage points"
-    ) / 100
-    st.markdown(f"<div style=\"color: var(--text-subtle); font-size: 0.875rem; margin-bottom: var(--space-1_5);\">MDE = {mde_for_power*100:.1f} pp</div>", unsafe_allow_html=True)
+    share_b = st.number_input(
+        "Designed share in B (%)",
+        min_value=1.0,
+        max_value=99.0,
+        value=50.0,
+        step=1.0,
+        help="Traffic allocation the experiment was configured with; used for the sample ratio mismatch check"
+    )
     
     # CSV Upload
     st.markdown("<div class=\"meta-sm\" style=\"margin-top: var(--space-1_5);\">DATA UPLOAD</div>", unsafe_allow_html=True)
-    uploaded_file = st.file_uploader(
+    st.file_uploader(
         "Choose CSV file",
         type=['csv'],
+        key="uploaded_file",
+        on_change=on_upload,
         help="Upload aggregated (group,success,total) or row-level (user_id,group,converted) CSV"
     )
     
-    if uploaded_file is not None:
-        try:
-            # Save uploaded file temporarily and read it
-            import tempfile
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.csv', mode='wb') as tmp_file:
-                # Write uploaded file content to temp file (binary mode)
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            # Read CSV to detect format
-            df = pd.read_csv(tmp_path)
-            
-            # Detect format and load accordingly
-            if 'group' in df.columns and 'success' in df.columns and 'total' in df.columns:
-                # Aggregated format
-                sa, ta, sb, tb = load_aggregated_data(tmp_path)
-                # Update session state to reflect loaded values
-                if 'success_a' not in st.session_state or st.session_state.get('file_loaded') != uploaded_file.name:
-                    st.session_state.success_a = sa
-                    st.session_state.success_b = sb
-                    st.session_state.total_a = ta
-                    st.session_state.total_b = tb
-                    st.session_state.file_loaded = uploaded_file.name
-                    st.markdown(f"<div style=\"color: var(--text-subtle); font-size: 0.875rem;\">✅ Loaded: {uploaded_file.name}</div>", unsafe_allow_html=True)
-                    st.rerun()
-            elif 'user_id' in df.columns and 'group' in df.columns and 'converted' in df.columns:
-                # Row-level format
-                sa, ta, sb, tb = load_row_level_data(tmp_path)
-                # Update session state to reflect loaded values
-                if 'success_a' not in st.session_state or st.session_state.get('file_loaded') != uploaded_file.name:
-                    st.session_state.success_a = sa
-                    st.session_state.success_b = sb
-                    st.session_state.total_a = ta
-                    st.session_state.total_b = tb
-                    st.session_state.file_loaded = uploaded_file.name
-                    st.markdown(f"<div style=\"color: var(--text-subtle); font-size: 0.875rem;\">✅ Loaded: {uploaded_file.name}</div>", unsafe_allow_html=True)
-                    st.rerun()
-            else:
-                st.markdown(
-                    "<div class=\"alert alert-error\" role=\"alert\">❌ Error: Invalid CSV format. Expected columns: group, success, total (aggregated) or user_id, group, converted (row-level)</div>",
-                    unsafe_allow_html=True,
-                )
-            
-            # Clean up temp file
-            import os
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
-                
-        except Exception as e:
-            st.markdown(
-                f"<div class=\"alert alert-error\" role=\"alert\">❌ Error loading file: {str(e)}</div>",
-                unsafe_allow_html=True,
-            )
+    if st.session_state.get('upload_error'):
+        st.markdown(
+            f"<div class=\"alert alert-error\" role=\"alert\">❌ Error loading file: {st.session_state.upload_error}</div>",
+            unsafe_allow_html=True,
+        )
+    elif st.session_state.get('file_loaded'):
+        st.markdown(f"<div style=\"color: var(--text-subtle); font-size: 0.875rem;\">✅ Loaded: {st.session_state.file_loaded}</div>", unsafe_allow_html=True)
 
 # Main content area
 # Validation (accessible alert)
@@ -446,8 +714,7 @@ with col1:
 
 # Perform statistical test
 try:
-    results = ztest_two_prop(success_a, total_a, success_b, total_b, alpha=alpha)
-    
+    results = cached_ztest(success_a, total_a, success_b, total_b, alpha)
     # Statistical Results Card
     with col2:
         st.markdown("<div class=\"card\">", unsafe_allow_html=True)
@@ -490,48 +757,53 @@ try:
     st.markdown("<div class=\"card\">", unsafe_allow_html=True)
     st.markdown("<div class=\"meta-sm\">DECISION</div>", unsafe_allow_html=True)
     
-    if results['p'] < alpha and results['ci'][0] > 0:
-        decision_class = "decision-banner decision-b-wins"
-        decision_text = "✅ <strong>VARIANT B WINS</strong> — Statistically significant improvement detected."
-    elif results['ci'][0] > 0 and results['p'] >= alpha:
-        decision_class = "decision-banner decision-inconclusive"
-        decision_text = "⚠️ <strong>INCONCLUSIVE</strong> — Positive lift but not statistically significant. Consider extending sample size."
-    elif results['ci'][1] < 0:
-        decision_class = "decision-banner decision-a-better"
-        decision_text = "ℹ️ <strong>VARIANT A BETTER OR EQUIVALENT</strong> — Confidence interval suggests no improvement or decrease."
-    else:
-        decision_class = "decision-banner decision-inconclusive"
-        decision_text = "⚠️ <strong>INCONCLUSIVE</strong> — Confidence interval includes zero. Consider extending sample size."
-    
-    st.markdown(
-        f'<div class="{decision_class}" role="status">{decision_text}</div>',
-        unsafe_allow_html=True,
-    )
-    st.markdown("</div>", unsafe_allow_html=True)
-    
-    # Power Analysis Card
-    st.markdown("<div class=\"card\">", unsafe_allow_html=True)
-    st.markdown("<div class=\"meta-sm\">POWER ANALYSIS</div>", unsafe_allow_html=True)
-    p_control = pa
-    current_power = power(total_a, total_b, p_control, min_detectable_diff=mde_for_power, alpha=alpha)
-    st.metric(
-        f"Power to detect {mde_for_power*100:.1f}pp difference",
-        f"{current_power:.1%}",
-        delta=None
-    )
-    
-    if current_power < 0.8:
+    # A sample ratio mismatch means assignment is broken: block the decision
+    # until the user explicitly chooses to see it
+    srm = cached_srm(total_a, total_b, share_b)
+    show_decision = True
+    if srm['p'] < SRM_ALPHA:
+        observed_share = total_b / (total_a + total_b) * 100
         st.markdown(
-            f'<div class="alert" role="status">⚠️ Power is below the recommended 80% threshold. Consider increasing sample sizes.</div>',
+            f"<div class=\"alert alert-error\" role=\"alert\">🛑 <strong>SAMPLE RATIO MISMATCH</strong> — "
+            f"B received {observed_share:.2f}% of traffic but was designed for {share_b:.0f}% "
+            f"(χ² = {srm['chi2']:.1f}, p = {srm['p']:.2g}). Assignment or logging is likely broken, "
+            f"so the results above cannot be trusted.</div>",
             unsafe_allow_html=True,
         )
-    else:
+        show_decision = st.checkbox("Show the decision anyway", key="srm_override")
+    
+    if show_decision:
+        if results['p'] < alpha and results['ci'][0] > 0:
+            decision_class = "decision-banner decision-b-wins"
+            decision_text = "✅ <strong>VARIANT B WINS</strong> — Statistically significant improvement detected."
+        elif results['ci'][0] > 0 and results['p'] >= alpha:
+            decision_class = "decision-banner decision-inconclusive"
+            decision_text = "⚠️ <strong>INCONCLUSIVE</strong> — Positive lift but not statistically significant. Consider extending sample size."
+        elif results['ci'][1] < 0:
+            decision_class = "decision-banner decision-a-better"
+            decision_text = "ℹ️ <strong>VARIANT A BETTER OR EQUIVALENT</strong> — Confidence interval suggests no improvement or decrease."
+        else:
+            decision_class = "decision-banner decision-inconclusive"
+            decision_text = "⚠️ <strong>INCONCLUSIVE</strong> — Confidence interval includes zero. Consider extending sample size."
+        
         st.markdown(
-            f'<div class="alert" style="color: var(--accent-success);" role="status">✅ Power is sufficient (≥80%) for detecting a {mde_for_power*100:.1f}pp difference.</div>',
+            f'<div class="{decision_class}" role="status">{decision_text}</div>',
             unsafe_allow_html=True,
         )
     st.markdown("</div>", unsafe_allow_html=True)
     
+    # Power Analysis Card
+    power_card(total_a, total_b, pa, alpha)
+    
+    # Duration Forecast Card
+    duration_card(pa, alpha)
+    
+    # Bootstrap CI Card (background job)
+    bootstrap_card(success_a, total_a, success_b, total_b, alpha)
+    
+    # Cumulative lift over time (timestamped row-level uploads only)
+    timeseries_card(alpha)
+    
     # Additional info - Accordion/Expander
     with st.expander("📖 UNDERSTANDING THE RESULTS"):
         st.markdown(
@@ -573,7 +845,7 @@ This analysis assumes:
 - Independent observations
 - Large sample sizes (normal approximation valid)
 - Fixed-horizon testing (no sequential peeking)
-- Equal allocation between variants
+- Traffic split as designed ("Designed share in B", 50% by default; checked for sample ratio mismatch)
 
 For small samples or sequential testing, consider alternative methods.
 """,
@@ -583,3 +855,6 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 # Close container
 st.markdown("</div>", unsafe_allow_html=True)
+
+# Full-page reruns only; fragment reruns and st.stop() exits are not timed
+instrument.observe("render", time.perf_counter() - render_start)
@@ -0,0 +1,169 @@
+"""
+Background execution of long-running analyses for the Streamlit app.
+
+Streamlit runs the whole script on one thread per session, so a slow analysis
+(bootstrap, simulation power, segment breakdowns) blocks every card below it.
+JobRunner runs such analyses on a shared thread pool instead: the script
+submits a job, renders whatever is ready, and polls for progress from a
+fragment. Finished results are cached per input hash, so re-rendering with the
+same inputs returns immediately.
+
+Jobs receive a ``progress(done, total)`` keyword argument. Calling it updates
+the job's progress and raises JobCancelled once cancellation was requested, so
+analyses only need to report progress to become cancellable.
+
+Jobs are shared by every session that submits the same inputs. A session
+that stops caring about a job calls release() instead of cancel(); the job is
+cancelled only once no session is watching it any more.
+"""
+
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback after the job was cancelled."""
+
+
+class Job:
+    """
+    Handle for one submitted analysis.
+
+    Attributes:
+        key: Hash of the function and its arguments
+        status: One of "pending", "running", "done", "failed", "cancelled"
+        progress: Fraction complete, between 0 and 1
+        result: Return value of the analysis once status is "done"
+        error: Exception raised by the analysis once status is "failed"
+        watchers: Number of sessions currently watching the job (see
+            JobRunner.watch)
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.status = "pending"
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.watchers = 0
+        self._cancel_event = threading.Event()
+        self._future = None
+
+    @property
+    def done(self) -> bool:
+        """True once the job has finished, failed or been cancelled."""
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        """Request cancellation; takes effect at the job's next progress report."""
+        self._cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            self.status = "cancelled"
+
+    def _report(self, done: int, total: int) -> None:
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(done / total, 1.0) if total else 0.0
+
+
+def job_key(fn: Callable, args: tuple, kwargs: dict) -> str:
+    """Stable hash of a function and its (picklable) arguments."""
+    payload = pickle.dumps((fn.__module__, fn.__qualname__, args, sorted(kwargs.items())))
+    return hashlib.sha256(payload).hexdigest()
+
+
+class JobRunner:
+    """
+    Thread pool with a result cache keyed on job inputs.
+
+    Args:
+        max_workers: Number of analyses that may run at once (default: 2)
+        max_cached: Number of jobs kept before the oldest finished ones are
+            evicted (default: 64)
+    """
+
+    def __init__(self, max_workers: int = 2, max_cached: int = 64):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="abtest-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_cached = max_cached
+
+    def lookup(self, fn: Callable, *args, **kwargs) -> Optional[Job]:
+        """Return the cached job for these inputs, or None if it was never submitted."""
+        key = job_key(fn, args, kwargs)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+            return job
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Job:
+        """
+        Run fn(*args, progress=..., **kwargs) in the background.
+
+        Returns the existing job if one with the same inputs is pending,
+        running or done; failed and cancelled jobs are replaced by a new run.
+        """
+        key = job_key(fn, args, kwargs)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status not in ("failed", "cancelled"):
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._evict()
+            job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def watch(self, job: Job) -> None:
+        """Record that one more session is showing this job."""
+        with self._lock:
+            job.watchers += 1
+
+    def release(self, job: Job) -> None:
+        """Drop one session's interest in a job; cancel it once nobody is watching."""
+        with self._lock:
+            job.watchers = max(job.watchers - 1, 0)
+            if job.watchers == 0 and not job.done:
+                job.cancel()
+
+    def shutdown(self) -> None:
+        """Cancel all unfinished jobs and stop the worker threads."""
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.done:
+                    job.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _evict(self) -> None:
+        excess = len(self._jobs) - self._max_cached
+        for key in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[key].done:
+                del self._jobs[key]
+                excess -= 1
+
+    @staticmethod
+    def _run(job: Job, fn: Callable, args: tuple, kwargs: dict) -> None:
+        if job._cancel_event.is_set():
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        try:
+            result = fn(*args, progress=job._report, **kwargs)
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        else:
+            job.result = result
+            job.progress = 1.0
+            job.status = "done"
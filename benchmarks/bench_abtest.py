@@ -0,0 +1,322 @@
+"""
+Benchmark suite for the abtest statistics kernels and loaders.
+
+Times each benchmark on synthetic data at increasing sizes (10^3 rows up to
+--max-rows), records throughput and peak memory, and writes the results as
+JSON so runs can be compared across commits (see compare.py).
+
+Usage:
+    python benchmarks/bench_abtest.py -o bench.json
+    python benchmarks/bench_abtest.py --max-rows 1e8 --repeats 3 -o bench_full.json
+    python benchmarks/bench_abtest.py --only load_row_level_data,ztest_two_prop_batch -o bench.json
+
+Timing runs are made without tracing; peak memory is measured on one extra
+run with abtest.PeakMemoryTracker, which records the tracemalloc peak (Python
+and numpy/pandas allocations) and samples the process RSS on a background
+thread.
+Generated CSVs are cached in --data-dir, so repeated runs skip data generation.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import numpy as np
+import pandas as pd
+
+import abtest
+
+# Rows written per block when generating synthetic CSVs
+GENERATE_BLOCK = 1_000_000
+
+
+class Benchmark:
+    """
+    One registered benchmark.
+
+    Args:
+        name: Benchmark name used in results and --only
+        setup: setup(size, data_dir) -> zero-argument callable to time
+        unit: What ``size`` counts (rows, calls, experiments, files)
+        max_size: Cap on size for benchmarks that would be pointlessly slow
+            at 10^8 (e.g. per-call scalar functions)
+    """
+
+    def __init__(self, name: str, setup: Callable, unit: str, max_size: Optional[int] = None):
+        self.name = name
+        self.setup = setup
+        self.unit = unit
+        self.max_size = max_size
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, unit: str = "rows", max_size: Optional[int] = None):
+    """Register a setup function as a benchmark."""
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, unit, max_size)
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def synthetic_counts(size: int, seed: int = 0):
+    """Random but valid (success_a, total_a, success_b, total_b) arrays of length size."""
+    rng = np.random.default_rng(seed)
+    total_a = rng.integers(1_000, 100_000, size)
+    total_b = rng.integers(1_000, 100_000, size)
+    success_a = rng.binomial(total_a, 0.05)
+    success_b = rng.binomial(total_b, 0.055)
+    return success_a, total_a, success_b, total_b
+
+
+def row_level_csv(size: int, data_dir: str) -> str:
+    """Path to a cached row-level CSV (user_id,group,converted) with size rows."""
+    path = os.path.join(data_dir, f"row_level_{size}.csv")
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(size)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("user_id,group,converted\n")
+        for start in range(0, size, GENERATE_BLOCK):
+            n = min(GENERATE_BLOCK, size - start)
+            block = pd.DataFrame({
+                "user_id": np.char.add("u", np.arange(start, start + n).astype(str)),
+                "group": np.where(rng.random(n) < 0.5, "A", "B"),
+                "converted": (rng.random(n) < 0.05).astype(np.int8),
+            })
+            block.to_csv(f, header=False, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def aggregated_csv(size: int, data_dir: str) -> str:
+    """Path to a cached aggregated CSV (group,success,total) with size rows alternating A/B."""
+    path = os.path.join(data_dir, f"aggregated_{size}.csv")
+    if os.path.exists(path):
+        return path
+    success_a, total_a, _, _ = synthetic_counts(size)
+    tmp_path = path + ".tmp"
+    pd.DataFrame({
+        "group": np.where(np.arange(size) % 2 == 0, "A", "B"),
+        "success": success_a,
+        "total": total_a,
+    }).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def aggregated_files(count: int, data_dir: str) -> List[str]:
+    """Paths to count cached two-row aggregated CSVs, one experiment each."""
+    directory = os.path.join(data_dir, f"experiments_{count}")
+    os.makedirs(directory, exist_ok=True)
+    success_a, total_a, success_b, total_b = synthetic_counts(count)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"exp{i:06d}.csv")
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.write(f"group,success,total\nA,{success_a[i]},{total_a[i]}\nB,{success_b[i]},{total_b[i]}\n")
+        paths.append(path)
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@benchmark("ztest_two_prop", unit="calls", max_size=1_000)
+def _ztest_two_prop(size, data_dir):
+    counts = [tuple(int(x) for x in row) for row in zip(*synthetic_counts(size))]
+    return lambda: [abtest.ztest_two_prop(*row) for row in counts]
+
+
+@benchmark("ztest_two_prop_batch", unit="experiments")
+def _ztest_two_prop_batch(size, data_dir):
+    counts = synthetic_counts(size)
+    return lambda: abtest.ztest_two_prop_batch(*counts)
+
+
+@benchmark("power", unit="calls", max_size=1_000)
+def _power(size, data_dir):
+    _, total_a, _, total_b = synthetic_counts(size)
+    rows = list(zip(total_a.tolist(), total_b.tolist()))
+    return lambda: [abtest.power(n_a, n_b, 0.05, min_detectable_diff=0.01) for n_a, n_b in rows]
+
+
+@benchmark("power_batch", unit="experiments")
+def _power_batch(size, data_dir):
+    _, total_a, _, total_b = synthetic_counts(size)
+    return lambda: abtest.power_batch(total_a, total_b, 0.05, 0.01)
+
+
+@benchmark("analyze_counts", unit="experiments")
+def _analyze_counts(size, data_dir):
+    success_a, total_a, success_b, total_b = synthetic_counts(size)
+    table = pd.DataFrame({"success_a": success_a, "total_a": total_a, "success_b": success_b, "total_b": total_b})
+    return lambda: abtest.analyze_counts(table)
+
+
+@benchmark("load_aggregated_data", unit="rows")
+def _load_aggregated_data(size, data_dir):
+    path = aggregated_csv(size, data_dir)
+    # Many rows per group: sum them, which also keeps the duplicate-group
+    # warning out of the timed region
+    return lambda: abtest.load_aggregated_data(path, duplicates="sum")
+
+
+@benchmark("load_aggregated_table", unit="files", max_size=1_000)
+def _load_aggregated_table(size, data_dir):
+    paths = aggregated_files(size, data_dir)
+    return lambda: abtest.load_aggregated_table(paths)
+
+
+@benchmark("load_row_level_data", unit="rows")
+def _load_row_level_data(size, data_dir):
+    path = row_level_csv(size, data_dir)
+    return lambda: abtest.load_row_level_data(path)
+
+
+@benchmark("load_row_level_data_chunked", unit="rows")
+def _load_row_level_data_chunked(size, data_dir):
+    path = row_level_csv(size, data_dir)
+    return lambda: abtest.load_row_level_data(path, chunksize=abtest.DEFAULT_CHUNKSIZE)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def measure(fn: Callable, repeats: int) -> Dict[str, object]:
+    """Time fn over repeats runs (after one warm-up), then measure peak memory on one more."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    with abtest.PeakMemoryTracker(interval=0.005) as tracker:
+        fn()
+    memory = tracker.report()
+
+    return {
+        "times_s": times,
+        "peak_traced_bytes": memory["peak_traced_bytes"],
+        "peak_rss_delta_bytes": memory["rss_growth_bytes"],
+    }
+
+
+def run_benchmark(bench: Benchmark, size: int, repeats: int, data_dir: str) -> Optional[Dict[str, object]]:
+    """Run one benchmark at one size; None if size is above the benchmark's cap."""
+    if bench.max_size is not None and size > bench.max_size:
+        return None
+    fn = bench.setup(size, data_dir)
+    result = measure(fn, repeats)
+    median = float(np.median(result["times_s"]))
+    return {
+        "name": bench.name,
+        "size": size,
+        "unit": bench.unit,
+        "repeats": repeats,
+        "median_s": median,
+        "min_s": float(min(result["times_s"])),
+        "throughput_per_s": size / median if median > 0 else None,
+        **result,
+    }
+
+
+def environment() -> Dict[str, object]:
+    """Metadata identifying the machine, library versions and commit of a run."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(names: List[str], sizes: List[int], repeats: int, data_dir: str,
+              log: Callable[[str], None] = lambda msg: None) -> Dict[str, object]:
+    """Run the named benchmarks at every size and return the JSON-ready report."""
+    results = []
+    for name in names:
+        for size in sizes:
+            result = run_benchmark(BENCHMARKS[name], size, repeats, data_dir)
+            if result is None:
+                continue
+            results.append(result)
+            log(f"{name:<30} {size:>11,} {result['unit']:<12} "
+                f"{result['median_s'] * 1e3:>10.2f} ms  {result['throughput_per_s']:>14,.0f}/s  "
+                f"peak {result['peak_traced_bytes'] / 2 ** 20:>8.1f} MiB")
+    return {"environment": environment(), "results": results}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark abtest statistics kernels and loaders")
+    parser.add_argument("-o", "--output", help="write results JSON here (default: print only)")
+    parser.add_argument("--min-rows", type=float, default=1e3, help="smallest size (default: 1e3)")
+    parser.add_argument("--max-rows", type=float, default=1e6, help="largest size, powers of 10 (default: 1e6)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per size (default: 5)")
+    parser.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "abtest-bench"),
+                        help="cache directory for generated CSVs")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    return parser
+
+
+def powers_of_ten(low: float, high: float) -> List[int]:
+    """10^k for every integer k with low <= 10^k <= high."""
+    return [10 ** k for k in range(int(np.ceil(np.log10(low))), int(np.floor(np.log10(high))) + 1)]
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"error: unknown benchmarks {unknown}; see --list", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = run_suite(names, powers_of_ten(args.min_rows, args.max_rows), args.repeats, args.data_dir,
+                       log=lambda msg: print(msg, file=sys.stderr))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
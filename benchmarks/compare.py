@@ -0,0 +1,195 @@
+"""
+Performance regression guard for the abtest benchmarks.
+
+Loads a stored baseline written by bench_abtest.py, re-runs the same
+benchmarks at the same sizes (or loads a second results file), and flags any
+benchmark that got significantly slower or uses more memory:
+
+- Time: the current median must exceed the baseline median by more than
+  --time-threshold, by more than --noise-factor times the runs' own noise
+  (median absolute deviation relative to the median), and a one-sided
+  Mann-Whitney U test on the repeated timings must reject at --alpha.
+- Memory: the tracemalloc peak must grow by more than --memory-threshold and
+  by more than --memory-floor bytes. tracemalloc peaks are deterministic
+  enough that no repeated-run test is needed.
+
+Usage:
+    python benchmarks/bench_abtest.py --repeats 10 -o benchmarks/baseline.json   # on the reference commit
+    python benchmarks/compare.py benchmarks/baseline.json                        # on the candidate
+    python benchmarks/compare.py baseline.json --current candidate.json
+
+Exits with status 1 if any regression is found. Compare runs from the same
+machine only; a warning is printed when the recorded environments differ.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_abtest
+
+Key = Tuple[str, int]
+
+
+def relative_noise(times: List[float]) -> float:
+    """Median absolute deviation of the timings relative to their median."""
+    times = np.asarray(times, dtype=np.float64)
+    median = np.median(times)
+    return float(np.median(np.abs(times - median)) / median) if median > 0 else 0.0
+
+
+def compare_result(baseline: Dict, current: Dict, time_threshold: float = 0.10, memory_threshold: float = 0.10,
+                   memory_floor: int = 1 << 20, alpha: float = 0.01, noise_factor: float = 2.0) -> Dict:
+    """
+    Compare one benchmark's baseline and current results.
+
+    Returns:
+        Dictionary with the time ratio, Mann-Whitney p-value, noise estimate,
+        memory ratio, and booleans time_regression / memory_regression
+    """
+    base_times, cur_times = baseline["times_s"], current["times_s"]
+    base_median, cur_median = float(np.median(base_times)), float(np.median(cur_times))
+    time_ratio = cur_median / base_median if base_median > 0 else float("inf")
+    noise = max(relative_noise(base_times), relative_noise(cur_times))
+
+    if len(base_times) >= 2 and len(cur_times) >= 2:
+        p_value = float(stats.mannwhitneyu(cur_times, base_times, alternative="greater").pvalue)
+    else:
+        p_value = float("nan")
+    time_regression = bool(
+        time_ratio - 1 > max(time_threshold, noise_factor * noise)
+        and (np.isnan(p_value) or p_value < alpha)
+    )
+
+    base_mem, cur_mem = baseline["peak_traced_bytes"], current["peak_traced_bytes"]
+    memory_ratio = cur_mem / base_mem if base_mem > 0 else float("inf")
+    memory_regression = bool(memory_ratio - 1 > memory_threshold and cur_mem - base_mem > memory_floor)
+
+    return {
+        "name": current["name"],
+        "size": current["size"],
+        "baseline_median_s": base_median,
+        "current_median_s": cur_median,
+        "time_ratio": time_ratio,
+        "noise": noise,
+        "p_value": p_value,
+        "baseline_peak_bytes": base_mem,
+        "current_peak_bytes": cur_mem,
+        "memory_ratio": memory_ratio,
+        "time_regression": time_regression,
+        "memory_regression": memory_regression,
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict, **thresholds) -> List[Dict]:
+    """Compare every (name, size) present in both reports."""
+    current_by_key: Dict[Key, Dict] = {(r["name"], r["size"]): r for r in current["results"]}
+    return [
+        compare_result(result, current_by_key[(result["name"], result["size"])], **thresholds)
+        for result in baseline["results"]
+        if (result["name"], result["size"]) in current_by_key
+    ]
+
+
+def rerun_baseline(baseline: Dict, repeats: int, data_dir: str) -> Dict:
+    """Re-run every benchmark in the baseline at its recorded sizes."""
+    results = []
+    for result in baseline["results"]:
+        bench = bench_abtest.BENCHMARKS.get(result["name"])
+        if bench is None:
+            print(f"warning: benchmark {result['name']} no longer exists; skipped", file=sys.stderr)
+            continue
+        print(f"running {result['name']} at {result['size']:,}", file=sys.stderr)
+        rerun = bench_abtest.run_benchmark(bench, result["size"], repeats, data_dir)
+        if rerun is not None:
+            results.append(rerun)
+    return {"environment": bench_abtest.environment(), "results": results}
+
+
+def environment_mismatch(baseline: Dict, current: Dict) -> Optional[str]:
+    """Describe differences in machine or library versions between two runs, if any."""
+    keys = ("machine", "cpu_count", "python", "numpy", "pandas")
+    base_env, cur_env = baseline.get("environment", {}), current.get("environment", {})
+    diffs = [f"{key}: {base_env.get(key)} -> {cur_env.get(key)}" for key in keys if base_env.get(key) != cur_env.get(key)]
+    return ", ".join(diffs) or None
+
+
+def format_report(rows: List[Dict]) -> str:
+    lines = [f"{'benchmark':<30} {'size':>11} {'time':>8} {'noise':>7} {'p':>8} {'memory':>8}  status"]
+    for row in rows:
+        flags = [label for label, hit in (("SLOWER", row["time_regression"]), ("MORE MEMORY", row["memory_regression"])) if hit]
+        lines.append(
+            f"{row['name']:<30} {row['size']:>11,} {row['time_ratio']:>7.2f}x {row['noise']:>6.1%} "
+            f"{row['p_value']:>8.4f} {row['memory_ratio']:>7.2f}x  {', '.join(flags) or 'ok'}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Flag abtest benchmark regressions against a stored baseline")
+    parser.add_argument("baseline", help="baseline results JSON from bench_abtest.py")
+    parser.add_argument("--current", help="compare against this results JSON instead of re-running")
+    parser.add_argument("--repeats", type=int, default=10, help="timed runs per benchmark when re-running (default: 10)")
+    parser.add_argument("--time-threshold", type=float, default=0.10,
+                        help="minimum relative slowdown to flag (default: 0.10)")
+    parser.add_argument("--memory-threshold", type=float, default=0.10,
+                        help="minimum relative peak-memory increase to flag (default: 0.10)")
+    parser.add_argument("--memory-floor", type=int, default=1 << 20,
+                        help="minimum absolute peak-memory increase in bytes to flag (default: 1 MiB)")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="significance level of the Mann-Whitney test (default: 0.01)")
+    parser.add_argument("--noise-factor", type=float, default=2.0,
+                        help="slowdown must also exceed this multiple of the relative noise (default: 2)")
+    parser.add_argument("--save-current", help="write the re-run results JSON here (e.g. as the next baseline)")
+    parser.add_argument("--json", help="write the comparison rows as JSON here")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "abtest-bench"),
+                        help="cache directory for generated CSVs")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        current = rerun_baseline(baseline, args.repeats, args.data_dir)
+    if args.save_current:
+        with open(args.save_current, "w") as f:
+            json.dump(current, f, indent=2)
+
+    mismatch = environment_mismatch(baseline, current)
+    if mismatch:
+        print(f"warning: environments differ ({mismatch}); timings may not be comparable", file=sys.stderr)
+
+    rows = compare_reports(
+        baseline, current,
+        time_threshold=args.time_threshold, memory_threshold=args.memory_threshold,
+        memory_floor=args.memory_floor, alpha=args.alpha, noise_factor=args.noise_factor,
+    )
+    print(format_report(rows))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    regressions = [row for row in rows if row["time_regression"] or row["memory_regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+A/B Test Statistical Analysis Functions
+
+This package provides functions for analyzing A/B test results using two-proportion
+z-tests and power analysis.
+
+Modules:
+    core: Scalar statistics (ztest_two_prop, power, bootstrap_lift_ci) and CSV loaders
+    batch: Vectorized statistics and multi-file analysis for batches of experiments
+    intervals: Wald, Newcombe and Agresti-Caffo intervals for the lift
+    cli: Command-line entry point (``python -m abtest``)
+    service: Local HTTP/JSON analysis service (``python -m abtest serve``)
+    aio: Asyncio loaders reading many files concurrently
+    instrument: Opt-in timing spans and counters with JSON/Prometheus export
+    memory: Memory budgets (size parsing, per-row estimates, peak tracking)
+    dedup: Out-of-core per-user deduplication of row-level exposures
+    attribution: Time-windowed joins of exposure and conversion event streams
+    sketch: HyperLogLog sketches for approximate unique-user counts
+    continuous: Welch t-tests, CUPED and delta-method ratio metrics from streaming moments
+    cluster: Cluster-robust z-tests for cluster-randomized experiments
+    stratified: Cochran-Mantel-Haenszel tests over segments
+    timeseries: Cumulative lift and confidence intervals per day or hour
+"""
+
+from . import instrument
+from .core import (
+    DEFAULT_CHUNKSIZE,
+    KeyedRowLevelAggregator,
+    MultiMetricAggregator,
+    RowLevelAggregator,
+    bootstrap_lift_ci,
+    iter_csv_chunks,
+    load_aggregated_data,
+    load_counts,
+    load_row_level_data,
+    load_row_level_experiments,
+    load_row_level_metrics,
+    load_row_level_report,
+    power,
+    srm_test,
+    ztest_two_prop,
+)
+from .dedup import UserDeduplicator
+from .attribution import WindowedAttribution, load_windowed_counts
+from .batch import (
+    add_adjusted_pvalues,
+    adjust_pvalues,
+    analyze_counts,
+    analyze_files,
+    cumulative_power,
+    experiment_id_from_path,
+    forecast_duration,
+    power_batch,
+    srm_test_batch,
+    ztest_two_prop_batch,
+)
+from .intervals import CI_METHODS, diff_interval
+from .memory import PeakMemoryTracker, parse_size
+from .sketch import HyperLogLog, SketchAggregator, load_row_level_sketches
+from .aio import iter_load_aggregated, load_aggregated_table
+from .cluster import ClusterAggregator, cluster_robust_ztest, load_clustered
+from .stratified import analyze_stratified, cmh_test_batch, load_stratified
+from .timeseries import PeriodAggregator, analyze_timeseries, load_timeseries
+from .continuous import (
+    CupedAggregator,
+    MomentAggregator,
+    RatioAggregator,
+    analyze_moments,
+    load_cuped,
+    load_moments,
+    load_ratios,
+    welch_ttest_batch,
+    ztest_means_batch,
+)
+
+__all__ = [
+    "CI_METHODS",
+    "ClusterAggregator",
+    "CupedAggregator",
+    "DEFAULT_CHUNKSIZE",
+    "HyperLogLog",
+    "KeyedRowLevelAggregator",
+    "MomentAggregator",
+    "MultiMetricAggregator",
+    "PeakMemoryTracker",
+    "PeriodAggregator",
+    "RatioAggregator",
+    "RowLevelAggregator",
+    "SketchAggregator",
+    "UserDeduplicator",
+    "WindowedAttribution",
+    "add_adjusted_pvalues",
+    "adjust_pvalues",
+    "analyze_counts",
+    "analyze_files",
+    "analyze_moments",
+    "analyze_stratified",
+    "analyze_timeseries",
+    "bootstrap_lift_ci",
+    "cluster_robust_ztest",
+    "cmh_test_batch",
+    "cumulative_power",
+    "diff_interval",
+    "experiment_id_from_path",
+    "forecast_duration",
+    "instrument",
+    "iter_csv_chunks",
+    "iter_load_aggregated",
+    "load_aggregated_data",
+    "load_aggregated_table",
+    "load_clustered",
+    "load_counts",
+    "load_cuped",
+    "load_moments",
+    "load_ratios",
+    "load_row_level_data",
+    "load_row_level_experiments",
+    "load_row_level_metrics",
+    "load_row_level_report",
+    "load_row_level_sketches",
+    "load_stratified",
+    "load_timeseries",
+    "load_windowed_counts",
+    "parse_size",
+    "power",
+    "power_batch",
+    "srm_test",
+    "srm_test_batch",
+    "welch_ttest_batch",
+    "ztest_means_batch",
+    "ztest_two_prop",
+    "ztest_two_prop_batch",
+]
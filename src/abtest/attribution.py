@@ -0,0 +1,352 @@
+"""
+Time-windowed conversion attribution from exposure and conversion streams.
+
+When the raw data is two event logs, an exposure log (user_id, group,
+timestamp) and a conversion log (user_id, timestamp), there is no
+``converted`` flag to count. WindowedAttribution joins the two per user: a
+user is counted once, in the group of their first exposure, and as converted
+if any conversion falls within ``window`` of that first exposure
+(0 <= conversion - first exposure <= window). Conversions before the first
+exposure, or from users never exposed, are ignored.
+
+The join is a sorted-array merge rather than a hash join. First exposures
+and conversions are sorted together by (user key, timestamp). A running
+maximum then carries each user's first exposure forward to their later
+conversions, the backward direction of pandas.merge_asof, in
+O((n + m) log(n + m)) numpy operations.
+
+User ids are hashed to 128-bit keys (see abtest.dedup). Exposure records
+take 26 bytes and conversion records 24 bytes. They are buffered until they
+exceed the memory budget and are then hash-partitioned by user into spill
+files. Both streams use the same partitioning, so each partition is joined
+on its own. A partition that still exceeds the budget is split again by the
+next bits of the hash, as in abtest.dedup.
+
+Example:
+    counts = load_windowed_counts("exposures.csv", "conversions.csv", window=24)
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .core import iter_csv_chunks
+from .dedup import (
+    DEFAULT_DEDUP_MEMORY,
+    DEFAULT_PARTITIONS,
+    WORK_FACTOR,
+    consume_spill,
+    encode_groups,
+    hash_user_ids,
+    split_partitions,
+)
+from .instrument import count, span
+from .memory import SizeLike, parse_size, split_budget
+
+EXPOSURE = np.dtype([('h1', '<u8'), ('h2', '<u8'), ('t', '<i8'), ('group', '<u2')])
+CONVERSION = np.dtype([('h1', '<u8'), ('h2', '<u8'), ('t', '<i8')])
+
+_STREAMS = {'exposures': EXPOSURE, 'conversions': CONVERSION}
+
+
+def parse_window(window) -> int:
+    """
+    Attribution window in nanoseconds from hours (a number) or anything
+    pandas.Timedelta accepts, e.g. "7D" or a datetime.timedelta.
+
+    Raises:
+        ValueError: If the window is negative or cannot be parsed
+    """
+    import pandas as pd
+
+    try:
+        delta = pd.Timedelta(hours=window) if isinstance(window, (int, float)) else pd.Timedelta(window)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid attribution window: {window!r}")
+    if pd.isna(delta) or delta < pd.Timedelta(0):
+        raise ValueError(f"Invalid attribution window: {window!r}")
+    return delta.value
+
+
+def to_nanoseconds(timestamps) -> np.ndarray:
+    """
+    UTC nanoseconds since the epoch for a Series of timestamps.
+
+    Numeric values are read as epoch seconds; anything else is parsed with
+    pandas.to_datetime, treating naive times as UTC.
+
+    Raises:
+        ValueError: If a timestamp is missing or cannot be parsed
+    """
+    import pandas as pd
+
+    try:
+        if pd.api.types.is_numeric_dtype(timestamps):
+            parsed = pd.to_datetime(timestamps, unit='s', utc=True)
+        else:
+            parsed = pd.to_datetime(timestamps, utc=True)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Invalid timestamp: {e}")
+    if parsed.isna().any():
+        raise ValueError("timestamp has missing values")
+    return parsed.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def attribute_records(exposures: np.ndarray, conversions: np.ndarray,
+                      window_ns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join one partition's EXPOSURE and CONVERSION records by user.
+
+    Returns:
+        Tuple of (group codes, converted) with one entry per exposed user
+    """
+    # First exposure per user; lexsort is stable, so timestamp ties keep row order
+    order = np.lexsort((exposures['t'], exposures['h2'], exposures['h1']))
+    h1, h2 = exposures['h1'][order], exposures['h2'][order]
+    new_user = np.empty(len(order), dtype=bool)
+    new_user[:1] = True
+    np.not_equal(h1[1:], h1[:-1], out=new_user[1:])
+    new_user[1:] |= h2[1:] != h2[:-1]
+    first = exposures[order[new_user]]
+    n_users = len(first)
+
+    # Sort first exposures and conversions together by (user, time), with an
+    # exposure ahead of a conversion at the same instant
+    h1 = np.concatenate([first['h1'], conversions['h1']])
+    h2 = np.concatenate([first['h2'], conversions['h2']])
+    t = np.concatenate([first['t'], conversions['t']])
+    is_conversion = np.concatenate([np.zeros(n_users, dtype=bool), np.ones(len(conversions), dtype=bool)])
+    order = np.lexsort((is_conversion, t, h2, h1))
+
+    # Users are in key order in both ``first`` and the merged order, so a
+    # running maximum of exposure indices is the latest exposure so far
+    user = np.where(is_conversion[order], -1, order)
+    np.maximum.accumulate(user, out=user)
+    positions = np.flatnonzero(is_conversion[order])
+    user, rows = user[positions], order[positions]
+    seen = user >= 0
+    user, rows = user[seen], rows[seen]
+    matched = (h1[user] == h1[rows]) & (h2[user] == h2[rows]) & (t[rows] - t[user] <= window_ns)
+
+    converted = np.zeros(n_users, dtype=np.uint8)
+    converted[user[matched]] = 1
+    return first['group'], converted
+
+
+class WindowedAttribution:
+    """
+    Streaming per-user attribution of conversions to first exposures.
+
+    Feed it exposure chunks (``user_id``, ``group``, ``timestamp``) via
+    add_exposures() and conversion chunks (``user_id``, ``timestamp``) via
+    add_conversions(), in any order, then call counts(). Use it as a context
+    manager (or call close()) to delete spill files.
+
+    Args:
+        window: Attribution window after the first exposure, in hours or as
+            a pandas.Timedelta string such as "7D"
+        max_memory: Budget for buffered records and for joining one
+            partition, in bytes or as a size string (default: 1 GiB)
+        partitions: Spill files per stream (default: 64)
+        spill_dir: Directory for spill files (default: the system temp dir)
+
+    Raises:
+        ValueError: If window or partitions is invalid
+    """
+
+    def __init__(self, window, max_memory: Optional[SizeLike] = None,
+                 partitions: int = DEFAULT_PARTITIONS, spill_dir: Optional[str] = None):
+        if partitions < 2:
+            raise ValueError("partitions must be at least 2")
+        self.window_ns = parse_window(window)
+        self.max_memory = parse_size(max_memory) if max_memory is not None else DEFAULT_DEDUP_MEMORY
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.rows = {stream: 0 for stream in _STREAMS}
+        self.spilled_rows = 0
+        self.group_codes: Dict[str, int] = {}
+        self._buffers: Dict[str, List[np.ndarray]] = {stream: [] for stream in _STREAMS}
+        self._buffered_bytes = 0
+        self._tmpdir: Optional[str] = None
+        self._files = None
+
+    def __enter__(self) -> "WindowedAttribution":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """Close and delete any spill files."""
+        if self._files is not None:
+            for files in self._files.values():
+                for f in files:
+                    f.close()
+            self._files = None
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    @staticmethod
+    def _keyed(chunk, dtype: np.dtype) -> np.ndarray:
+        if chunk['user_id'].isna().any():
+            raise ValueError("user_id has missing values")
+        records = np.empty(len(chunk), dtype=dtype)
+        records['t'] = to_nanoseconds(chunk['timestamp'])
+        with span("hash"):
+            records['h1'], records['h2'] = hash_user_ids(chunk['user_id'].to_numpy())
+        return records
+
+    def add_exposures(self, chunk) -> None:
+        """
+        Add one chunk of exposures.
+
+        Raises:
+            ValueError: If user_id, group or timestamp is missing or invalid
+        """
+        with span("validate"):
+            if chunk['group'].isna().any():
+                raise ValueError("group has missing values")
+            records = self._keyed(chunk, EXPOSURE)
+            records['group'] = encode_groups(chunk['group'], self.group_codes)
+        self._add('exposures', records)
+
+    def add_conversions(self, chunk) -> None:
+        """
+        Add one chunk of conversions.
+
+        Raises:
+            ValueError: If user_id or timestamp is missing or invalid
+        """
+        with span("validate"):
+            records = self._keyed(chunk, CONVERSION)
+        self._add('conversions', records)
+
+    def _add(self, stream: str, records: np.ndarray) -> None:
+        self.rows[stream] += len(records)
+        if self._files is not None:
+            self._spill(stream, records)
+            return
+        self._buffers[stream].append(records)
+        self._buffered_bytes += records.nbytes
+        if self._buffered_bytes * WORK_FACTOR > self.max_memory:
+            self._start_spilling()
+
+    def _start_spilling(self) -> None:
+        self._tmpdir = tempfile.mkdtemp(prefix="abtest-attribution-", dir=self.spill_dir)
+        self._files = {
+            stream: [open(self._path(stream, i), "wb") for i in range(self.partitions)] for stream in _STREAMS
+        }
+        buffers = self._buffers
+        self._buffers, self._buffered_bytes = {stream: [] for stream in _STREAMS}, 0
+        for stream, records in buffers.items():
+            for part in records:
+                self._spill(stream, part)
+
+    def _path(self, stream: str, partition: int) -> str:
+        return os.path.join(self._tmpdir, f"{stream}-p{partition:04d}.bin")
+
+    def _spill(self, stream: str, records: np.ndarray) -> None:
+        with span("spill"):
+            for partition, part in split_partitions(records, self.partitions):
+                part.tofile(self._files[stream][partition])
+        self.spilled_rows += len(records)
+        count("rows_spilled", len(records))
+
+    def _accumulate(self, exposures: np.ndarray, conversions: np.ndarray,
+                    totals: np.ndarray, successes: np.ndarray) -> None:
+        with span("attribute"):
+            groups, converted = attribute_records(exposures, conversions, self.window_ns)
+            totals += np.bincount(groups, minlength=len(totals))
+            successes += np.bincount(groups, weights=converted, minlength=len(successes)).astype(np.int64)
+
+    def group_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Per-group (successes, totals) over exposed users.
+
+        Consumes the spill files; call it once, after the last chunk.
+        """
+        totals = np.zeros(len(self.group_codes), dtype=np.int64)
+        successes = np.zeros(len(self.group_codes), dtype=np.int64)
+        if self._files is None:
+            parts = [np.concatenate(self._buffers[stream]) if self._buffers[stream] else np.empty(0, dtype)
+                     for stream, dtype in _STREAMS.items()]
+            self._accumulate(*parts, totals, successes)
+            self._buffers, self._buffered_bytes = {stream: [] for stream in _STREAMS}, 0
+        else:
+            for files in self._files.values():
+                for f in files:
+                    f.close()
+            self._files = None
+
+            def accumulate(parts):
+                self._accumulate(parts['exposures'], parts['conversions'], totals, successes)
+
+            for partition in range(self.partitions):
+                paths = {stream: self._path(stream, partition) for stream in _STREAMS}
+                if os.path.getsize(paths['exposures']):
+                    consume_spill(paths, _STREAMS, accumulate, self.partitions, self.max_memory)
+            self.close()
+        return (
+            {label: int(successes[code]) for label, code in self.group_codes.items()},
+            {label: int(totals[code]) for label, code in self.group_codes.items()},
+        )
+
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Return (success_a, total_a, success_b, total_b) over exposed users.
+
+        Raises:
+            ValueError: If either variant has no users
+        """
+        successes, totals = self.group_counts()
+        if totals.get('A', 0) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if totals.get('B', 0) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        return successes['A'], totals['A'], successes['B'], totals['B']
+
+
+def load_windowed_counts(exposures_path, conversions_path, window, chunksize: Optional[int] = None,
+                         max_memory: Optional[SizeLike] = None,
+                         spill_dir: Optional[str] = None) -> Tuple[int, int, int, int]:
+    """
+    Count conversions within ``window`` of each user's first exposure.
+
+    Expected CSV formats:
+        user_id,group,timestamp          user_id,timestamp
+        u1,A,2024-05-01T10:00:00         u1,2024-05-01T12:30:00
+
+    Args:
+        exposures_path: Exposure CSV path or readable file object
+        conversions_path: Conversion CSV path or readable file object
+        window: Attribution window in hours, or a pandas.Timedelta string
+            such as "7D"
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Memory budget in bytes or as a size string such as "2GB",
+            split between parsing chunks and the join (see
+            memory.split_budget; default: 1 GiB for the join)
+        spill_dir: Directory for spill files (default: system temp)
+
+    Returns:
+        Tuple of (success_a, total_a, success_b, total_b), one user per trial
+
+    Raises:
+        FileNotFoundError: If a file doesn't exist
+        ValueError: If data format or window is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    parse_memory, join_memory = split_budget(max_memory)
+    with WindowedAttribution(window, max_memory=join_memory, spill_dir=spill_dir) as attribution:
+        for chunk in iter_csv_chunks(exposures_path, ['user_id', 'group', 'timestamp'], chunksize, parse_memory,
+                                     dtype={'user_id': str, 'group': 'category'}):
+            attribution.add_exposures(chunk)
+        for chunk in iter_csv_chunks(conversions_path, ['user_id', 'timestamp'], chunksize, parse_memory,
+                                     dtype={'user_id': str}):
+            attribution.add_conversions(chunk)
+        return attribution.counts()
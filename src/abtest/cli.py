@@ -0,0 +1,225 @@
+"""
+Command-line interface for batch A/B test analysis.
+
+Usage:
+    python -m abtest batch data/experiments/ -o results.csv
+    python -m abtest batch "exports/*/exp_*.csv" -o results.parquet --jobs 8 --mde 0.01
+    python -m abtest batch data/experiments/ -o results.csv --metrics-out metrics.json
+    python -m abtest batch big_logs/ -o results.csv --jobs 4 --max-memory 2GB
+    python -m abtest serve --port 8000
+
+Run from ``src/`` or with ``src`` on PYTHONPATH.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+from . import instrument
+from .batch import PVALUE_CORRECTIONS, SRM_ALPHA, add_adjusted_pvalues, analyze_files
+from .core import AGGREGATED_DUPLICATES
+from .dedup import DEDUP_MODES
+from .intervals import CI_METHODS
+
+OUTPUT_FORMATS = ('.csv', '.json', '.parquet')
+
+
+def expand_inputs(inputs: Sequence[str], pattern: str = "*.csv", recursive: bool = False) -> List[str]:
+    """
+    Turn directories, glob patterns and file paths into a list of CSV paths.
+
+    Directories contribute the files matching ``pattern`` (searched recursively
+    if requested); glob patterns are expanded; anything else is kept as a
+    path, so a missing file shows up as an error row rather than vanishing.
+    Duplicates are dropped and order is preserved.
+    """
+    paths: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            search = os.path.join(item, "**", pattern) if recursive else os.path.join(item, pattern)
+            paths.extend(sorted(glob.glob(search, recursive=recursive)))
+        elif glob.has_magic(item):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+def write_table(table, output: str) -> None:
+    """
+    Write a results table as CSV, JSON (records) or Parquet based on the extension.
+
+    ``-`` writes CSV to stdout.
+
+    Raises:
+        ValueError: If the extension is not one of OUTPUT_FORMATS
+    """
+    if output == "-":
+        table.to_csv(sys.stdout, index=False)
+        return
+    ext = _output_format(output)
+    if ext == ".csv":
+        table.to_csv(output, index=False)
+    elif ext == ".json":
+        table.to_json(output, orient="records", indent=2)
+    else:
+        table.to_parquet(output, index=False)
+
+
+def _output_format(output: str) -> str:
+    ext = os.path.splitext(output)[1].lower()
+    if ext not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{ext}'; expected one of {', '.join(OUTPUT_FORMATS)}")
+    return ext
+
+
+def parse_allocation(value: str) -> Tuple[float, float]:
+    """Parse an A/B split such as ``50,50``, ``1:1`` or ``0.2,0.8``."""
+    parts = value.replace(":", ",").split(",")
+    try:
+        shares = tuple(float(part) for part in parts)
+    except ValueError:
+        shares = ()
+    if len(shares) != 2 or min(shares) <= 0:
+        raise argparse.ArgumentTypeError(f"expected two positive shares such as 50,50 or 1:1, got '{value}'")
+    return shares
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    if args.output != "-":
+        _output_format(args.output)
+    paths = expand_inputs(args.inputs, pattern=args.pattern, recursive=args.recursive)
+    if not paths:
+        print("error: no input files matched", file=sys.stderr)
+        return 2
+    if args.metrics_out:
+        instrument.enable()
+
+    table = analyze_files(
+        paths,
+        alpha=args.alpha,
+        min_detectable_diff=args.mde,
+        max_workers=args.jobs,
+        chunksize=args.chunksize,
+        max_memory=args.max_memory,
+        dedup=args.dedup,
+        duplicates=args.duplicates,
+        allocation=args.allocation,
+        srm_alpha=args.srm_alpha,
+        ci_method=args.ci_method,
+        experiment_col=args.experiment_col,
+    )
+    if args.correction:
+        table = add_adjusted_pvalues(table, args.correction, args.alpha)
+        table = table[[col for col in table.columns if col != 'error'] + ['error']]
+    write_table(table, args.output)
+    if args.metrics_out:
+        with open(args.metrics_out, "w") as f:
+            json.dump(instrument.snapshot(), f, indent=2)
+
+    failed = int(table['error'].notna().sum())
+    print(f"Analyzed {len(table) - failed} of {len(table)} experiments", file=sys.stderr)
+    if args.correction:
+        print(f"{int(table['reject'].sum())} significant after {args.correction} correction "
+              f"at alpha={args.alpha}", file=sys.stderr)
+    mismatched = table.loc[table['srm'].eq(True), 'experiment_id'].tolist()
+    if mismatched:
+        print(f"Sample ratio mismatch in {len(mismatched)} experiment(s); do not trust their results:",
+              file=sys.stderr)
+        for experiment_id in mismatched:
+            print(f"  {experiment_id}", file=sys.stderr)
+    if failed:
+        failures = table.loc[table['error'].notna(), ['experiment_id', 'path', 'error']]
+        for experiment_id, path, error in failures.itertuples(index=False):
+            where = f"{path} [{experiment_id}]" if args.experiment_col else path
+            print(f"  {where}: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _run_serve(args: argparse.Namespace) -> int:
+    from .service import serve
+
+    if args.metrics:
+        instrument.enable()
+    serve(host=args.host, port=args.port, workers=args.workers, verbose=args.verbose)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the ``python -m abtest`` argument parser."""
+    parser = argparse.ArgumentParser(prog="python -m abtest", description="A/B test analysis tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser(
+        "batch",
+        help="analyze many experiment CSVs into one results table",
+        description="Load aggregated (group,success,total) or row-level (user_id,group,converted) "
+                    "CSVs across a process pool and write z, p, lift, CI and power per experiment.",
+    )
+    batch.add_argument("inputs", nargs="+", help="directories, glob patterns or CSV files")
+    batch.add_argument("-o", "--output", required=True,
+                       help="results file (.csv, .json or .parquet), or - for CSV on stdout")
+    batch.add_argument("--alpha", type=float, default=0.05, help="significance level (default: 0.05)")
+    batch.add_argument("--ci-method", choices=CI_METHODS, default="wald",
+                       help="confidence interval for the lift; newcombe or agresti-caffo keep "
+                            "their coverage at low conversion rates (default: wald)")
+    batch.add_argument("--mde", type=float, default=0.02,
+                       help="minimum detectable difference for the power column (default: 0.02)")
+    batch.add_argument("-j", "--jobs", type=int, default=None,
+                       help="worker processes (default: CPU count)")
+    batch.add_argument("--chunksize", type=int, default=None,
+                       help="rows per chunk when streaming row-level files "
+                            "(default: sized from --max-memory, else 1000000)")
+    batch.add_argument("--max-memory", metavar="SIZE",
+                       help="memory budget per worker for row-level files, e.g. 2GB or 512MiB")
+    batch.add_argument("--dedup", choices=DEDUP_MODES,
+                       help="count each user of a row-level file once: their first row, "
+                            "or converted if any row converted")
+    batch.add_argument("--experiment-col", metavar="COLUMN",
+                       help="row-level inputs hold many experiments; split them by this column "
+                            "(e.g. experiment_id) in one scan per file")
+    batch.add_argument("--duplicates", choices=AGGREGATED_DUPLICATES, default="first",
+                       help="repeated group rows in aggregated files (default: first, with a warning)")
+    batch.add_argument("--correction", choices=PVALUE_CORRECTIONS,
+                       help="adjust p-values across all experiments: bh or by (false discovery rate) "
+                            "or holm (family-wise error rate); adds p_adj and reject columns")
+    batch.add_argument("--allocation", type=parse_allocation, default=(0.5, 0.5), metavar="A,B",
+                       help="designed split for the sample ratio mismatch check (default: 50,50)")
+    batch.add_argument("--srm-alpha", type=float, default=SRM_ALPHA,
+                       help=f"p-value below which a split is flagged as SRM (default: {SRM_ALPHA})")
+    batch.add_argument("--pattern", default="*.csv", help="file pattern inside directories (default: *.csv)")
+    batch.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    batch.add_argument("--metrics-out", metavar="PATH",
+                       help="record timing spans and counters and write them here as JSON")
+    batch.set_defaults(handler=_run_batch)
+
+    serve = subparsers.add_parser(
+        "serve",
+        help="run the local HTTP analysis service",
+        description="Serve /ztest, /power, /batch and /load as JSON endpoints (see abtest.service).",
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    serve.add_argument("--workers", type=int, default=16,
+                       help="connections served concurrently (default: 16)")
+    serve.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    serve.add_argument("--metrics", action="store_true",
+                       help="record timing spans and counters, served at GET /metrics")
+    serve.set_defaults(handler=_run_serve)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point for ``python -m abtest``; returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
@@ -0,0 +1,640 @@
+"""
+Continuous metrics: Welch t-tests from streaming sufficient statistics.
+
+Revenue, time on site and other real-valued metrics are compared with Welch's
+unequal-variance t-test, which needs only each group's count, mean and
+variance. MomentAggregator streams row-level chunks and keeps (n, mean, M2)
+per group and metric, where M2 is the sum of squared deviations from the
+mean. Each chunk's moments are merged in with Chan et al.'s parallel update.
+Unlike a running sum and sum of squares, this does not lose precision when
+the mean is large next to the spread. Per-user values are never held beyond
+the current chunk.
+
+The kernels broadcast like the batch kernels, so one call tests every metric
+of every experiment: concatenate the table() of several aggregators (with an
+experiment_id column) and pass it to analyze_moments.
+
+CupedAggregator adds CUPED variance reduction. It also streams a
+pre-experiment covariate X (e.g. last month's revenue) and its co-moment with
+each metric Y. The adjusted metric is Y - theta * (X - mean X), with the
+pooled theta = cov(X, Y) / var(X). Its mean difference is unbiased, because X
+is independent of assignment, and its variance is smaller by a factor of
+1 - corr(X, Y)^2.
+
+Example:
+    moments = load_moments("revenue.csv", ["revenue", "seconds_on_site"])
+    results = analyze_moments(moments.table())
+
+    cuped = load_cuped("exposures.csv", covariate="pre_revenue", metrics=["converted"])
+    result = cuped.ztest()  # {"z", "p", "lift", "ci", "theta", "variance_reduction"}
+
+RatioAggregator covers ratio metrics such as revenue per session over
+user-level rows: it streams numerator and denominator moments and their
+co-moment, and applies the delta method.
+
+    ratios = load_ratios("users.csv", {"revenue_per_session": ("revenue", "sessions")})
+    results = analyze_moments(ratios.table(), test="z")
+"""
+
+import functools
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+from .core import iter_csv_chunks
+from .instrument import span, timed
+from .memory import SizeLike
+
+
+def _merge_moments(n1, mean1, m2_1, n2, mean2, m2_2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Chan et al.'s pairwise update of (n, mean, M2), element-wise."""
+    n = n1 + n2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(n > 0, n2 / n, 0.0)
+    delta = mean2 - mean1
+    return n, mean1 + delta * weight, m2_1 + m2_2 + delta ** 2 * n1 * weight
+
+
+def _merge_comoments(first: Tuple[np.ndarray, ...], second: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+    """Chan's update of (n, mean_x, m2_x, mean_y, m2_y, c_xy), element-wise."""
+    n1, mean_x1, m2_x1, mean_y1, m2_y1, c1 = first
+    n2, mean_x2, m2_x2, mean_y2, m2_y2, c2 = second
+    n, mean_x, m2_x = _merge_moments(n1, mean_x1, m2_x1, n2, mean_x2, m2_x2)
+    _, mean_y, m2_y = _merge_moments(n1, mean_y1, m2_y1, n2, mean_y2, m2_y2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(n > 0, n2 / n, 0.0)
+    c = c1 + c2 + (mean_x2 - mean_x1) * (mean_y2 - mean_y1) * n1 * weight
+    return n, mean_x, m2_x, mean_y, m2_y, c
+
+
+def _check_numeric(chunk, columns: Sequence[str]) -> None:
+    import pandas as pd
+
+    for column in columns:
+        if not pd.api.types.is_numeric_dtype(chunk[column]):
+            raise ValueError(f"Metric column '{column}' must be numeric")
+
+
+class MomentAggregator:
+    """
+    Streaming per-group count, mean and variance of continuous metric columns.
+
+    Feed it DataFrame chunks with a ``group`` column and the metric columns
+    via update(). Memory use is three floats per group and metric, however
+    many rows are seen. Missing metric values are skipped, so each metric has
+    its own count. Shards can be combined with merge().
+
+    Args:
+        metrics: Names of the numeric metric columns
+
+    Raises:
+        ValueError: If no metrics are given
+    """
+
+    def __init__(self, metrics: Sequence[str]):
+        self.metrics = list(metrics)
+        if not self.metrics:
+            raise ValueError("At least one metric column is required")
+        self.moments: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.rows = 0
+
+    def _merge_group(self, group: str, n, mean, m2) -> None:
+        if group in self.moments:
+            self.moments[group] = _merge_moments(*self.moments[group], n, mean, m2)
+        else:
+            self.moments[group] = (n, mean, m2)
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+
+        Raises:
+            ValueError: If a metric column is not numeric
+        """
+        with span("validate"):
+            _check_numeric(chunk, self.metrics)
+
+        with span("aggregate"):
+            grouped = chunk[self.metrics].astype(np.float64).groupby(chunk['group'], observed=True, sort=False)
+            counts = grouped.count()
+            means = grouped.mean().fillna(0.0)
+            m2 = grouped.var(ddof=0).fillna(0.0) * counts
+            for group in counts.index:
+                self._merge_group(group, counts.loc[group].to_numpy(dtype=np.float64),
+                                  means.loc[group].to_numpy(), m2.loc[group].to_numpy())
+        self.rows += len(chunk)
+
+    def merge(self, other: "MomentAggregator") -> None:
+        """Fold another aggregator over the same metrics (e.g. another shard) into this one."""
+        if other.metrics != self.metrics:
+            raise ValueError("Cannot merge aggregators over different metrics")
+        for group, (n, mean, m2) in other.moments.items():
+            self._merge_group(group, n, mean, m2)
+        self.rows += other.rows
+
+    def group_stats(self, group: str) -> Dict[str, np.ndarray]:
+        """
+        Per-metric {"n", "mean", "var"} (sample variance, ddof=1) for one group.
+
+        Raises:
+            ValueError: If the group has no rows
+        """
+        if group not in self.moments:
+            raise ValueError(f"Variant {group} data not found in CSV")
+        n, mean, m2 = self.moments[group]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.where(n > 1, m2 / (n - 1), np.nan)
+        return {"n": n, "mean": mean, "var": var}
+
+    def table(self):
+        """
+        One row per metric with n_a, mean_a, var_a, n_b, mean_b and var_b.
+
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        import pandas as pd
+
+        a, b = self.group_stats('A'), self.group_stats('B')
+        return pd.DataFrame({
+            'metric': self.metrics,
+            'n_a': a['n'], 'mean_a': a['mean'], 'var_a': a['var'],
+            'n_b': b['n'], 'mean_b': b['mean'], 'var_b': b['var'],
+        })
+
+
+class _CoMomentAggregator:
+    """
+    Per-group co-moments of paired columns (X, Y), one pair per metric.
+
+    Keeps per group and metric the count, the means of X and Y, their sums
+    of squared deviations and the co-moment sum((X - mean X) * (Y - mean Y)),
+    all merged with Chan's update. Rows where X or Y is missing are skipped
+    for that metric.
+    """
+
+    def __init__(self, metrics: Sequence[str]):
+        self.metrics = list(metrics)
+        if not self.metrics:
+            raise ValueError("At least one metric is required")
+        # group -> (n, mean_x, m2_x, mean_y, m2_y, c_xy), one entry per metric
+        self.moments: Dict[str, Tuple[np.ndarray, ...]] = {}
+        self.rows = 0
+
+    def _merge_group(self, group: str, moments: Tuple[np.ndarray, ...]) -> None:
+        if group in self.moments:
+            self.moments[group] = _merge_comoments(self.moments[group], moments)
+        else:
+            self.moments[group] = moments
+
+    def _add(self, x, y, groups) -> None:
+        """Add paired float DataFrames x and y (columns named after the metrics)."""
+        with span("aggregate"):
+            complete = y.notna() & x.notna()
+            y, x = y.where(complete), x.where(complete)
+
+            def by_group(frame):
+                return frame.groupby(groups, observed=True, sort=False)
+
+            # Deviations from each group's chunk means keep the sums stable
+            dx = x - by_group(x).transform('mean')
+            dy = y - by_group(y).transform('mean')
+            counts = by_group(y).count()
+            mean_x, mean_y = by_group(x).mean().fillna(0.0), by_group(y).mean().fillna(0.0)
+            m2_x, m2_y, c_xy = by_group(dx ** 2).sum(), by_group(dy ** 2).sum(), by_group(dx * dy).sum()
+            for group in counts.index:
+                self._merge_group(group, (
+                    counts.loc[group].to_numpy(dtype=np.float64),
+                    mean_x.loc[group].to_numpy(), m2_x.loc[group].to_numpy(),
+                    mean_y.loc[group].to_numpy(), m2_y.loc[group].to_numpy(),
+                    c_xy.loc[group].to_numpy(),
+                ))
+        self.rows += len(groups)
+
+    def _merge_from(self, other: "_CoMomentAggregator") -> None:
+        for group, moments in other.moments.items():
+            self._merge_group(group, moments)
+        self.rows += other.rows
+
+    def _variants(self) -> Tuple[Tuple[np.ndarray, ...], Tuple[np.ndarray, ...]]:
+        for group in ('A', 'B'):
+            if group not in self.moments:
+                raise ValueError(f"Variant {group} data not found in CSV")
+        return self.moments['A'], self.moments['B']
+
+    def _pooled(self) -> Tuple[np.ndarray, ...]:
+        if not self.moments:
+            raise ValueError("No data aggregated")
+        return functools.reduce(_merge_comoments, self.moments.values())
+
+
+class CupedAggregator(_CoMomentAggregator):
+    """
+    Streaming CUPED moments: each metric's moments plus its co-moment with a covariate.
+
+    Feed it DataFrame chunks with ``group``, the metric columns and the
+    covariate column via update(). Rows where a metric or the covariate is
+    missing are skipped for that metric.
+
+    Args:
+        metrics: Names of the numeric metric columns (e.g. ["converted"])
+        covariate: Pre-experiment covariate column, measured before assignment
+
+    Raises:
+        ValueError: If no metrics are given
+    """
+
+    def __init__(self, metrics: Sequence[str], covariate: str):
+        super().__init__(metrics)
+        self.covariate = covariate
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+
+        Raises:
+            ValueError: If a metric or the covariate column is not numeric
+        """
+        import pandas as pd
+
+        with span("validate"):
+            _check_numeric(chunk, [*self.metrics, self.covariate])
+        y = chunk[self.metrics].astype(np.float64)
+        x = pd.DataFrame({metric: chunk[self.covariate] for metric in self.metrics}, dtype=np.float64)
+        self._add(x, y, chunk['group'])
+
+    def merge(self, other: "CupedAggregator") -> None:
+        """Fold another aggregator over the same metrics and covariate into this one."""
+        if other.metrics != self.metrics or other.covariate != self.covariate:
+            raise ValueError("Cannot merge aggregators over different metrics or covariates")
+        self._merge_from(other)
+
+    def theta(self) -> np.ndarray:
+        """Per-metric regression coefficient cov(X, Y) / var(X), pooled over all groups."""
+        _, _, m2_x, _, _, c_xy = self._pooled()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(m2_x > 0, c_xy / m2_x, 0.0)
+
+    def table(self):
+        """
+        One row per metric with the CUPED-adjusted moments.
+
+        The columns n_a, mean_a, var_a, n_b, mean_b and var_b describe the
+        adjusted metric, so the table can go straight to analyze_moments.
+        Also includes theta and variance_reduction (the share of the metric's
+        within-group variance removed by the adjustment).
+
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        import pandas as pd
+
+        variants = self._variants()
+        theta = self.theta()
+        pooled_mean_x = self._pooled()[1]
+        table = {'metric': self.metrics, 'theta': theta}
+        raw_m2 = adjusted_m2 = 0.0
+        for (n, mean_x, m2_x, mean_y, m2_y, c_xy), suffix in zip(variants, ('a', 'b')):
+            m2 = m2_y - 2 * theta * c_xy + theta ** 2 * m2_x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                table[f'n_{suffix}'] = n
+                table[f'mean_{suffix}'] = mean_y - theta * (mean_x - pooled_mean_x)
+                table[f'var_{suffix}'] = np.where(n > 1, np.maximum(m2, 0.0) / (n - 1), np.nan)
+            raw_m2, adjusted_m2 = raw_m2 + m2_y, adjusted_m2 + m2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['variance_reduction'] = np.where(raw_m2 > 0, 1 - adjusted_m2 / raw_m2, 0.0)
+        return pd.DataFrame(table)
+
+    def ztest(self, metric: Optional[str] = None, alpha: float = 0.05) -> Dict[str, float | Tuple[float, float]]:
+        """
+        CUPED-adjusted z-test for one metric, in the shape of ztest_two_prop.
+
+        Args:
+            metric: Metric to test (default: the first one)
+            alpha: Significance level (default: 0.05)
+
+        Returns:
+            Dictionary with z, p, lift (adjusted mean B - mean A) and ci, as
+            returned by ztest_two_prop, plus theta and variance_reduction
+
+        Raises:
+            ValueError: If the metric is unknown, a variant has no rows or
+                fewer than two values, or alpha is invalid
+        """
+        metric = self.metrics[0] if metric is None else metric
+        if metric not in self.metrics:
+            raise ValueError(f"Unknown metric '{metric}'")
+        row = self.table().iloc[self.metrics.index(metric)]
+        result = ztest_means_batch(row['n_a'], row['mean_a'], row['var_a'],
+                                   row['n_b'], row['mean_b'], row['var_b'], alpha=alpha)
+        return {
+            "z": float(result['z']),
+            "p": float(result['p']),
+            "lift": float(result['lift']),
+            "ci": (float(result['ci_lower']), float(result['ci_upper'])),
+            "theta": float(row['theta']),
+            "variance_reduction": float(row['variance_reduction']),
+        }
+
+
+class RatioAggregator(_CoMomentAggregator):
+    """
+    Streaming delta-method moments for ratio metrics over user-level rows.
+
+    For metrics such as revenue per session, the randomization unit is the
+    user, so the sessions of one user are not independent. Each row must be
+    one user's totals (e.g. revenue and sessions). Per group and ratio this
+    keeps the moments of numerator Y and denominator X and their co-moment.
+    The ratio R = mean(Y) / mean(X) then has the delta-method variance
+
+        Var(R) = (var(Y) - 2 R cov(X, Y) + R^2 var(X)) / (n mean(X)^2)
+
+    over n users. Feed chunks via update(). Rows missing either column are
+    skipped for that ratio.
+
+    Args:
+        ratios: Mapping of ratio name to (numerator column, denominator
+            column), e.g. {"revenue_per_session": ("revenue", "sessions")}
+
+    Raises:
+        ValueError: If no ratios are given
+    """
+
+    def __init__(self, ratios: Mapping[str, Tuple[str, str]]):
+        super().__init__(list(ratios))
+        self.ratios = {name: tuple(columns) for name, columns in ratios.items()}
+
+    @property
+    def columns(self) -> List[str]:
+        """All numerator and denominator columns, without repeats."""
+        return list(dict.fromkeys(column for pair in self.ratios.values() for column in pair))
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of user-level rows.
+
+        Raises:
+            ValueError: If a numerator or denominator column is not numeric
+        """
+        import pandas as pd
+
+        with span("validate"):
+            _check_numeric(chunk, self.columns)
+        y = pd.DataFrame({name: chunk[num] for name, (num, _) in self.ratios.items()}, dtype=np.float64)
+        x = pd.DataFrame({name: chunk[den] for name, (_, den) in self.ratios.items()}, dtype=np.float64)
+        self._add(x, y, chunk['group'])
+
+    def merge(self, other: "RatioAggregator") -> None:
+        """Fold another aggregator over the same ratios (e.g. another shard) into this one."""
+        if other.ratios != self.ratios:
+            raise ValueError("Cannot merge aggregators over different ratios")
+        self._merge_from(other)
+
+    def table(self):
+        """
+        One row per ratio with n (users), the ratio and its linearized variance per group.
+
+        The columns are n_a, mean_a, var_a, n_b, mean_b and var_b, where
+        mean_* is the ratio and var_* / n_* its delta-method variance, so the
+        table can go to analyze_moments(table, test="z").
+
+        Raises:
+            ValueError: If either variant has no rows or a denominator mean is
+                zero
+        """
+        import pandas as pd
+
+        table = {'metric': self.metrics}
+        for (n, mean_x, m2_x, mean_y, m2_y, c_xy), suffix in zip(self._variants(), ('a', 'b')):
+            if np.any(mean_x == 0):
+                raise ValueError("Ratio denominators must not average zero")
+            ratio = mean_y / mean_x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                m2 = (m2_y - 2 * ratio * c_xy + ratio ** 2 * m2_x) / mean_x ** 2
+                table[f'n_{suffix}'] = n
+                table[f'mean_{suffix}'] = ratio
+                table[f'var_{suffix}'] = np.where(n > 1, np.maximum(m2, 0.0) / (n - 1), np.nan)
+        return pd.DataFrame(table)
+
+
+@timed("ttest_batch")
+def welch_ttest_batch(n_a, mean_a, var_a, n_b, mean_b, var_b, alpha: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    Welch's unequal-variance t-tests for many comparisons at once.
+
+    Inputs broadcast against each other and every output has the broadcast
+    shape. Results match scipy.stats.ttest_ind(a, b, equal_var=False) on the
+    raw values.
+
+    Args:
+        n_a, mean_a, var_a: Count, mean and sample variance (ddof=1) of
+            variant A, array-like
+        n_b, mean_b, var_b: The same for variant B
+        alpha: Significance level (default: 0.05)
+
+    Returns:
+        Dictionary of arrays:
+            - t: t-statistic (mean_a - mean_b over its standard error, the
+              same sign convention as ztest_two_prop)
+            - df: Welch-Satterthwaite degrees of freedom
+            - p: two-sided p-value
+            - lift: difference in means (mean_b - mean_a)
+            - ci_lower, ci_upper: (1 - alpha) interval for the difference
+
+    Raises:
+        ValueError: If any group has fewer than two values or a negative
+            variance, or alpha is invalid
+    """
+    n_a, mean_a, var_a, n_b, mean_b, var_b = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (n_a, mean_a, var_a, n_b, mean_b, var_b))
+    )
+    if np.any(n_a < 2) or np.any(n_b < 2):
+        raise ValueError("Each group needs at least two values")
+    if np.any(var_a < 0) or np.any(var_b < 0):
+        raise ValueError("Variances cannot be negative")
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+
+    se2_a, se2_b = var_a / n_a, var_b / n_b
+    se = np.sqrt(se2_a + se2_b)
+    diff = mean_b - mean_a
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = -diff / se
+        df = (se2_a + se2_b) ** 2 / (se2_a ** 2 / (n_a - 1) + se2_b ** 2 / (n_b - 1))
+    p = 2 * stats.t.sf(np.abs(t), df)
+    tcrit = stats.t.isf(alpha / 2, df)
+
+    return {
+        "t": t,
+        "df": df,
+        "p": p,
+        "lift": diff,
+        "ci_lower": diff - tcrit * se,
+        "ci_upper": diff + tcrit * se,
+    }
+
+
+@timed("ztest_means_batch")
+def ztest_means_batch(n_a, mean_a, var_a, n_b, mean_b, var_b, alpha: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    Large-sample z-tests for differences in means (or ratios), many at once.
+
+    Like welch_ttest_batch with a normal reference distribution, as used for
+    CUPED-adjusted means and delta-method ratios, whose variances are already
+    large-sample approximations.
+
+    Returns:
+        Dictionary of arrays: z (mean_a - mean_b over its standard error), p,
+        lift (mean_b - mean_a), ci_lower and ci_upper
+
+    Raises:
+        ValueError: If any group has fewer than two values or a negative
+            variance, or alpha is invalid
+    """
+    n_a, mean_a, var_a, n_b, mean_b, var_b = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (n_a, mean_a, var_a, n_b, mean_b, var_b))
+    )
+    if np.any(n_a < 2) or np.any(n_b < 2):
+        raise ValueError("Each group needs at least two values")
+    if np.any(var_a < 0) or np.any(var_b < 0):
+        raise ValueError("Variances cannot be negative")
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+
+    se = np.sqrt(var_a / n_a + var_b / n_b)
+    diff = mean_b - mean_a
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = -diff / se
+    zcrit = stats.norm.isf(alpha / 2)
+
+    return {
+        "z": z,
+        "p": 2 * stats.norm.sf(np.abs(z)),
+        "lift": diff,
+        "ci_lower": diff - zcrit * se,
+        "ci_upper": diff + zcrit * se,
+    }
+
+
+def analyze_moments(moments, alpha: float = 0.05, test: str = 'welch'):
+    """
+    Add test columns to a table of per-group moments.
+
+    Args:
+        moments: DataFrame with columns n_a, mean_a, var_a, n_b, mean_b, var_b
+            (e.g. MomentAggregator.table(); other columns are kept)
+        alpha: Significance level (default: 0.05)
+        test: "welch" (welch_ttest_batch) or "z" (ztest_means_batch, for
+            CUPED and ratio tables) (default: "welch")
+
+    Returns:
+        Copy of ``moments`` with columns p, lift, ci_lower and ci_upper
+        added, plus t and df for "welch" or z for "z"
+
+    Raises:
+        ValueError: If columns are missing, test is unknown or any moments are
+            invalid
+    """
+    kernels = {'welch': welch_ttest_batch, 'z': ztest_means_batch}
+    if test not in kernels:
+        raise ValueError(f"Unknown test '{test}'; expected one of {', '.join(kernels)}")
+    required = ['n_a', 'mean_a', 'var_a', 'n_b', 'mean_b', 'var_b']
+    missing = [col for col in required if col not in moments.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    result = moments.copy()
+    arrays = [result[col].to_numpy(dtype=np.float64) for col in required]
+    for key, values in kernels[test](*arrays, alpha=alpha).items():
+        result[key] = values
+    return result
+
+
+def load_moments(filepath, metrics: Sequence[str], chunksize: Optional[int] = None,
+                 max_memory: Optional[SizeLike] = None) -> MomentAggregator:
+    """
+    Stream a row-level CSV of continuous metrics into a MomentAggregator.
+
+    Args:
+        filepath: Path to the CSV file or a readable file object, with a
+            ``group`` column and one column per metric
+        metrics: Metric columns to aggregate
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget for parsing, in bytes or as a size
+            string such as "2GB"
+
+    Returns:
+        MomentAggregator; call table() for per-metric moments
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If columns are missing or a metric is not numeric
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = MomentAggregator(metrics)
+    for chunk in iter_csv_chunks(filepath, ['group', *aggregator.metrics], chunksize, max_memory,
+                                 dtype={'group': 'category'}):
+        aggregator.update(chunk)
+    return aggregator
+
+
+def load_cuped(filepath, covariate: str, metrics: Sequence[str] = ('converted',), chunksize: Optional[int] = None,
+               max_memory: Optional[SizeLike] = None) -> CupedAggregator:
+    """
+    Stream a row-level CSV with a pre-experiment covariate into a CupedAggregator.
+
+    Args:
+        filepath: Path to the CSV file or a readable file object, with
+            ``group``, the metric columns and the covariate column
+        covariate: Pre-experiment covariate column
+        metrics: Metric columns to adjust (default: ["converted"])
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget for parsing, in bytes or as a size
+            string such as "2GB"
+
+    Returns:
+        CupedAggregator; call ztest() or table()
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If columns are missing or not numeric
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = CupedAggregator(metrics, covariate)
+    columns = ['group', *dict.fromkeys([*aggregator.metrics, covariate])]
+    for chunk in iter_csv_chunks(filepath, columns, chunksize, max_memory, dtype={'group': 'category'}):
+        aggregator.update(chunk)
+    return aggregator
+
+
+def load_ratios(filepath, ratios: Mapping[str, Tuple[str, str]], chunksize: Optional[int] = None,
+                max_memory: Optional[SizeLike] = None) -> RatioAggregator:
+    """
+    Stream a user-level CSV into a RatioAggregator.
+
+    Args:
+        filepath: Path to the CSV file or a readable file object, with a
+            ``group`` column and the numerator and denominator columns, one
+            row per user
+        ratios: Mapping of ratio name to (numerator, denominator) columns
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget for parsing, in bytes or as a size
+            string such as "2GB"
+
+    Returns:
+        RatioAggregator; pass its table() to analyze_moments(table, test="z")
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If columns are missing or not numeric
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = RatioAggregator(ratios)
+    for chunk in iter_csv_chunks(filepath, ['group', *aggregator.columns], chunksize, max_memory,
+                                 dtype={'group': 'category'}):
+        aggregator.update(chunk)
+    return aggregator
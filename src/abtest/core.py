@@ -0,0 +1,910 @@
+"""
+A/B Test Statistical Analysis Functions
+
+This module provides functions for analyzing A/B test results using two-proportion
+z-tests and power analysis, plus the CSV loaders that feed them.
+"""
+
+import warnings
+from contextlib import nullcontext
+
+import numpy as np
+from scipy import stats
+from statsmodels.stats.proportion import proportions_ztest, power_proportions_2indep
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from .dedup import DEDUP_MODES, UserDeduplicator
+from .instrument import count, span, timed
+from .intervals import diff_interval
+from .memory import PeakMemoryTracker, SizeLike, estimate_row_bytes, line_width, parse_size, split_budget
+
+# Rows per chunk when a loader streams a CSV without an explicit chunksize
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# With a memory budget and no chunksize, the first chunk has this many rows and
+# later chunks are sized from the bytes per row measured so far
+AUTO_SAMPLE_ROWS = 10_000
+AUTO_MIN_CHUNKSIZE = 1_000
+AUTO_MAX_CHUNKSIZE = 10_000_000
+
+# Columns a row-level load actually parses; user_id is only checked in the header
+ROW_LEVEL_COLUMNS = ['user_id', 'group', 'converted']
+ROW_LEVEL_DTYPES = {'group': 'category'}
+# How load_aggregated_data treats several rows for one group
+AGGREGATED_DUPLICATES = ('first', 'sum', 'error')
+
+# Deduplication needs user_id too, read as strings so chunks agree on its type
+DEDUP_DTYPES = {'user_id': str, 'group': 'category'}
+
+
+def _validate_counts(success_a: int, total_a: int, success_b: int, total_b: int) -> None:
+    """Raise ValueError if the four A/B counts are not a valid pair of binomial samples."""
+    if total_a <= 0 or total_b <= 0:
+        raise ValueError("Total counts must be positive")
+    if success_a < 0 or success_b < 0:
+        raise ValueError("Success counts cannot be negative")
+    if success_a > total_a or success_b > total_b:
+        raise ValueError("Success counts cannot exceed total counts")
+
+
+@timed("test")
+def ztest_two_prop(success_a: int, total_a: int, success_b: int, total_b: int, alpha: float = 0.05,
+                   ci_method: str = 'wald') -> Dict[str, float | Tuple[float, float]]:
+    """
+    Perform a two-proportion z-test comparing conversion rates between variants A and B.
+    
+    Args:
+        success_a: Number of successes (conversions) in variant A
+        total_a: Total number of trials in variant A
+        success_b: Number of successes (conversions) in variant B
+        total_b: Total number of trials in variant B
+        alpha: Significance level (default: 0.05)
+        ci_method: Interval for the difference: "wald", "newcombe" or
+            "agresti-caffo" (default: "wald"; see abtest.intervals)
+    
+    Returns:
+        Dictionary containing:
+            - z: z-statistic
+            - p: two-sided p-value
+            - lift: difference in proportions (pb - pa)
+            - ci: (1 - alpha) confidence interval for the difference (tuple)
+    
+    Raises:
+        ValueError: If any input is invalid (negative, zero totals, unknown
+            ci_method, etc.)
+    """
+    # Validate inputs
+    _validate_counts(success_a, total_a, success_b, total_b)
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+    
+    count = np.array([success_a, success_b])
+    nobs = np.array([total_a, total_b])
+    
+    # Perform two-sided z-test
+    z, p = proportions_ztest(count, nobs, alternative="two-sided")
+    
+    # Calculate proportions
+    pa, pb = count / nobs
+    
+    # Calculate lift (difference)
+    diff = pb - pa
+    
+    # Calculate confidence interval
+    lower, upper = diff_interval(success_a, total_a, success_b, total_b, alpha, ci_method)
+    ci = (float(lower), float(upper))
+    
+    return {
+        "z": float(z),
+        "p": float(p),
+        "lift": float(diff),
+        "ci": ci
+    }
+
+
+@timed("power")
+def power(n_a: int, n_b: int, p_control: float, min_detectable_diff: float = 0.02, alpha: float = 0.05) -> float:
+    """
+    Compute statistical power for detecting a minimum detectable effect (MDE).
+    
+    Args:
+        n_a: Sample size for control group (variant A)
+        n_b: Sample size for treatment group (variant B)
+        p_control: Control group conversion rate (proportion, 0-1)
+        min_detectable_diff: Minimum detectable effect size (difference in proportions, default: 0.02)
+        alpha: Significance level (default: 0.05)
+    
+    Returns:
+        Statistical power (probability of detecting the effect) as a float between 0 and 1
+    
+    Raises:
+        ValueError: If inputs are invalid
+    """
+    # Validate inputs
+    if n_a <= 0 or n_b <= 0:
+        raise ValueError("Sample sizes must be positive")
+    if not 0 <= p_control <= 1:
+        raise ValueError("Control proportion must be between 0 and 1")
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+    
+    ratio = n_b / n_a
+    res = power_proportions_2indep(
+        diff=min_detectable_diff,
+        prop2=p_control,
+        nobs1=n_a,
+        ratio=ratio,
+        alpha=alpha
+    )
+    return float(res.power)
+
+
+@timed("srm")
+def srm_test(totals, allocation=None) -> Dict[str, float]:
+    """
+    Sample ratio mismatch (SRM) check: chi-square test of the observed split.
+    
+    A split far from the designed allocation (e.g. 50.8% / 49.2% on a million
+    users) means assignment or logging is broken, and the test results cannot
+    be trusted regardless of their p-value.
+    
+    Args:
+        totals: Units observed per arm, e.g. (total_a, total_b) or A/B/n counts
+        allocation: Designed share per arm, in any scale (e.g. (50, 50) or
+            (0.2, 0.4, 0.4)); default: equal split
+    
+    Returns:
+        Dictionary with keys:
+            - chi2: chi-square statistic
+            - p: p-value (k - 1 degrees of freedom)
+    
+    Raises:
+        ValueError: If there are fewer than two arms, counts are negative or
+            all zero, or allocation shares are not positive
+    """
+    totals = np.asarray(totals, dtype=np.float64)
+    allocation = np.ones_like(totals) if allocation is None else np.asarray(allocation, dtype=np.float64)
+    if totals.ndim != 1 or len(totals) < 2:
+        raise ValueError("SRM check needs counts for at least two arms")
+    if allocation.shape != totals.shape:
+        raise ValueError("allocation must have one share per arm")
+    if np.any(totals < 0) or totals.sum() <= 0:
+        raise ValueError("Arm counts must be non-negative and not all zero")
+    if np.any(allocation <= 0):
+        raise ValueError("Allocation shares must be positive")
+    
+    expected = totals.sum() * allocation / allocation.sum()
+    chi2, p = stats.chisquare(totals, expected)
+    return {'chi2': float(chi2), 'p': float(p)}
+
+
+@timed("bootstrap")
+def bootstrap_lift_ci(success_a: int, total_a: int, success_b: int, total_b: int, alpha: float = 0.05,
+                      n_resamples: int = 10000, seed: Optional[int] = None,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      batch_size: int = 100000) -> Dict[str, float | int | Tuple[float, float]]:
+    """
+    Parametric bootstrap confidence interval for the lift (pb - pa).
+    
+    Resamples both variants from Binomial(total, observed rate) in batches and
+    takes percentile bounds of the simulated differences. Unlike the Wald
+    interval this does not rely on the normal approximation, at the cost of
+    being much slower for large n_resamples.
+    
+    Args:
+        success_a: Number of successes (conversions) in variant A
+        total_a: Total number of trials in variant A
+        success_b: Number of successes (conversions) in variant B
+        total_b: Total number of trials in variant B
+        alpha: Significance level (default: 0.05)
+        n_resamples: Number of bootstrap resamples (default: 10000)
+        seed: Seed for the random generator (default: None)
+        progress: Optional callback called as progress(done, n_resamples) after
+            each batch; it may raise to abort the computation
+        batch_size: Resamples drawn per batch (default: 100000)
+    
+    Returns:
+        Dictionary containing:
+            - lift: observed difference in proportions (pb - pa)
+            - ci: (1 - alpha) percentile interval for the difference (tuple)
+            - n_resamples: number of resamples used
+    
+    Raises:
+        ValueError: If any input is invalid
+    """
+    _validate_counts(success_a, total_a, success_b, total_b)
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+    if n_resamples <= 0 or batch_size <= 0:
+        raise ValueError("n_resamples and batch_size must be positive")
+    
+    rng = np.random.default_rng(seed)
+    pa = success_a / total_a
+    pb = success_b / total_b
+    
+    diffs = np.empty(n_resamples)
+    for start in range(0, n_resamples, batch_size):
+        stop = min(start + batch_size, n_resamples)
+        size = stop - start
+        diffs[start:stop] = rng.binomial(total_b, pb, size) / total_b - rng.binomial(total_a, pa, size) / total_a
+        if progress is not None:
+            progress(stop, n_resamples)
+    
+    lower, upper = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    return {
+        "lift": float(pb - pa),
+        "ci": (float(lower), float(upper)),
+        "n_resamples": int(n_resamples)
+    }
+
+
+def load_aggregated_data(filepath: str, duplicates: str = 'first') -> Tuple[int, int, int, int]:
+    """
+    Load aggregated A/B test data from CSV file.
+    
+    Expected CSV format:
+        group,success,total
+        A,123,5000
+        B,155,5000
+    
+    Args:
+        filepath: Path to the CSV file
+        duplicates: What to do with several rows for one group: "first" uses
+            the first row and warns, "sum" adds them up (e.g. per-day
+            exports), "error" raises ValueError (default: "first")
+    
+    Returns:
+        Tuple of (success_a, total_a, success_b, total_b)
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid, missing expected groups, or a
+            group repeats with ``duplicates="error"``
+    """
+    if duplicates not in AGGREGATED_DUPLICATES:
+        raise ValueError(f"Unknown duplicates mode '{duplicates}'; expected one of {', '.join(AGGREGATED_DUPLICATES)}")
+    import pandas as pd
+    
+    with span("read"):
+        try:
+            df = pd.read_csv(filepath)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {filepath}")
+    count("rows_read", len(df))
+    
+    with span("validate"):
+        # Validate required columns
+        required_cols = ['group', 'success', 'total']
+        missing_cols = [col for col in required_cols if col not in df.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        
+        # Extract data for variants A and B
+        group_a = df[df['group'] == 'A']
+        group_b = df[df['group'] == 'B']
+        
+        if len(group_a) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if len(group_b) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        
+        repeated = [name for name, rows in (('A', group_a), ('B', group_b)) if len(rows) > 1]
+        if repeated and duplicates == 'error':
+            raise ValueError(f"Multiple rows for group(s) {repeated}")
+        if duplicates == 'sum':
+            success_a, total_a = (int(v) for v in group_a[['success', 'total']].sum())
+            success_b, total_b = (int(v) for v in group_b[['success', 'total']].sum())
+        else:
+            if repeated:
+                warnings.warn(
+                    f"Multiple rows for group(s) {repeated}; using the first row of each "
+                    f"(pass duplicates='sum' to add them up)",
+                    stacklevel=2,
+                )
+            success_a = int(group_a.iloc[0]['success'])
+            total_a = int(group_a.iloc[0]['total'])
+            success_b = int(group_b.iloc[0]['success'])
+            total_b = int(group_b.iloc[0]['total'])
+        
+        # Validate data
+        if success_a < 0 or success_b < 0:
+            raise ValueError("Success counts cannot be negative")
+        if total_a <= 0 or total_b <= 0:
+            raise ValueError("Total counts must be positive")
+        if success_a > total_a or success_b > total_b:
+            raise ValueError("Success counts cannot exceed total counts")
+    
+    return success_a, total_a, success_b, total_b
+
+
+def load_counts(filepath, chunksize: Optional[int] = None, max_memory: Optional[SizeLike] = None,
+                dedup: Optional[str] = None, duplicates: str = 'first') -> Tuple[int, int, int, int]:
+    """
+    Load A/B counts from an aggregated or row-level CSV, detected from its header.
+    
+    Args:
+        filepath: Path to the CSV file or a seekable file object
+        chunksize: Rows per chunk when streaming a row-level file (default: None,
+            read whole file, or sized from max_memory)
+        max_memory: Optional memory budget for a row-level load, in bytes or as
+            a size string such as "2GB" (see load_row_level_data)
+        dedup: For row-level files, None (count rows), "first" or "any"
+            (count each user once; see load_row_level_data)
+        duplicates: For aggregated files, "first", "sum" or "error" when a
+            group has several rows (see load_aggregated_data)
+    
+    Returns:
+        Tuple of (success_a, total_a, success_b, total_b)
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If the header matches neither format or the data is invalid
+        MemoryError: If a parsed row-level chunk exceeds ``max_memory``
+    """
+    import pandas as pd
+    
+    try:
+        columns = set(pd.read_csv(filepath, nrows=0).columns)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {filepath}")
+    if hasattr(filepath, 'seek'):
+        filepath.seek(0)
+    
+    if {'group', 'success', 'total'} <= columns:
+        return load_aggregated_data(filepath, duplicates=duplicates)
+    if {'user_id', 'group', 'converted'} <= columns:
+        return load_row_level_data(filepath, chunksize=chunksize, max_memory=max_memory, dedup=dedup)
+    raise ValueError(
+        "Invalid CSV format. Expected columns: group, success, total (aggregated) "
+        "or user_id, group, converted (row-level)"
+    )
+
+
+class RowLevelAggregator:
+    """
+    Streaming aggregator turning row-level chunks into per-group counts.
+    
+    Feed it DataFrame chunks with ``group`` and ``converted`` columns via
+    update(); only per-group totals are kept, so memory use is independent of
+    the number of rows seen.
+    
+    Example:
+        agg = RowLevelAggregator()
+        for chunk in pd.read_csv(path, chunksize=100_000):
+            agg.update(chunk)
+        success_a, total_a, success_b, total_b = agg.counts()
+    """
+    
+    def __init__(self):
+        self.successes: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}
+        self.rows = 0
+    
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows to the running counts.
+        
+        Raises:
+            ValueError: If the converted column contains values other than 0 or 1
+        """
+        with span("validate"):
+            if not chunk['converted'].isin([0, 1]).all():
+                raise ValueError("Converted column must contain only 0 or 1 values")
+        
+        with span("aggregate"):
+            grouped = chunk['converted'].groupby(chunk['group'], sort=False).agg(['sum', 'size'])
+            for group, success, total in zip(grouped.index, grouped['sum'], grouped['size']):
+                self.successes[group] = self.successes.get(group, 0) + int(success)
+                self.totals[group] = self.totals.get(group, 0) + int(total)
+        self.rows += len(chunk)
+    
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Return (success_a, total_a, success_b, total_b) for the rows seen so far.
+        
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        if self.totals.get('A', 0) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if self.totals.get('B', 0) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        return self.successes['A'], self.totals['A'], self.successes['B'], self.totals['B']
+
+
+class KeyedRowLevelAggregator:
+    """
+    Streaming per-(key, group) counts, e.g. per stratum, cluster or experiment.
+    
+    Like RowLevelAggregator, but keeps separate counts for every value of the
+    ``key`` column. Each chunk is reduced with one groupby and folded into the
+    running totals, so memory use depends on the number of keys, not rows.
+    Key and group labels are kept as strings.
+    
+    Args:
+        key: Column to split the counts by
+    """
+    
+    def __init__(self, key: str):
+        self.key = key
+        self._totals = None
+        self.rows = 0
+    
+    def _fold(self, part) -> None:
+        import pandas as pd
+        
+        if self._totals is None:
+            self._totals = part
+        else:
+            self._totals = pd.concat([self._totals, part]).groupby(level=[0, 1], sort=False).sum()
+    
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+        
+        Raises:
+            ValueError: If converted contains values other than 0 or 1, or the
+                key column has missing values
+        """
+        import pandas as pd
+        
+        with span("validate"):
+            if not chunk['converted'].isin([0, 1]).all():
+                raise ValueError("Converted column must contain only 0 or 1 values")
+            if chunk[self.key].isna().any():
+                raise ValueError(f"{self.key} has missing values")
+        
+        with span("aggregate"):
+            part = chunk['converted'].groupby([chunk[self.key], chunk['group']],
+                                              observed=True, sort=False).agg(['sum', 'size'])
+            # Labels as strings, so chunks (and shards) with different
+            # categories or inferred types line up
+            part.index = pd.MultiIndex.from_arrays(
+                [part.index.get_level_values(i).astype(str) for i in (0, 1)]
+            )
+            self._fold(part)
+        self.rows += len(chunk)
+    
+    def merge(self, other: "KeyedRowLevelAggregator") -> None:
+        """Fold another aggregator over the same key (e.g. another shard) into this one."""
+        if other._totals is not None:
+            self._fold(other._totals.copy())
+        self.rows += other.rows
+    
+    def table(self):
+        """
+        One row per key with columns key, success_a, total_a, success_b, total_b.
+        
+        Keys seen in only one variant have zeros for the other.
+        
+        Raises:
+            ValueError: If no rows were aggregated
+        """
+        import pandas as pd
+        
+        if self._totals is None:
+            raise ValueError("No data aggregated")
+        wide = self._totals.unstack(level=1, fill_value=0)
+        table = pd.DataFrame({self.key: wide.index.to_numpy()})
+        for group, suffix in (('A', 'a'), ('B', 'b')):
+            for stat, name in (('sum', 'success'), ('size', 'total')):
+                table[f'{name}_{suffix}'] = wide[(stat, group)].to_numpy() if (stat, group) in wide.columns else 0
+        return table
+    
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Return (success_a, total_a, success_b, total_b) summed over all keys.
+        
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        table = self.table()
+        result = tuple(int(table[col].sum()) for col in ('success_a', 'total_a', 'success_b', 'total_b'))
+        if result[1] == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if result[3] == 0:
+            raise ValueError("Variant B data not found in CSV")
+        return result
+
+
+class MultiMetricAggregator:
+    """
+    Streaming per-group counts for several binary metrics at once.
+    
+    Like RowLevelAggregator, but for a list of 0/1 metric columns (e.g.
+    signup, add_to_cart, purchase) read in the same pass. Each chunk is reduced
+    with one groupby over all metric columns, so a dozen goals cost one scan of
+    the file instead of one per metric.
+    
+    Args:
+        metrics: Names of the binary metric columns
+    
+    Raises:
+        ValueError: If no metrics are given or a name is repeated
+    """
+    
+    def __init__(self, metrics: Sequence[str]):
+        self.metrics = list(metrics)
+        if not self.metrics:
+            raise ValueError("At least one metric is required")
+        if len(set(self.metrics)) != len(self.metrics):
+            raise ValueError("Metric names must be unique")
+        self._successes = None
+        self._totals = None
+        self.rows = 0
+    
+    def _fold(self, successes, totals) -> None:
+        if self._successes is None:
+            self._successes, self._totals = successes, totals
+        else:
+            self._successes = self._successes.add(successes, fill_value=0)
+            self._totals = self._totals.add(totals, fill_value=0)
+    
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows to the running counts.
+        
+        Raises:
+            ValueError: If a metric column contains values other than 0 or 1
+        """
+        with span("validate"):
+            values = chunk[self.metrics].to_numpy()
+            bad = ~((values == 0) | (values == 1)).all(axis=0)
+            if bad.any():
+                raise ValueError(f"Metric columns must contain only 0 or 1 values: "
+                                 f"{[m for m, b in zip(self.metrics, bad) if b]}")
+        
+        with span("aggregate"):
+            groups = chunk['group'].astype(str)
+            successes = chunk[self.metrics].groupby(groups, sort=False).sum()
+            totals = groups.value_counts(sort=False)
+            self._fold(successes, totals)
+        self.rows += len(chunk)
+    
+    def merge(self, other: "MultiMetricAggregator") -> None:
+        """Fold another aggregator over the same metrics (e.g. another shard) into this one."""
+        if other.metrics != self.metrics:
+            raise ValueError("Cannot merge aggregators over different metrics")
+        if other._successes is not None:
+            self._fold(other._successes, other._totals)
+        self.rows += other.rows
+    
+    def table(self):
+        """
+        One row per metric with columns metric, success_a, total_a, success_b, total_b.
+        
+        The result feeds analyze_counts directly, testing every metric in one
+        vectorized call.
+        
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        import pandas as pd
+        
+        totals = self._totals if self._totals is not None else pd.Series(dtype=np.int64)
+        if totals.get('A', 0) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if totals.get('B', 0) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        return pd.DataFrame({
+            'metric': self.metrics,
+            'success_a': self._successes.loc['A'].to_numpy(dtype=np.int64),
+            'total_a': int(totals['A']),
+            'success_b': self._successes.loc['B'].to_numpy(dtype=np.int64),
+            'total_b': int(totals['B']),
+        })
+
+
+def iter_csv_chunks(filepath, required_cols, chunksize: Optional[int] = DEFAULT_CHUNKSIZE,
+                    max_memory: Optional[SizeLike] = None, usecols=None, dtype=None) -> Iterator:
+    """
+    Stream a CSV as DataFrame chunks restricted to ``required_cols``.
+    
+    Only one chunk is materialized at a time. Columns are validated against the
+    header before any data rows are parsed.
+    
+    With ``chunksize=None`` and a ``max_memory`` budget, chunk sizes are chosen
+    automatically: the first chunk has AUTO_SAMPLE_ROWS rows, and each later
+    chunk is sized so that parsing it stays within the budget, using the
+    largest bytes per row seen so far and the file's line width (see
+    abtest.memory.estimate_row_bytes).
+    
+    Args:
+        filepath: Path to the CSV file or a readable binary/text file object
+        required_cols: Columns that must be present in the header
+        chunksize: Rows per chunk (default: DEFAULT_CHUNKSIZE; None to size
+            chunks from max_memory)
+        max_memory: Optional memory budget in bytes or as a size string such
+            as "2GB"; a single parsed chunk larger than this is an error
+        usecols: Subset of ``required_cols`` to parse (default: all of them)
+        dtype: Optional dtypes passed to pandas.read_csv
+    
+    Yields:
+        pandas DataFrames of at most ``chunksize`` rows
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If required columns are missing, chunksize is not positive
+            or max_memory is not a valid size
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    import pandas as pd
+    
+    if max_memory is not None:
+        max_memory = parse_size(max_memory)
+    adaptive = chunksize is None and max_memory is not None
+    if chunksize is None:
+        chunksize = AUTO_SAMPLE_ROWS if adaptive else DEFAULT_CHUNKSIZE
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive")
+    line_bytes = line_width(filepath) if adaptive else None
+    
+    # The usecols callable sees every header name, so unparsed required
+    # columns are validated too
+    header = set()
+    wanted = set(required_cols if usecols is None else usecols)
+    try:
+        reader = pd.read_csv(filepath, chunksize=chunksize, dtype=dtype,
+                             usecols=lambda col: header.add(col) or col in wanted)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {filepath}")
+    
+    with reader:
+        missing_cols = [col for col in required_cols if col not in header]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        
+        row_bytes = 0.0
+        while True:
+            with span("read"):
+                try:
+                    chunk = reader.get_chunk(chunksize)
+                except StopIteration:
+                    break
+            count("rows_read", len(chunk))
+            if max_memory is not None:
+                with span("validate"):
+                    used = int(chunk.memory_usage(deep=True).sum())
+                    if used > max_memory:
+                        raise MemoryError(
+                            f"CSV chunk of {len(chunk):,} rows uses {used:,} bytes, above the "
+                            f"max_memory ceiling of {max_memory:,} bytes; lower chunksize or raise max_memory"
+                        )
+                if adaptive and len(chunk):
+                    row_bytes = max(row_bytes, used / len(chunk))
+                    fitting = int(max_memory / estimate_row_bytes(row_bytes, line_bytes))
+                    chunksize = min(max(fitting, AUTO_MIN_CHUNKSIZE), AUTO_MAX_CHUNKSIZE)
+            yield chunk
+
+
+def _stream_row_level(filepath, chunksize: Optional[int], max_memory: Optional[SizeLike],
+                      stats: Optional[Dict[str, int]] = None, dedup: Optional[str] = None,
+                      spill_dir: Optional[str] = None) -> Tuple[int, int, int, int]:
+    """Aggregate a row-level CSV chunk by chunk, optionally recording chunk statistics."""
+    if dedup is None:
+        aggregator = RowLevelAggregator()
+        chunks = iter_csv_chunks(filepath, ROW_LEVEL_COLUMNS, chunksize, max_memory,
+                                 usecols=['group', 'converted'], dtype=ROW_LEVEL_DTYPES)
+    else:
+        parse_memory, dedup_memory = split_budget(max_memory)
+        aggregator = UserDeduplicator(dedup, max_memory=dedup_memory, spill_dir=spill_dir)
+        chunks = iter_csv_chunks(filepath, ROW_LEVEL_COLUMNS, chunksize, parse_memory, dtype=DEDUP_DTYPES)
+    with aggregator if dedup is not None else nullcontext():
+        for chunk in chunks:
+            aggregator.update(chunk)
+            if stats is not None:
+                stats['chunks'] += 1
+                stats['max_chunk_rows'] = max(stats['max_chunk_rows'], len(chunk))
+                stats['max_chunk_bytes'] = max(stats['max_chunk_bytes'], int(chunk.memory_usage(deep=True).sum()))
+        counts = aggregator.counts()
+    if stats is not None:
+        stats['rows'] = aggregator.rows
+        if dedup is not None:
+            stats['spilled_rows'] = aggregator.spilled_rows
+    return counts
+
+
+def load_row_level_data(filepath, chunksize: Optional[int] = None, max_memory: Optional[SizeLike] = None,
+                        dedup: Optional[str] = None, spill_dir: Optional[str] = None) -> Tuple[int, int, int, int]:
+    """
+    Load row-level A/B test data from CSV and aggregate to counts.
+    
+    Expected CSV format:
+        user_id,group,converted
+        u1,A,0
+        u2,B,1
+    
+    With ``chunksize`` or ``max_memory`` set, the file is streamed through a
+    RowLevelAggregator one chunk at a time instead of being loaded whole, with
+    ``group`` parsed as a categorical and ``user_id`` checked in the header but
+    not parsed. Given only ``max_memory``, chunk sizes are chosen to fit the
+    budget (see iter_csv_chunks).
+    
+    Rows are counted as they are unless ``dedup`` is set, in which case each
+    user_id is counted once (see abtest.dedup): ``"first"`` keeps the user's
+    first row in file order, ``"any"`` counts them in the group of their first
+    row and as converted if any of their rows converted. Deduplication streams
+    the file and spills hash partitions to ``spill_dir`` once its records
+    outgrow their budget (default 1 GiB), so logs larger than RAM work. With
+    ``max_memory`` set, a quarter of it sizes the parsed chunks and the rest
+    the deduplication records (see memory.split_budget), so the two together
+    stay within ``max_memory``.
+    
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        chunksize: Rows per chunk for streaming (default: None, read whole file,
+            or sized from max_memory)
+        max_memory: Optional memory budget in bytes or as a size string such
+            as "2GB"
+        dedup: None (count rows), "first" or "any" (count users)
+        spill_dir: Directory for deduplication spill files (default: system temp)
+    
+    Returns:
+        Tuple of (success_a, total_a, success_b, total_b)
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    import pandas as pd
+    
+    required_cols = ROW_LEVEL_COLUMNS
+    
+    if dedup is not None and dedup not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode '{dedup}'; expected one of {', '.join(DEDUP_MODES)}")
+    if chunksize is not None or max_memory is not None or dedup is not None:
+        return _stream_row_level(filepath, chunksize, max_memory, dedup=dedup, spill_dir=spill_dir)
+    
+    with span("read"):
+        try:
+            df = pd.read_csv(filepath)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {filepath}")
+    count("rows_read", len(df))
+    
+    # Validate required columns
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    
+    with span("aggregate"):
+        # Filter for variants A and B
+        group_a = df[df['group'] == 'A']
+        group_b = df[df['group'] == 'B']
+        
+        if len(group_a) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if len(group_b) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        
+        # Aggregate counts
+        total_a = len(group_a)
+        success_a = int(group_a['converted'].sum())
+        total_b = len(group_b)
+        success_b = int(group_b['converted'].sum())
+    
+    with span("validate"):
+        # Validate converted values are 0 or 1
+        if not df['converted'].isin([0, 1]).all():
+            raise ValueError("Converted column must contain only 0 or 1 values")
+    
+    return success_a, total_a, success_b, total_b
+
+
+def load_row_level_report(filepath, max_memory: Optional[SizeLike] = None, chunksize: Optional[int] = None,
+                          trace: bool = True, dedup: Optional[str] = None,
+                          spill_dir: Optional[str] = None) -> Tuple[Tuple[int, int, int, int], Dict[str, object]]:
+    """
+    Stream a row-level CSV like load_row_level_data and report its memory use.
+    
+    Peak usage is measured with a PeakMemoryTracker around the whole load.
+    
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        max_memory: Memory budget in bytes or as a size string such as "2GB"
+            (default: None, fixed chunks of ``chunksize`` rows)
+        chunksize: Rows per chunk (default: None, sized from max_memory, or
+            DEFAULT_CHUNKSIZE without a budget)
+        trace: Measure the tracemalloc peak as well as RSS; slows the load
+            (default: True)
+        dedup: None, "first" or "any" (see load_row_level_data)
+        spill_dir: Directory for deduplication spill files
+    
+    Returns:
+        Tuple of (counts, report). counts is (success_a, total_a, success_b,
+        total_b); report has max_memory, rows, chunks, max_chunk_rows,
+        max_chunk_bytes (largest parsed chunk), and the PeakMemoryTracker
+        fields peak_traced_bytes, baseline_rss_bytes, peak_rss_bytes and
+        rss_growth_bytes; with dedup also spilled_rows
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    if max_memory is not None:
+        max_memory = parse_size(max_memory)
+    stats = {'rows': 0, 'chunks': 0, 'max_chunk_rows': 0, 'max_chunk_bytes': 0}
+    with PeakMemoryTracker(trace=trace) as tracker:
+        counts = _stream_row_level(filepath, chunksize, max_memory, stats, dedup=dedup, spill_dir=spill_dir)
+    return counts, {'max_memory': max_memory, **stats, **tracker.report()}
+
+
+def load_row_level_metrics(filepath, metrics: Sequence[str], chunksize: Optional[int] = None,
+                           max_memory: Optional[SizeLike] = None):
+    """
+    Load row-level data with several binary metric columns in one scan.
+    
+    Expected CSV format:
+        user_id,group,signup,purchase
+        u1,A,1,0
+        u2,B,1,1
+    
+    Only ``group`` and the metric columns are parsed; the file is streamed
+    through a MultiMetricAggregator one chunk at a time.
+    
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        metrics: Names of the 0/1 metric columns to count
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget in bytes or as a size string such
+            as "2GB"
+    
+    Returns:
+        DataFrame with one row per metric and columns metric, success_a,
+        total_a, success_b, total_b; pass it to analyze_counts
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = MultiMetricAggregator(metrics)
+    columns = ['group', *aggregator.metrics]
+    for chunk in iter_csv_chunks(filepath, columns, chunksize, max_memory, dtype=ROW_LEVEL_DTYPES):
+        aggregator.update(chunk)
+    return aggregator.table()
+
+
+def load_row_level_experiments(filepath, experiment_col: str = 'experiment_id', chunksize: Optional[int] = None,
+                               max_memory: Optional[SizeLike] = None):
+    """
+    Load row-level data for many experiments from one file in a single scan.
+    
+    Expected CSV format:
+        experiment_id,user_id,group,converted
+        checkout_v2,u1,A,0
+        new_onboarding,u1,B,1
+    
+    The file is streamed through a KeyedRowLevelAggregator keyed on the
+    experiment column, so memory depends on the number of experiments, not
+    rows. ``user_id`` is checked in the header but not parsed.
+    
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        experiment_col: Column identifying the experiment (default:
+            "experiment_id")
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget in bytes or as a size string such
+            as "2GB"
+    
+    Returns:
+        DataFrame with one row per experiment and columns experiment_col,
+        success_a, total_a, success_b, total_b, ready for analyze_counts.
+        Experiments seen in only one variant have zeros for the other; drop
+        them first, as analyze_counts rejects empty variants.
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = KeyedRowLevelAggregator(experiment_col)
+    for chunk in iter_csv_chunks(filepath, ROW_LEVEL_COLUMNS + [experiment_col], chunksize, max_memory,
+                                 usecols=['group', 'converted', experiment_col],
+                                 dtype={**ROW_LEVEL_DTYPES, experiment_col: 'category'}):
+        aggregator.update(chunk)
+    return aggregator.table()
@@ -0,0 +1,336 @@
+"""
+Out-of-core deduplication of row-level exposures by user_id.
+
+Exposure logs often contain several rows per user (page reloads, repeat
+visits). Counting rows then inflates the totals and the variance estimate.
+UserDeduplicator counts each user once, in one of two modes:
+
+- ``"first"``: the user's first row in file order wins (its group and its
+  converted value).
+- ``"any"``: the user is counted in the group of their first row, and
+  converted if any of their rows converted.
+
+Each user_id is reduced to a 128-bit key (two independent 64-bit hashes, so
+the chance of two of 10^9 users colliding is about 10^-21). Records of 19
+bytes per row are buffered in memory until they exceed the memory budget.
+After that they are hash-partitioned by key into spill files on disk. Every
+row of a user lands in the same partition, so each partition is deduplicated
+on its own, and a partition too large for the budget is split again with
+further hash bits. A 500M-row log therefore needs about 9.5 GB of temporary
+disk and only ``max_memory`` of RAM.
+
+Example:
+    with UserDeduplicator(mode="any", max_memory="1GB") as dedup:
+        for chunk in pd.read_csv(path, chunksize=1_000_000, dtype={"user_id": str}):
+            dedup.update(chunk)
+        success_a, total_a, success_b, total_b = dedup.counts()
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .instrument import count, span
+from .memory import SizeLike, parse_size
+
+DEDUP_MODES = ('first', 'any')
+
+# Default memory budget and spill fan-out for deduplication
+DEFAULT_DEDUP_MEMORY = 1024 ** 3
+DEFAULT_PARTITIONS = 64
+
+# Peak bytes per record while a partition is deduplicated (record, sort order,
+# sorted keys and masks), as a multiple of the record size
+WORK_FACTOR = 4
+
+RECORD = np.dtype([('h1', '<u8'), ('h2', '<u8'), ('group', '<u2'), ('converted', 'u1')])
+
+_HASH_KEYS = ('abtest-dedup-k1!', 'abtest-dedup-k2!')
+
+
+def hash_user_ids(user_ids, n_hashes: int = 2) -> Tuple[np.ndarray, ...]:
+    """
+    ``n_hashes`` (1 or 2) independent 64-bit hashes of each user_id, stable
+    across runs and chunks.
+
+    Values are hashed as strings, so 42 and "42" are the same user.
+    """
+    import pandas as pd
+
+    values = np.asarray(user_ids, dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=False) != 'string':
+        values = values.astype(str).astype(object)
+    return tuple(pd.util.hash_array(values, hash_key=key, categorize=False) for key in _HASH_KEYS[:n_hashes])
+
+
+def dedup_records(records: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Deduplicate one array of RECORD rows (in file order) by user key.
+
+    Returns:
+        Tuple of (group codes, converted) with one entry per distinct user
+    """
+    # lexsort is stable, so the first row of each user in sorted order is
+    # also their first row in file order
+    order = np.lexsort((records['h2'], records['h1']))
+    h1, h2 = records['h1'][order], records['h2'][order]
+    new_user = np.empty(len(order), dtype=bool)
+    new_user[:1] = True
+    np.not_equal(h1[1:], h1[:-1], out=new_user[1:])
+    new_user[1:] |= h2[1:] != h2[:-1]
+    starts = np.flatnonzero(new_user)
+    first = order[starts]
+
+    groups = records['group'][first]
+    if mode == 'first':
+        converted = records['converted'][first]
+    else:
+        converted = np.maximum.reduceat(records['converted'][order], starts)
+    return groups, converted
+
+
+def encode_groups(groups, group_codes: Dict[str, int]) -> np.ndarray:
+    """
+    Map group labels to stable uint16 codes, adding new labels to ``group_codes``.
+
+    Raises:
+        ValueError: If there are more distinct groups than uint16 codes
+    """
+    import pandas as pd
+
+    groups = groups.astype('category') if not isinstance(groups.dtype, pd.CategoricalDtype) else groups
+    lookup = np.empty(len(groups.cat.categories), dtype=np.uint16)
+    for i, label in enumerate(groups.cat.categories):
+        code = group_codes.get(label)
+        if code is None:
+            if len(group_codes) >= np.iinfo(np.uint16).max:
+                raise ValueError("Too many distinct groups")
+            code = group_codes[label] = len(group_codes)
+        lookup[i] = code
+    return lookup[groups.cat.codes.to_numpy()]
+
+
+def split_partitions(records: np.ndarray, partitions: int, level: int = 0):
+    """Yield (partition, records) by the ``h1`` hash field, keeping row order within each partition."""
+    ids = (records['h1'] // np.uint64(partitions ** level)) % np.uint64(partitions)
+    order = np.argsort(ids, kind='stable')
+    bounds = np.searchsorted(ids[order], np.arange(partitions + 1))
+    for partition in range(partitions):
+        lo, hi = bounds[partition], bounds[partition + 1]
+        if hi > lo:
+            yield partition, records[order[lo:hi]]
+
+
+def _split_spill_file(path: str, dtype: np.dtype, prefix: str, partitions: int, level: int,
+                      max_memory: int) -> List[int]:
+    """Split one spill file into ``{prefix}-pNNNN.bin`` files by hash level ``level``; return the partitions written."""
+    files = {}
+    try:
+        with open(path, "rb") as f:
+            while True:
+                block = np.fromfile(f, dtype=dtype, count=max(1, max_memory // (WORK_FACTOR * dtype.itemsize)))
+                if not len(block):
+                    break
+                for partition, part in split_partitions(block, partitions, level):
+                    if partition not in files:
+                        files[partition] = open(f"{prefix}-p{partition:04d}.bin", "wb")
+                    part.tofile(files[partition])
+    finally:
+        for f in files.values():
+            f.close()
+    os.remove(path)
+    return list(files)
+
+
+def consume_spill(paths: Dict[str, str], dtypes: Dict[str, np.dtype], consume: Callable[[Dict[str, np.ndarray]], None],
+                  partitions: int, max_memory: int, level: int = 1) -> None:
+    """
+    Pass one spill partition's records to ``consume``, splitting it further if it exceeds the budget.
+
+    ``paths`` holds one file per stream, partitioned by split_partitions
+    below ``level``, and ``dtypes`` their record types. If the files need
+    more than ``max_memory`` to process, each stream is split by hash level
+    ``level`` into a ``.d`` directory next to the first stream's file, and
+    every sub-partition is consumed in turn. Sub-partitions with no records
+    in the first stream are dropped. All files are deleted once consumed.
+    """
+    size = sum(os.path.getsize(path) for path in paths.values())
+    max_level = int(64 // math.log2(partitions))
+    if size * WORK_FACTOR > max_memory and level < max_level:
+        first = next(iter(paths))
+        subdir = paths[first] + ".d"
+        os.mkdir(subdir)
+        written = {stream: set(_split_spill_file(path, dtypes[stream], os.path.join(subdir, stream), partitions,
+                                                 level, max_memory))
+                   for stream, path in paths.items()}
+        found = set().union(*written.values())
+        # One user with more rows than the budget cannot be split further
+        sub_level = level + 1 if len(found) > 1 else max_level
+        for partition in sorted(found):
+            sub_paths = {stream: os.path.join(subdir, f"{stream}-p{partition:04d}.bin") for stream in paths}
+            if partition not in written[first]:
+                for stream in paths:
+                    if partition in written[stream]:
+                        os.remove(sub_paths[stream])
+                continue
+            for stream in paths:
+                if partition not in written[stream]:
+                    open(sub_paths[stream], "wb").close()
+            consume_spill(sub_paths, dtypes, consume, partitions, max_memory, sub_level)
+        return
+    consume({stream: np.fromfile(path, dtype=dtypes[stream]) for stream, path in paths.items()})
+    for path in paths.values():
+        os.remove(path)
+
+
+class UserDeduplicator:
+    """
+    Streaming per-user counts over row-level chunks, spilling to disk as needed.
+
+    Feed it DataFrame chunks with ``user_id``, ``group`` and ``converted``
+    columns, in file order, via update(). Then call counts(). Use it as a
+    context manager (or call close()) to delete spill files.
+
+    Args:
+        mode: "first" (first row per user wins) or "any" (converted if any
+            row converted; group of the first row)
+        max_memory: Budget for buffered records and for deduplicating one
+            partition, in bytes or as a size string (default: 1 GiB)
+        partitions: Spill files per partitioning level (default: 64)
+        spill_dir: Directory for spill files (default: the system temp dir)
+
+    Raises:
+        ValueError: If mode or partitions is invalid
+    """
+
+    def __init__(self, mode: str = 'first', max_memory: Optional[SizeLike] = None,
+                 partitions: int = DEFAULT_PARTITIONS, spill_dir: Optional[str] = None):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}'; expected one of {', '.join(DEDUP_MODES)}")
+        if partitions < 2:
+            raise ValueError("partitions must be at least 2")
+        self.mode = mode
+        self.max_memory = parse_size(max_memory) if max_memory is not None else DEFAULT_DEDUP_MEMORY
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.rows = 0
+        self.spilled_rows = 0
+        self.group_codes: Dict[str, int] = {}
+        self._buffer: List[np.ndarray] = []
+        self._buffered_bytes = 0
+        self._tmpdir: Optional[str] = None
+        self._files = None
+
+    def __enter__(self) -> "UserDeduplicator":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """Close and delete any spill files."""
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+            self._files = None
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+
+        Raises:
+            ValueError: If user_id or group has missing values, or converted
+                contains values other than 0 or 1
+        """
+        with span("validate"):
+            if not chunk['converted'].isin([0, 1]).all():
+                raise ValueError("Converted column must contain only 0 or 1 values")
+            if chunk['user_id'].isna().any():
+                raise ValueError("user_id has missing values")
+            if chunk['group'].isna().any():
+                raise ValueError("group has missing values")
+
+        with span("hash"):
+            records = np.empty(len(chunk), dtype=RECORD)
+            records['h1'], records['h2'] = hash_user_ids(chunk['user_id'].to_numpy())
+            records['group'] = encode_groups(chunk['group'], self.group_codes)
+            records['converted'] = chunk['converted'].to_numpy()
+        self.rows += len(records)
+
+        if self._files is not None:
+            self._spill(records)
+            return
+        self._buffer.append(records)
+        self._buffered_bytes += records.nbytes
+        if self._buffered_bytes * WORK_FACTOR > self.max_memory:
+            self._start_spilling()
+
+    def _start_spilling(self) -> None:
+        self._tmpdir = tempfile.mkdtemp(prefix="abtest-dedup-", dir=self.spill_dir)
+        self._files = [open(os.path.join(self._tmpdir, f"p{i:04d}.bin"), "wb") for i in range(self.partitions)]
+        buffered, self._buffer, self._buffered_bytes = self._buffer, [], 0
+        for records in buffered:
+            self._spill(records)
+
+    def _spill(self, records: np.ndarray) -> None:
+        with span("spill"):
+            for partition, part in split_partitions(records, self.partitions):
+                part.tofile(self._files[partition])
+        self.spilled_rows += len(records)
+        count("rows_spilled", len(records))
+
+    def _accumulate(self, records: np.ndarray, totals: np.ndarray, successes: np.ndarray) -> None:
+        with span("dedup"):
+            groups, converted = dedup_records(records, self.mode)
+            totals += np.bincount(groups, minlength=len(totals))
+            successes += np.bincount(groups, weights=converted, minlength=len(successes)).astype(np.int64)
+
+    def group_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Per-group (successes, totals) over distinct users.
+
+        Consumes the spill files; call it once, after the last update().
+        """
+        totals = np.zeros(len(self.group_codes), dtype=np.int64)
+        successes = np.zeros(len(self.group_codes), dtype=np.int64)
+        if self._files is None:
+            if self._buffer:
+                self._accumulate(np.concatenate(self._buffer), totals, successes)
+            self._buffer, self._buffered_bytes = [], 0
+        else:
+            for f in self._files:
+                f.close()
+            self._files = None
+            for partition in range(self.partitions):
+                path = os.path.join(self._tmpdir, f"p{partition:04d}.bin")
+                if os.path.getsize(path):
+                    consume_spill({'records': path}, {'records': RECORD},
+                                  lambda parts: self._accumulate(parts['records'], totals, successes),
+                                  self.partitions, self.max_memory)
+            self.close()
+        return (
+            {label: int(successes[code]) for label, code in self.group_codes.items()},
+            {label: int(totals[code]) for label, code in self.group_codes.items()},
+        )
+
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Return (success_a, total_a, success_b, total_b) over distinct users.
+
+        Raises:
+            ValueError: If either variant has no users
+        """
+        successes, totals = self.group_counts()
+        if totals.get('A', 0) == 0:
+            raise ValueError("Variant A data not found in CSV")
+        if totals.get('B', 0) == 0:
+            raise ValueError("Variant B data not found in CSV")
+        return successes['A'], totals['A'], successes['B'], totals['B']
@@ -0,0 +1,250 @@
+"""
+Opt-in instrumentation: timing spans, call counters and latency histograms.
+
+Loaders, statistics and the app wrap their stages in named spans (read,
+validate, aggregate, test, power, render). While instrumentation is disabled,
+span() returns a shared no-op context manager, so the cost is one function
+call and a flag check. Enable it with enable() or by setting the environment
+variable ABTEST_INSTRUMENT=1 before import.
+
+Recorded data can be exported as JSON (snapshot(), to_json()) or Prometheus
+text exposition format (to_prometheus()), and served locally with
+serve_metrics(). The HTTP service (abtest.service) also exposes GET /metrics.
+
+Example:
+    from abtest import instrument
+    instrument.enable()
+    with instrument.span("read"):
+        ...
+    print(instrument.to_prometheus())
+"""
+
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+_enabled = os.environ.get("ABTEST_INSTRUMENT", "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+_histograms: Dict[str, "_Histogram"] = {}
+_counters: Dict[str, float] = {}
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enable() -> None:
+    """Start recording spans and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording; already recorded data is kept until reset()."""
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    """Whether spans and counters are currently being recorded."""
+    return _enabled
+
+
+def reset() -> None:
+    """Discard all recorded spans and counters."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def span(name: str):
+    """
+    Context manager timing one stage under ``name``.
+
+    Each completed span adds one observation to the latency histogram for
+    ``name`` (its count doubles as the call counter).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: str):
+    """
+    Decorator recording every call of the function as a span named ``name``.
+
+    While disabled this costs one extra call frame and a flag check.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one latency observation for ``name`` (what span() does on exit)."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram()
+        histogram.observe(seconds)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add ``value`` to the counter ``name`` (e.g. rows processed)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot() -> Dict[str, Dict]:
+    """
+    Copy of everything recorded so far.
+
+    Returns:
+        {"spans": {name: {"count", "sum_s", "buckets": {le: cumulative count}}},
+         "counters": {name: value}}
+    """
+    with _lock:
+        spans = {}
+        for name, histogram in _histograms.items():
+            cumulative, buckets = 0, {}
+            for bound, bucket_count in zip(list(LATENCY_BUCKETS) + ["+Inf"], histogram.buckets):
+                cumulative += bucket_count
+                buckets[str(bound)] = cumulative
+            spans[name] = {"count": histogram.count, "sum_s": histogram.total, "buckets": buckets}
+        return {"spans": spans, "counters": dict(_counters)}
+
+
+def merge(other: Dict[str, Dict]) -> None:
+    """Add a snapshot() taken elsewhere (e.g. in a worker process) into this registry."""
+    with _lock:
+        for name, data in other.get("spans", {}).items():
+            histogram = _histograms.get(name)
+            if histogram is None:
+                histogram = _histograms[name] = _Histogram()
+            histogram.count += data["count"]
+            histogram.total += data["sum_s"]
+            previous = 0
+            for i, cumulative in enumerate(data["buckets"].values()):
+                histogram.buckets[i] += cumulative - previous
+                previous = cumulative
+        for name, value in other.get("counters", {}).items():
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def to_json(indent: Optional[int] = 2) -> str:
+    """snapshot() as a JSON string."""
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def to_prometheus() -> str:
+    """Everything recorded so far in Prometheus text exposition format."""
+    data = snapshot()
+    lines: List[str] = [
+        "# HELP abtest_span_duration_seconds Duration of instrumented abtest stages.",
+        "# TYPE abtest_span_duration_seconds histogram",
+    ]
+    for name, span_data in sorted(data["spans"].items()):
+        label = _escape_label(name)
+        for bound, cumulative in span_data["buckets"].items():
+            lines.append(f'abtest_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'abtest_span_duration_seconds_sum{{span="{label}"}} {span_data["sum_s"]}')
+        lines.append(f'abtest_span_duration_seconds_count{{span="{label}"}} {span_data["count"]}')
+    lines += [
+        "# HELP abtest_events_total Counters recorded by abtest.",
+        "# TYPE abtest_events_total counter",
+    ]
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'abtest_events_total{{name="{_escape_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics(host: str = "127.0.0.1", port: int = 9464):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a background thread.
+
+    Returns:
+        The running HTTPServer; call shutdown() on it to stop serving
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = to_prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = to_json().encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="abtest-metrics").start()
+    return server
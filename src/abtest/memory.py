@@ -0,0 +1,199 @@
+"""
+Memory budgets for the streaming loaders.
+
+parse_size() turns budgets such as "2GB" into bytes, estimate_row_bytes()
+predicts how much a parsed row costs while a chunk is being read, and
+PeakMemoryTracker records what a load actually used (tracemalloc peak and
+sampled RSS) so the estimate can be checked against reality.
+
+The budget covers the loader's working set (parser buffers plus one parsed
+chunk), not the interpreter and imported libraries: set it below a worker's
+cgroup limit by the process's idle RSS (typically 100-150 MB with pandas).
+Loaders that also buffer records while parsing (deduplication, windowed
+attribution) divide one budget between the two with split_budget().
+"""
+
+import os
+import re
+import sys
+import threading
+import tracemalloc
+from typing import Dict, Optional, Tuple, Union
+
+_SIZE_UNITS = {
+    "": 1, "b": 1,
+    "k": 1024, "kb": 1000, "kib": 1024,
+    "m": 1024 ** 2, "mb": 1000 ** 2, "mib": 1024 ** 2,
+    "g": 1024 ** 3, "gb": 1000 ** 3, "gib": 1024 ** 3,
+    "t": 1024 ** 4, "tb": 1000 ** 4, "tib": 1024 ** 4,
+}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*([a-z]*)\s*$", re.IGNORECASE)
+
+# Peak bytes per row while parsing a chunk, as multiples of the parsed row size
+# and of the raw CSV line width (the tokenizer holds the chunk's text and a
+# pointer per field, including unparsed ones). With these factors the RSS growth
+# of a budgeted load with the C parser stays within the budget plus a few MB.
+PARSED_OVERHEAD = 2.0
+LINE_OVERHEAD = 4.0
+
+# Share of a budget given to parsing CSV chunks when the loader also buffers
+# records; the rest goes to the record buffer and its spill partitions
+PARSE_SHARE = 0.25
+
+SizeLike = Union[int, float, str]
+
+
+def parse_size(size: SizeLike) -> int:
+    """
+    Convert a byte count or a size string to bytes.
+
+    Strings take an optional unit: KB/MB/GB/TB are decimal, KiB/MiB/GiB/TiB
+    and the bare K/M/G/T used by Docker and cgroups are binary. Case and
+    whitespace are ignored ("2GB", "1.5 GiB", "512m").
+
+    Raises:
+        ValueError: If the size is not positive or the string is not understood
+    """
+    if isinstance(size, str):
+        match = _SIZE_PATTERN.match(size)
+        unit = match.group(2).lower() if match else None
+        if unit not in _SIZE_UNITS:
+            raise ValueError(f"Invalid size '{size}'; expected e.g. 512MB, 2GiB or 1073741824")
+        size = float(match.group(1)) * _SIZE_UNITS[unit]
+    size = int(size)
+    if size <= 0:
+        raise ValueError("Size must be positive")
+    return size
+
+
+def split_budget(max_memory: Optional[SizeLike]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Divide one budget into (parse budget, record buffer budget) by PARSE_SHARE.
+
+    Both are None without a budget, so each consumer falls back to its own
+    default.
+
+    Raises:
+        ValueError: If max_memory is not a valid size
+    """
+    if max_memory is None:
+        return None, None
+    max_memory = parse_size(max_memory)
+    parse_budget = max(int(max_memory * PARSE_SHARE), 1)
+    return parse_budget, max(max_memory - parse_budget, 1)
+
+
+def line_width(filepath, sample_bytes: int = 1 << 16) -> Optional[float]:
+    """
+    Mean bytes per line in the first ``sample_bytes`` of a CSV.
+
+    Works on paths and seekable file objects (whose position is restored);
+    returns None for anything else or a file without a complete line.
+    """
+    if isinstance(filepath, (str, bytes, os.PathLike)):
+        with open(filepath, "rb") as f:
+            head = f.read(sample_bytes)
+    elif hasattr(filepath, "seek") and hasattr(filepath, "tell"):
+        position = filepath.tell()
+        head = filepath.read(sample_bytes)
+        filepath.seek(position)
+    else:
+        return None
+    if isinstance(head, str):
+        head = head.encode()
+    lines = head.count(b"\n")
+    return len(head) / lines if lines else None
+
+
+def estimate_row_bytes(parsed_row_bytes: float, line_bytes: Optional[float]) -> float:
+    """Peak bytes per row while a chunk is parsed (see PARSED_OVERHEAD / LINE_OVERHEAD)."""
+    estimate = PARSED_OVERHEAD * parsed_row_bytes
+    if line_bytes is not None:
+        estimate += LINE_OVERHEAD * line_bytes
+    return estimate
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Lifetime peak, not current usage; the best available without /proc
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class PeakMemoryTracker:
+    """
+    Context manager recording the peak memory used inside its block.
+
+    Records the tracemalloc peak (Python and numpy allocations made inside the
+    block) and the peak RSS sampled on a background thread every ``interval``
+    seconds. tracemalloc slows allocation-heavy code noticeably; pass
+    ``trace=False`` to sample RSS only.
+
+    Example:
+        with PeakMemoryTracker() as tracker:
+            load_row_level_data(path, max_memory="1GB")
+        print(tracker.report())
+    """
+
+    def __init__(self, interval: float = 0.01, trace: bool = True):
+        self.interval = interval
+        self.trace = trace
+        self.baseline_rss_bytes: Optional[int] = None
+        self.peak_rss_bytes: Optional[int] = None
+        self.peak_traced_bytes: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_tracing = False
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._update_rss()
+
+    def _update_rss(self) -> None:
+        rss = current_rss()
+        if rss is not None and (self.peak_rss_bytes is None or rss > self.peak_rss_bytes):
+            self.peak_rss_bytes = rss
+
+    def __enter__(self) -> "PeakMemoryTracker":
+        self.baseline_rss_bytes = current_rss()
+        self.peak_rss_bytes = self.baseline_rss_bytes
+        if self.trace:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+        self._thread = threading.Thread(target=self._sample, daemon=True, name="abtest-rss")
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._stop.set()
+        self._thread.join()
+        self._update_rss()
+        if self.trace:
+            self.peak_traced_bytes = tracemalloc.get_traced_memory()[1] - self._traced_start
+            if self._started_tracing:
+                tracemalloc.stop()
+        return False
+
+    def report(self) -> Dict[str, Optional[int]]:
+        """Peak traced bytes, baseline and peak RSS, and the RSS growth in bytes."""
+        growth = None
+        if self.peak_rss_bytes is not None and self.baseline_rss_bytes is not None:
+            growth = self.peak_rss_bytes - self.baseline_rss_bytes
+        return {
+            "peak_traced_bytes": self.peak_traced_bytes,
+            "baseline_rss_bytes": self.baseline_rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_growth_bytes": growth,
+        }
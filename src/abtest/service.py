@@ -0,0 +1,277 @@
+"""
+Local HTTP analysis service.
+
+Exposes the statistics and loaders as JSON endpoints so other services can use
+them without importing scipy/statsmodels. Built on the standard library's
+http.server: HTTP/1.1 with keep-alive, requests served by a bounded thread
+pool, and a /batch endpoint that runs many comparisons through the vectorized
+kernels in one call.
+
+Endpoints:
+    GET  /health  -> {"status": "ok"}
+    GET  /metrics -> Prometheus text of abtest.instrument (empty unless enabled)
+    GET  /metrics.json -> the same as JSON
+    POST /ztest   {"success_a", "total_a", "success_b", "total_b", "alpha"?, "ci_method"?}
+                  -> {"z", "p", "lift", "ci": [lower, upper]}
+    POST /power   {"n_a", "n_b", "p_control", "min_detectable_diff"?, "alpha"?}
+                  -> {"power"}
+    POST /batch   {"comparisons": [{"success_a", "total_a", "success_b", "total_b"}, ...],
+                   "alpha"?, "min_detectable_diff"?, "allocation"?: [a_share, b_share],
+                   "ci_method"?: "wald" | "newcombe" | "agresti-caffo"}
+                  -> {"results": [{"z", "p", "lift", "ci", "power", "srm_p"}, ...]}
+    POST /load    CSV body (aggregated or row-level)
+                  -> {"success_a", "total_a", "success_b", "total_b"}
+
+Errors are returned as {"error": message} with status 400 (bad input, or a
+missing or invalid Content-Length), 404 (unknown path) or 413 (body too large).
+
+Usage:
+    python -m abtest serve --port 8000 --workers 8
+"""
+
+import io
+import json
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from . import instrument
+from .batch import power_batch, srm_test_batch, ztest_two_prop_batch
+from .core import load_counts, power, ztest_two_prop
+
+# Largest accepted request body, in bytes
+DEFAULT_MAX_BODY = 64 * 1024 ** 2
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    """JSON has no NaN/inf; map them to null."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _require(payload: Dict[str, Any], *keys: str) -> None:
+    missing = [key for key in keys if key not in payload]
+    if missing:
+        raise ValueError(f"Missing required fields: {missing}")
+
+
+def _count(payload: Dict[str, Any], key: str) -> int:
+    """A count field as int; JSON numbers with a fractional part, strings and booleans are rejected."""
+    value = payload[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not float(value).is_integer():
+        raise ValueError(f"{key} must be an integer count, got {value!r}")
+    return int(value)
+
+
+def handle_ztest(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST /ztest: one two-proportion z-test via ztest_two_prop."""
+    _require(payload, "success_a", "total_a", "success_b", "total_b")
+    result = ztest_two_prop(
+        _count(payload, "success_a"), _count(payload, "total_a"),
+        _count(payload, "success_b"), _count(payload, "total_b"),
+        alpha=float(payload.get("alpha", 0.05)),
+        ci_method=str(payload.get("ci_method", "wald")),
+    )
+    return {
+        "z": _finite_or_none(result["z"]),
+        "p": _finite_or_none(result["p"]),
+        "lift": result["lift"],
+        "ci": [_finite_or_none(result["ci"][0]), _finite_or_none(result["ci"][1])],
+    }
+
+
+def handle_power(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST /power: statistical power via power."""
+    _require(payload, "n_a", "n_b", "p_control")
+    value = power(
+        _count(payload, "n_a"), _count(payload, "n_b"), float(payload["p_control"]),
+        min_detectable_diff=float(payload.get("min_detectable_diff", 0.02)),
+        alpha=float(payload.get("alpha", 0.05)),
+    )
+    return {"power": _finite_or_none(value)}
+
+
+def handle_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST /batch: many comparisons through the vectorized kernels."""
+    _require(payload, "comparisons")
+    comparisons = payload["comparisons"]
+    if not isinstance(comparisons, list):
+        raise ValueError("comparisons must be a list")
+    alpha = float(payload.get("alpha", 0.05))
+    mde = float(payload.get("min_detectable_diff", 0.02))
+    allocation = payload.get("allocation", [0.5, 0.5])
+    ci_method = str(payload.get("ci_method", "wald"))
+    if not comparisons:
+        return {"results": []}
+
+    try:
+        counts = np.array(
+            [[_count(c, "success_a"), _count(c, "total_a"), _count(c, "success_b"), _count(c, "total_b")]
+             for c in comparisons],
+            dtype=np.float64,
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Each comparison needs success_a, total_a, success_b, total_b ({e})")
+
+    sa, ta, sb, tb = counts.T
+    stats = ztest_two_prop_batch(sa, ta, sb, tb, alpha=alpha, ci_method=ci_method)
+    powers = power_batch(ta, tb, sa / ta, mde, alpha=alpha)
+    srm_p = srm_test_batch(np.column_stack([ta, tb]), allocation)["p"].tolist()
+
+    z, p, lift = stats["z"].tolist(), stats["p"].tolist(), stats["lift"].tolist()
+    lower, upper, powers = stats["ci_lower"].tolist(), stats["ci_upper"].tolist(), powers.tolist()
+    return {
+        "results": [
+            {
+                "z": _finite_or_none(z[i]),
+                "p": _finite_or_none(p[i]),
+                "lift": lift[i],
+                "ci": [_finite_or_none(lower[i]), _finite_or_none(upper[i])],
+                "power": _finite_or_none(powers[i]),
+                "srm_p": _finite_or_none(srm_p[i]),
+            }
+            for i in range(len(comparisons))
+        ]
+    }
+
+
+def handle_load(body: bytes) -> Dict[str, Any]:
+    """POST /load: aggregate a CSV body with load_counts."""
+    success_a, total_a, success_b, total_b = load_counts(io.BytesIO(body))
+    return {"success_a": success_a, "total_a": total_a, "success_b": success_b, "total_b": total_b}
+
+
+JSON_ROUTES = {
+    "/ztest": handle_ztest,
+    "/power": handle_power,
+    "/batch": handle_batch,
+}
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the handle_* functions and writes JSON responses."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "abtest"
+    # Close idle keep-alive connections so they don't pin pool workers forever
+    timeout = 30
+    # Headers and body go out in separate writes; without TCP_NODELAY the body
+    # waits on the client's delayed ACK (~40 ms per keep-alive request)
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, instrument.to_prometheus().encode(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self._send_json(200, instrument.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self) -> None:
+        try:
+            body = self._read_body()
+            if self.path == "/load":
+                response = handle_load(body)
+            elif self.path in JSON_ROUTES:
+                try:
+                    payload = json.loads(body or b"{}")
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON: {e}")
+                if not isinstance(payload, dict):
+                    raise ValueError("Request body must be a JSON object")
+                response = JSON_ROUTES[self.path](payload)
+            else:
+                raise _HTTPError(404, f"Unknown path: {self.path}")
+        except _HTTPError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+        else:
+            self._send_json(200, response)
+
+    def _read_body(self) -> bytes:
+        value = self.headers.get("Content-Length")
+        digits = (value or "").strip()
+        if not (digits.isascii() and digits.isdigit()):
+            # Without a valid length the body can't be framed; don't reuse the connection
+            self.close_connection = True
+            if value is None:
+                raise _HTTPError(400, "Missing Content-Length header")
+            raise _HTTPError(400, f"Invalid Content-Length: {value!r}")
+        length = int(digits)
+        if length > self.server.max_body:
+            # Drop the connection rather than draining an oversized body
+            self.close_connection = True
+            raise _HTTPError(413, f"Request body exceeds {self.server.max_body} bytes")
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(payload, separators=(",", ":")).encode(), "application/json")
+
+    def _send(self, status: int, data: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AnalysisServer(HTTPServer):
+    """
+    HTTPServer that serves each connection on a bounded thread pool.
+
+    Args:
+        address: (host, port) to bind; port 0 picks a free port
+        workers: Connections served concurrently (default: 16)
+        max_body: Largest accepted request body in bytes (default: DEFAULT_MAX_BODY)
+        verbose: Log each request to stderr (default: False)
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address, workers: int = 16, max_body: int = DEFAULT_MAX_BODY, verbose: bool = False):
+        super().__init__(address, AnalysisRequestHandler)
+        self.max_body = max_body
+        self.verbose = verbose
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abtest-http")
+
+    def process_request(self, request, client_address) -> None:
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 16, verbose: bool = False) -> None:
+    """Run the analysis service until interrupted."""
+    with AnalysisServer((host, port), workers=workers, verbose=verbose) as server:
+        print(f"Serving A/B test analysis on http://{host}:{server.server_port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,298 @@
+"""
+Approximate distinct-user counting with HyperLogLog sketches.
+
+Exact per-user deduplication (abtest.dedup) sorts every exposure, which is too
+slow to rerun on each dashboard refresh. SketchAggregator instead keeps one
+HyperLogLog sketch of user_id hashes per (group, converted), fed chunk by chunk
+next to (or instead of) RowLevelAggregator. Per group it estimates:
+
+- total users: the size of the union of the group's converted and
+  not-converted sketches;
+- converted users: the size of the group's converted sketch.
+
+A user who appears in both groups is counted in both, and a user with both
+converted and unconverted rows counts as converted.
+
+Sketches are mergeable: shards (files, days, processes) can be aggregated
+separately and combined with merge(), or shipped as bytes via to_bytes() /
+from_bytes(). Merging gives exactly the sketch of the combined data.
+
+Error bounds:
+    Each estimate has a relative standard error of about 1.04 / sqrt(2^p) for
+    precision p, with roughly Gaussian errors (95% of estimates within two
+    standard errors). Memory is 2^p bytes per sketch, so four sketches for an
+    A/B test:
+
+        p    registers   memory (4 sketches)   std. error   95% within
+        12       4,096            16 KiB           1.63%        3.3%
+        14      16,384            64 KiB           0.81%        1.6%
+        16      65,536           256 KiB           0.41%        0.8%
+        18     262,144             1 MiB           0.20%        0.4%
+
+    A z-test on estimated counts is only meaningful while this error is small
+    next to the sampling noise of the conversion rates. With 10^6 users per
+    group, p=14 is off by about 8,000 users, far more than the binomial
+    standard deviation of the conversions (about 300 at a 10% rate). Use the
+    sketch path for monitoring and trend dashboards, and keep decisions on
+    exact counts.
+
+Example:
+    sketches = load_row_level_sketches("exposures.csv", precision=16)
+    success_a, total_a, success_b, total_b = sketches.counts()
+"""
+
+import json
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .core import DEDUP_DTYPES, ROW_LEVEL_COLUMNS, iter_csv_chunks
+from .dedup import hash_user_ids
+from .instrument import span
+from .memory import SizeLike
+
+DEFAULT_PRECISION = 14
+MIN_PRECISION, MAX_PRECISION = 4, 18
+
+
+def _sigma(x: float) -> float:
+    """x + sum over k >= 1 of x^(2^k) * 2^(k-1)"""
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    """(1 - x - sum over k >= 1 of (1 - x^(2^-k))^2 * 2^-k) / 3"""
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch over 64-bit hashes.
+
+    Args:
+        precision: Number of index bits p; the sketch has 2^p one-byte
+            registers and a relative standard error of 1.04 / sqrt(2^p)
+            (default: 14)
+
+    Raises:
+        ValueError: If precision is outside 4..18
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of estimate()."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Add uniformly distributed uint64 hashes (one per item occurrence)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Position of the leftmost 1 bit in the remaining 64 - p bits, counted
+        # from 1; frexp's exponent is the bit length (0 for rest == 0)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - p + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch of the same precision into this one (set union)."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def union(self, other: "HyperLogLog") -> "HyperLogLog":
+        """New sketch of the union of this and another sketch."""
+        merged = self.copy()
+        merged.merge(other)
+        return merged
+
+    def copy(self) -> "HyperLogLog":
+        clone = HyperLogLog(self.precision)
+        clone.registers[:] = self.registers
+        return clone
+
+    def estimate(self) -> float:
+        """
+        Estimated number of distinct items added.
+
+        Uses Ertl's improved estimator ("New cardinality estimation algorithms
+        for HyperLogLog sketches", 2017), which is unbiased over the whole
+        range without the classic estimator's small-range switch or
+        empirical bias tables.
+        """
+        m = len(self.registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=q + 2)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return m * m / (2 * math.log(2)) / z
+
+    def to_bytes(self) -> bytes:
+        """Serialize as one precision byte followed by the registers."""
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """Inverse of to_bytes()."""
+        sketch = cls(data[0])
+        registers = np.frombuffer(data, dtype=np.uint8, offset=1)
+        if len(registers) != len(sketch.registers):
+            raise ValueError("Sketch data does not match its precision")
+        sketch.registers[:] = registers
+        return sketch
+
+
+class SketchAggregator:
+    """
+    Streaming approximate unique-user counts per group from row-level chunks.
+
+    Keeps a HyperLogLog of user_id hashes per (group, converted); memory is
+    fixed at 2^precision bytes per sketch regardless of the number of rows or
+    users. Feed chunks with ``user_id``, ``group`` and ``converted`` columns
+    via update(); shards can be combined with merge().
+
+    Args:
+        precision: HyperLogLog precision (default: 14; see the module
+            docstring for error bounds)
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        HyperLogLog(precision)  # validate
+        self.precision = precision
+        self.sketches: Dict[Tuple[str, int], HyperLogLog] = {}
+        self.rows = 0
+
+    def _sketch(self, group: str, converted: int) -> HyperLogLog:
+        key = (group, converted)
+        if key not in self.sketches:
+            self.sketches[key] = HyperLogLog(self.precision)
+        return self.sketches[key]
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+
+        Raises:
+            ValueError: If converted contains values other than 0 or 1, or
+                user_id has missing values
+        """
+        with span("validate"):
+            if not chunk['converted'].isin([0, 1]).all():
+                raise ValueError("Converted column must contain only 0 or 1 values")
+            if chunk['user_id'].isna().any():
+                raise ValueError("user_id has missing values")
+
+        with span("sketch"):
+            (hashes,) = hash_user_ids(chunk['user_id'].to_numpy(), n_hashes=1)
+            groups = chunk['group'].astype('category')
+            codes = groups.cat.codes.to_numpy().astype(np.int64) * 2 + chunk['converted'].to_numpy()
+            for key in np.unique(codes[codes >= 0]):
+                group, converted = groups.cat.categories[key // 2], int(key % 2)
+                self._sketch(group, converted).add_hashes(hashes[codes == key])
+        self.rows += len(chunk)
+
+    def merge(self, other: "SketchAggregator") -> None:
+        """Fold another aggregator's sketches (e.g. another shard) into this one."""
+        for (group, converted), sketch in other.sketches.items():
+            self._sketch(group, converted).merge(sketch)
+        self.rows += other.rows
+
+    def group_estimates(self) -> Dict[str, Dict[str, float]]:
+        """Per group: estimated {"users", "converted_users"}."""
+        empty = HyperLogLog(self.precision)
+        estimates = {}
+        for group in sorted({group for group, _ in self.sketches}):
+            converted = self.sketches.get((group, 1), empty)
+            everyone = converted.union(self.sketches.get((group, 0), empty))
+            estimates[group] = {"users": everyone.estimate(), "converted_users": converted.estimate()}
+        return estimates
+
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Return estimated (success_a, total_a, success_b, total_b) unique users.
+
+        Estimates are rounded, and converted users are capped at the group's
+        users so the counts are valid for ztest_two_prop.
+
+        Raises:
+            ValueError: If either variant has no rows
+        """
+        estimates = self.group_estimates()
+        result = []
+        for group in ('A', 'B'):
+            if group not in estimates:
+                raise ValueError(f"Variant {group} data not found in CSV")
+            users = max(1, round(estimates[group]["users"]))
+            result += [min(round(estimates[group]["converted_users"]), users), users]
+        return tuple(result)
+
+    def to_bytes(self) -> bytes:
+        """Serialize all sketches (a JSON header line, then the registers)."""
+        keys = sorted(self.sketches)
+        header = {"precision": self.precision, "rows": self.rows, "keys": [[g, c] for g, c in keys]}
+        return (json.dumps(header) + "\n").encode() + b"".join(self.sketches[k].registers.tobytes() for k in keys)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SketchAggregator":
+        """Inverse of to_bytes()."""
+        newline = data.index(b"\n")
+        header = json.loads(data[:newline])
+        aggregator = cls(header["precision"])
+        aggregator.rows = header["rows"]
+        size = 1 << aggregator.precision
+        for i, (group, converted) in enumerate(header["keys"]):
+            start = newline + 1 + i * size
+            aggregator._sketch(group, converted).registers[:] = np.frombuffer(data[start:start + size], dtype=np.uint8)
+        return aggregator
+
+
+def load_row_level_sketches(filepath, precision: int = DEFAULT_PRECISION, chunksize: Optional[int] = None,
+                            max_memory: Optional[SizeLike] = None) -> SketchAggregator:
+    """
+    Stream a row-level CSV into a SketchAggregator.
+
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        precision: HyperLogLog precision (default: 14)
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget for parsing, in bytes or as a size
+            string such as "2GB"
+
+    Returns:
+        SketchAggregator; call counts() for approximate unique-user counts
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format is invalid
+    """
+    aggregator = SketchAggregator(precision)
+    for chunk in iter_csv_chunks(filepath, ROW_LEVEL_COLUMNS, chunksize, max_memory, dtype=DEDUP_DTYPES):
+        aggregator.update(chunk)
+    return aggregator
@@ -0,0 +1,193 @@
+"""
+Stratified analysis over segments: Cochran-Mantel-Haenszel test and
+Mantel-Haenszel risk difference.
+
+When the traffic mix differs between variants across strata (device,
+country), pooled counts mix the strata's different base rates into the lift
+(Simpson's paradox). Comparing A and B within each stratum and combining the
+comparisons avoids that:
+
+- The CMH test checks for a common difference across strata (chi-square,
+  1 degree of freedom, without continuity correction as in statsmodels'
+  StratifiedTable.test_null_odds).
+- The Mantel-Haenszel risk difference weights each stratum's pb - pa by
+  n_a * n_b / (n_a + n_b). Its variance is Sato's estimator, which stays
+  valid with many sparse strata.
+
+cmh_test_batch works on (experiments x strata) arrays, so stratified results
+for thousands of experiments cost about as much as the pooled batch test.
+The per-stratum counts come from one pass over row-level data with
+load_stratified.
+
+Example:
+    strata = load_stratified("exposures.csv", stratum_col="device")
+    results = analyze_stratified(strata.table(), stratum_col="device")
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import stats
+
+from .core import KeyedRowLevelAggregator, iter_csv_chunks
+from .instrument import timed
+from .memory import SizeLike
+
+COUNT_COLUMNS = ['success_a', 'total_a', 'success_b', 'total_b']
+
+
+@timed("cmh_batch")
+def cmh_test_batch(success_a, total_a, success_b, total_b, alpha: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    CMH tests and Mantel-Haenszel risk differences for many experiments at once.
+
+    Inputs broadcast to shape (..., n_strata); strata are combined along the
+    last axis. Pad experiments with fewer strata with zero counts, and strata
+    missing either variant then contribute nothing.
+
+    Args:
+        success_a, total_a, success_b, total_b: Per-stratum counts, array-like
+        alpha: Significance level (default: 0.05)
+
+    Returns:
+        Dictionary of arrays with the leading shape:
+            - cmh: CMH chi-square statistic
+            - z: signed square root of cmh (positive when A converts more, the
+              ztest_two_prop convention)
+            - p: two-sided p-value
+            - lift: Mantel-Haenszel risk difference (pb - pa)
+            - ci_lower, ci_upper: (1 - alpha) interval from Sato's variance
+
+    Raises:
+        ValueError: If any counts are invalid, or an experiment has no
+            stratum with both variants
+    """
+    success_a, total_a, success_b, total_b = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (success_a, total_a, success_b, total_b))
+    )
+    if np.any(total_a < 0) or np.any(total_b < 0) or np.any(success_a < 0) or np.any(success_b < 0):
+        raise ValueError("Counts cannot be negative")
+    if np.any(success_a > total_a) or np.any(success_b > total_b):
+        raise ValueError("Success counts cannot exceed total counts")
+    if not 0 < alpha < 1:
+        raise ValueError("Alpha must be between 0 and 1")
+
+    # Strata without both variants carry no within-stratum comparison
+    both = (total_a > 0) & (total_b > 0)
+    n = np.where(both, total_a + total_b, 1.0)
+    n_a, n_b = np.where(both, total_a, 0.0), np.where(both, total_b, 0.0)
+    x_a, x_b = np.where(both, success_a, 0.0), np.where(both, success_b, 0.0)
+    if np.any(~both.any(axis=-1)):
+        raise ValueError("Each experiment needs a stratum with both variants")
+
+    # CMH: A's successes against their expectation given the stratum margins
+    converted = x_a + x_b
+    expected = n_a * converted / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.where(n > 1, n_a * n_b * converted * (n - converted) / (n ** 2 * (n - 1)), 0.0)
+        z = (x_a - expected).sum(axis=-1) / np.sqrt(variance.sum(axis=-1))
+    cmh = z ** 2
+    p = stats.chi2.sf(cmh, 1)
+
+    # Mantel-Haenszel risk difference with Sato's variance (B exposed, A reference)
+    weights = n_a * n_b / n
+    total_weight = weights.sum(axis=-1)
+    diff = ((x_b * n_a - x_a * n_b) / n).sum(axis=-1) / total_weight
+    sato_p = (n_b ** 2 * x_a - n_a ** 2 * x_b + n_b * n_a * (n_a - n_b) / 2) / n ** 2
+    sato_q = (x_b * (n_a - x_a) + x_a * (n_b - x_b)) / (2 * n)
+    se = np.sqrt(np.maximum(diff * sato_p.sum(axis=-1) + sato_q.sum(axis=-1), 0.0)) / total_weight
+    zcrit = stats.norm.isf(alpha / 2)
+
+    return {
+        "cmh": cmh,
+        "z": z,
+        "p": p,
+        "lift": diff,
+        "ci_lower": diff - zcrit * se,
+        "ci_upper": diff + zcrit * se,
+    }
+
+
+def analyze_stratified(table, stratum_col: str = 'stratum', experiment_col: Optional[str] = None,
+                       alpha: float = 0.05):
+    """
+    Stratified results per experiment from a long per-stratum counts table.
+
+    Args:
+        table: DataFrame with the stratum column, success_a, total_a,
+            success_b and total_b, and optionally an experiment column (e.g.
+            KeyedRowLevelAggregator.table() output, concatenated across
+            experiments)
+        stratum_col: Stratum column (default: "stratum")
+        experiment_col: Experiment column, or None for a single experiment
+        alpha: Significance level (default: 0.05)
+
+    Returns:
+        DataFrame with one row per experiment: the experiment column (if
+        given), n_strata, the pooled four counts, and the cmh_test_batch
+        columns cmh, z, p, lift, ci_lower and ci_upper
+
+    Raises:
+        ValueError: If columns are missing or any counts are invalid
+    """
+    import pandas as pd
+
+    keys = [stratum_col] if experiment_col is None else [experiment_col, stratum_col]
+    missing = [col for col in keys + COUNT_COLUMNS if col not in table.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    summed = table.groupby(keys, sort=True)[COUNT_COLUMNS].sum()
+    if experiment_col is None:
+        experiments = pd.Index([0])
+        rows = np.zeros(len(summed), dtype=np.intp)
+    else:
+        experiments = summed.index.unique(level=0)
+        rows = experiments.get_indexer(summed.index.get_level_values(0))
+    strata = summed.index.unique(level=-1)
+    cols = strata.get_indexer(summed.index.get_level_values(-1))
+
+    # (experiments x strata) arrays, zero where an experiment lacks a stratum
+    arrays = {}
+    for col in COUNT_COLUMNS:
+        grid = np.zeros((len(experiments), len(strata)))
+        grid[rows, cols] = summed[col].to_numpy(dtype=np.float64)
+        arrays[col] = grid
+
+    result = pd.DataFrame({} if experiment_col is None else {experiment_col: experiments.to_numpy()})
+    result['n_strata'] = np.bincount(rows, minlength=len(experiments))
+    for col in COUNT_COLUMNS:
+        result[col] = arrays[col].sum(axis=1).astype(np.int64)
+    for key, values in cmh_test_batch(*(arrays[col] for col in COUNT_COLUMNS), alpha=alpha).items():
+        result[key] = values
+    return result
+
+
+def load_stratified(filepath, stratum_col: str, chunksize: Optional[int] = None,
+                    max_memory: Optional[SizeLike] = None) -> KeyedRowLevelAggregator:
+    """
+    Stream a row-level CSV into per-(stratum, group) counts.
+
+    Args:
+        filepath: Path to the CSV file or a readable file object with
+            ``group``, ``converted`` and the stratum column
+        stratum_col: Column defining the strata (e.g. "device")
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget for parsing, in bytes or as a size
+            string such as "2GB"
+
+    Returns:
+        KeyedRowLevelAggregator keyed by the stratum; pass its table() to
+        analyze_stratified
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If columns are missing or the data is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = KeyedRowLevelAggregator(stratum_col)
+    for chunk in iter_csv_chunks(filepath, ['group', 'converted', stratum_col], chunksize, max_memory,
+                                 dtype={'group': 'category', stratum_col: 'category'}):
+        aggregator.update(chunk)
+    return aggregator
@@ -0,0 +1,175 @@
+"""
+Cumulative lift and confidence interval over the course of a test.
+
+A single end-of-test snapshot hides how the estimate got there: novelty
+effects, a weekday mix, a bug fixed halfway through. load_timeseries streams
+a row-level CSV with a timestamp into per-(period, group) counts, binned by
+day or hour, in one groupby per chunk. analyze_timeseries then takes running
+sums over the periods and tests every cumulative snapshot with one
+ztest_two_prop_batch call. A 90-day test costs one pass over the rows plus
+90 vectorized tests, instead of 90 passes over ever-longer prefixes.
+
+The curve is for monitoring. Reading significance off it at every point is
+sequential peeking, and the nominal alpha no longer holds (see Assumptions
+in the README).
+
+Example:
+    periods = load_timeseries("exposures.csv", freq="1D")
+    series = analyze_timeseries(periods)  # one row per day: cumulative counts, z, p, lift, CI
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .attribution import to_nanoseconds
+from .batch import ztest_two_prop_batch
+from .core import ROW_LEVEL_DTYPES, KeyedRowLevelAggregator, iter_csv_chunks
+from .memory import SizeLike
+
+COUNT_COLUMNS = ['success_a', 'total_a', 'success_b', 'total_b']
+
+
+def period_step(freq) -> int:
+    """
+    Bin width in nanoseconds from a fixed pandas frequency such as "1D" or "6h".
+
+    Raises:
+        ValueError: If freq is not a positive fixed duration
+    """
+    import pandas as pd
+
+    try:
+        step = pd.Timedelta(freq)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid period frequency: {freq!r}")
+    if pd.isna(step) or step <= pd.Timedelta(0):
+        raise ValueError(f"Invalid period frequency: {freq!r}")
+    return step.value
+
+
+class PeriodAggregator(KeyedRowLevelAggregator):
+    """
+    Streaming per-(period, group) counts from row-level chunks with timestamps.
+
+    Feed it DataFrame chunks with ``group``, ``converted`` and the timestamp
+    column via update(). Timestamps are floored to UTC-aligned bins of
+    ``freq`` (days start at midnight UTC).
+
+    Args:
+        freq: Bin width, a fixed pandas frequency such as "1D" or "1h"
+            (default: "1D")
+        timestamp_col: Timestamp column (default: "timestamp"); ISO strings
+            or epoch seconds, naive times read as UTC
+
+    Raises:
+        ValueError: If freq is invalid
+    """
+
+    def __init__(self, freq='1D', timestamp_col: str = 'timestamp'):
+        super().__init__('period')
+        self.step = period_step(freq)
+        self.timestamp_col = timestamp_col
+
+    def update(self, chunk) -> None:
+        """
+        Add one chunk of rows.
+
+        Raises:
+            ValueError: If a timestamp is missing or invalid, or converted
+                contains values other than 0 or 1
+        """
+        periods = to_nanoseconds(chunk[self.timestamp_col]) // self.step * self.step
+        super().update(chunk.assign(period=periods))
+
+    def table(self):
+        """
+        One row per period, in time order, with columns period (UTC
+        timestamp of the bin start), success_a, total_a, success_b, total_b.
+
+        Raises:
+            ValueError: If no rows were aggregated
+        """
+        import pandas as pd
+
+        table = super().table()
+        table['period'] = pd.to_datetime(table['period'].astype(np.int64), utc=True)
+        return table.sort_values('period', ignore_index=True)
+
+
+def analyze_timeseries(periods, alpha: float = 0.05, ci_method: str = 'wald', time_col: str = 'period'):
+    """
+    Cumulative counts and test statistics at the end of every period.
+
+    Args:
+        periods: DataFrame of per-period counts with the time column and
+            success_a, total_a, success_b, total_b (e.g.
+            PeriodAggregator.table()); periods need not be sorted
+        alpha: Significance level (default: 0.05)
+        ci_method: Interval for ci_lower/ci_upper: "wald", "newcombe" or
+            "agresti-caffo" (default: "wald")
+        time_col: Time column (default: "period")
+
+    Returns:
+        DataFrame with one row per period in time order: the time column,
+        the cumulative four counts, rate_a, rate_b and the
+        ztest_two_prop_batch columns z, p, lift, ci_lower and ci_upper.
+        Periods before both variants have data have NaN statistics.
+
+    Raises:
+        ValueError: If columns are missing or any counts are invalid
+    """
+    missing = [col for col in [time_col] + COUNT_COLUMNS if col not in periods.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    if (periods[COUNT_COLUMNS] < 0).any().any():
+        raise ValueError("Counts cannot be negative")
+
+    result = periods.groupby(time_col, sort=True)[COUNT_COLUMNS].sum().cumsum().reset_index()
+    sa, ta, sb, tb = (result[col].to_numpy(dtype=np.float64) for col in COUNT_COLUMNS)
+    started = (ta > 0) & (tb > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['rate_a'] = sa / ta
+        result['rate_b'] = sb / tb
+    stats = ztest_two_prop_batch(sa[started], ta[started], sb[started], tb[started], alpha=alpha,
+                                 ci_method=ci_method)
+    for key, values in stats.items():
+        column = np.full(len(result), np.nan)
+        column[started] = values
+        result[key] = column
+    return result
+
+
+def load_timeseries(filepath, freq='1D', timestamp_col: str = 'timestamp', chunksize: Optional[int] = None,
+                    max_memory: Optional[SizeLike] = None):
+    """
+    Stream a row-level CSV with timestamps into per-period counts.
+
+    Expected CSV format:
+        user_id,group,converted,timestamp
+        u1,A,0,2024-05-01T10:00:00
+        u2,B,1,2024-05-01T10:02:13
+
+    Args:
+        filepath: Path to the CSV file or a readable file object
+        freq: Bin width, a fixed pandas frequency such as "1D" or "1h"
+            (default: "1D")
+        timestamp_col: Timestamp column (default: "timestamp")
+        chunksize: Rows per chunk (default: sized from max_memory, or
+            DEFAULT_CHUNKSIZE)
+        max_memory: Optional memory budget in bytes or as a size string such
+            as "2GB"
+
+    Returns:
+        PeriodAggregator.table() output; pass it to analyze_timeseries
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If data format or freq is invalid
+        MemoryError: If a parsed chunk exceeds ``max_memory``
+    """
+    aggregator = PeriodAggregator(freq, timestamp_col)
+    for chunk in iter_csv_chunks(filepath, ['group', 'converted', timestamp_col], chunksize, max_memory,
+                                 dtype=ROW_LEVEL_DTYPES):
+        aggregator.update(chunk)
+    return aggregator.table()
@@ -7,7 +7,8 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from abtest import ztest_two_prop, power, load_aggregated_data, load_row_level_data
+from abtest import ztest_two_prop, power, bootstrap_lift_ci, load_aggregated_data, load_row_level_data
+from abtest import load_row_level_report, parse_size, UserDeduplicator, MultiMetricAggregator, load_row_level_metrics
 import numpy as np
 
 
@@ -89,6 +90,38 @@ class TestPower(unittest.TestCase):
             power(1000, 1000, 1.5)  # p_control > 1
 
 
+class TestBootstrap(unittest.TestCase):
+    
+    def test_bootstrap_close_to_wald(self):
+        """Bootstrap interval should be close to the Wald interval for large samples."""
+        boot = bootstrap_lift_ci(500, 10000, 560, 10000, n_resamples=20000, seed=1)
+        wald = ztest_two_prop(500, 10000, 560, 10000)
+        
+        self.assertAlmostEqual(boot['lift'], wald['lift'], places=10)
+        self.assertAlmostEqual(boot['ci'][0], wald['ci'][0], delta=0.001)
+        self.assertAlmostEqual(boot['ci'][1], wald['ci'][1], delta=0.001)
+    
+    def test_progress_callback(self):
+        """Progress is reported per batch and exceptions from it abort the run."""
+        calls = []
+        bootstrap_lift_ci(10, 100, 12, 100, n_resamples=2500, batch_size=1000, seed=0,
+                          progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual(calls, [(1000, 2500), (2000, 2500), (2500, 2500)])
+        
+        def abort(done, total):
+            raise RuntimeError("stop")
+        with self.assertRaises(RuntimeError):
+            bootstrap_lift_ci(10, 100, 12, 100, progress=abort)
+    
+    def test_invalid_inputs(self):
+        """Test error handling for invalid inputs."""
+        with self.assertRaises(ValueError):
+            bootstrap_lift_ci(150, 100, 50, 100)
+        
+        with self.assertRaises(ValueError):
+            bootstrap_lift_ci(10, 100, 12, 100, n_resamples=0)
+
+
 class TestDataLoading(unittest.TestCase):
     
     def test_load_aggregated_data(self):
@@ -135,6 +168,166 @@ class TestDataLoading(unittest.TestCase):
         finally:
             os.unlink(temp_path)
     
+    def test_load_row_level_data_chunked(self):
+        """Chunked streaming gives the same counts as a whole-file read."""
+        import io
+        
+        rows = "".join(f"u{i},{'AB'[i % 2]},{int(i % 3 == 0)}\n" for i in range(1000))
+        content = "user_id,group,converted\n" + rows
+        
+        expected = load_row_level_data(io.StringIO(content))
+        for chunksize in (1, 7, 1000, 5000):
+            self.assertEqual(load_row_level_data(io.StringIO(content), chunksize=chunksize), expected)
+    
+    def test_load_row_level_data_memory_ceiling(self):
+        """A chunk larger than max_memory raises MemoryError; a small one passes."""
+        import io
+        
+        content = "user_id,group,converted\n" + "".join(f"u{i},{'AB'[i % 2]},0\n" for i in range(1000))
+        with self.assertRaises(MemoryError):
+            load_row_level_data(io.StringIO(content), chunksize=1000, max_memory=1000)
+        self.assertEqual(load_row_level_data(io.StringIO(content), chunksize=10, max_memory=10000), (0, 500, 0, 500))
+    
+    def test_load_row_level_data_memory_budget(self):
+        """Given only a budget, chunks are sized to fit it and the counts are unchanged."""
+        import io
+        
+        rows = "".join(f"user_{i:08d},{'AB'[i % 2]},{int(i % 3 == 0)}\n" for i in range(30000))
+        content = "user_id,group,converted\n" + rows
+        expected = load_row_level_data(io.StringIO(content))
+        
+        self.assertEqual(load_row_level_data(io.StringIO(content), max_memory="256KB"), expected)
+        counts, report = load_row_level_report(io.StringIO(content), max_memory="256KB")
+        self.assertEqual(counts, expected)
+        self.assertEqual(report['max_memory'], 256000)
+        self.assertEqual(report['rows'], 30000)
+        self.assertGreater(report['chunks'], 3)
+        self.assertLessEqual(report['max_chunk_bytes'], 256000)
+        self.assertGreater(report['peak_traced_bytes'], 0)
+        self.assertIsNotNone(report['peak_rss_bytes'])
+    
+    def test_dedup_splits_memory_budget(self):
+        """With dedup, parsed chunks are sized from a quarter of max_memory and the records get the rest."""
+        import io
+        from abtest.core import DEDUP_DTYPES, ROW_LEVEL_COLUMNS, iter_csv_chunks
+        from abtest.memory import split_budget
+        
+        rows = "".join(f"user_{i % 50000:08d},{'AB'[i % 2]},{int(i % 3 == 0)}\n" for i in range(120000))
+        content = "user_id,group,converted\n" + rows
+        self.assertEqual(split_budget("8MB"), (2000000, 6000000))
+        self.assertEqual(split_budget(None), (None, None))
+        
+        counts, report = load_row_level_report(io.StringIO(content), max_memory="8MB", dedup="first")
+        self.assertEqual(counts, load_row_level_data(io.StringIO(content), dedup="first"))
+        parse_chunks = [len(chunk) for chunk in iter_csv_chunks(io.StringIO(content), ROW_LEVEL_COLUMNS, None,
+                                                                2000000, dtype=DEDUP_DTYPES)]
+        self.assertEqual(report['chunks'], len(parse_chunks))
+        self.assertEqual(report['max_chunk_rows'], max(parse_chunks))
+        self.assertGreater(report['spilled_rows'], 0)
+    
+    def test_parse_size(self):
+        """Sizes accept decimal and binary units."""
+        self.assertEqual(parse_size(1024), 1024)
+        self.assertEqual(parse_size("2GB"), 2 * 10 ** 9)
+        self.assertEqual(parse_size("1.5 GiB"), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_size("512m"), 512 * 1024 ** 2)
+        for bad in ("lots", "2 parsecs", "0", -5):
+            with self.assertRaises(ValueError):
+                parse_size(bad)
+    
+    def test_load_row_level_data_dedup(self):
+        """Dedup counts users once: first row wins, or converted if any row converted."""
+        import io
+        
+        content = (
+            "user_id,group,converted\n"
+            "u1,A,0\nu2,B,1\nu1,A,1\nu3,A,0\nu2,B,0\nu4,B,0\nu3,B,1\n"
+        )
+        self.assertEqual(load_row_level_data(io.StringIO(content)), (1, 3, 2, 4))
+        self.assertEqual(load_row_level_data(io.StringIO(content), dedup="first"), (0, 2, 1, 2))
+        self.assertEqual(load_row_level_data(io.StringIO(content), dedup="any"), (2, 2, 1, 2))
+        with self.assertRaises(ValueError):
+            load_row_level_data(io.StringIO(content), dedup="last")
+    
+    def test_dedup_spills_to_disk(self):
+        """Spilled and repartitioned deduplication matches the in-memory result."""
+        import pandas as pd
+        import tempfile
+        
+        rng = np.random.default_rng(0)
+        users = rng.integers(0, 2000, 20000)
+        chunk = pd.DataFrame({
+            'user_id': [f"u{u}" for u in users],
+            'group': np.where(users % 2, 'A', 'B'),
+            'converted': (rng.random(20000) < 0.2).astype(int),
+        })
+        for mode in ("first", "any"):
+            with UserDeduplicator(mode) as in_memory:
+                in_memory.update(chunk)
+                expected = in_memory.counts()
+            with tempfile.TemporaryDirectory() as spill_dir:
+                with UserDeduplicator(mode, max_memory=40000, partitions=4, spill_dir=spill_dir) as dedup:
+                    for start in range(0, len(chunk), 3000):
+                        dedup.update(chunk.iloc[start:start + 3000])
+                    self.assertEqual(dedup.counts(), expected)
+                    self.assertEqual(dedup.spilled_rows, 20000)
+                self.assertEqual(os.listdir(spill_dir), [])
+            self.assertEqual(expected[1] + expected[3], 2000)
+    
+    def test_load_aggregated_data_duplicates(self):
+        """Repeated group rows warn and use the first, or are summed, or raise."""
+        import io
+        import warnings
+        
+        content = "group,success,total\nA,10,100\nB,12,100\nA,5,50\n"
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(load_aggregated_data(io.StringIO(content)), (10, 100, 12, 100))
+        self.assertEqual(len(caught), 1)
+        self.assertEqual(load_aggregated_data(io.StringIO(content), duplicates="sum"), (15, 150, 12, 100))
+        with self.assertRaises(ValueError):
+            load_aggregated_data(io.StringIO(content), duplicates="error")
+    
+    def test_load_row_level_data_chunked_invalid(self):
+        """Chunked loading validates columns and converted values."""
+        import io
+        
+        with self.assertRaises(ValueError):
+            load_row_level_data(io.StringIO("user_id,group\nu1,A\n"), chunksize=10)
+        with self.assertRaises(ValueError):
+            load_row_level_data(io.StringIO("user_id,group,converted\nu1,A,2\nu2,B,0\n"), chunksize=10)
+        with self.assertRaises(FileNotFoundError):
+            load_row_level_data("nonexistent_file.csv", chunksize=10)
+    
+    def test_load_row_level_metrics(self):
+        """Every metric column is counted in one scan, matching a per-metric load."""
+        import io
+        import pandas as pd
+        
+        rows = "".join(f"u{i},{'AB'[i % 2]},{int(i % 3 == 0)},{int(i % 5 == 0)}\n" for i in range(1000))
+        content = "user_id,group,signup,purchase\n" + rows
+        
+        table = load_row_level_metrics(io.StringIO(content), ['signup', 'purchase'], chunksize=77)
+        self.assertEqual(list(table['metric']), ['signup', 'purchase'])
+        for i, metric in enumerate(['signup', 'purchase']):
+            single = load_row_level_data(io.StringIO(content.replace(metric, 'converted', 1)))
+            self.assertEqual(tuple(table.iloc[i, 1:]), single)
+        
+        whole, left, right = (MultiMetricAggregator(['signup', 'purchase']) for _ in range(3))
+        df = pd.read_csv(io.StringIO(content))
+        whole.update(df)
+        left.update(df[:300])
+        right.update(df[300:])
+        left.merge(right)
+        self.assertTrue(left.table().equals(whole.table()))
+        
+        with self.assertRaises(ValueError):
+            load_row_level_metrics(io.StringIO("group,signup\nA,1\nB,2\n"), ['signup'])
+        with self.assertRaises(ValueError):
+            load_row_level_metrics(io.StringIO("group,signup\nA,1\nA,0\n"), ['signup'])
+        with self.assertRaises(ValueError):
+            load_row_level_metrics(io.StringIO("group,signup\nA,1\nB,0\n"), ['signup', 'purchase'])
+    
     def test_load_missing_file(self):
         """Test error handling for missing file."""
         with self.assertRaises(FileNotFoundError):
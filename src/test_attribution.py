@@ -0,0 +1,113 @@
+"""
+Unit tests for time-windowed conversion attribution.
+"""
+
+import unittest
+import sys
+import os
+import io
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from abtest import WindowedAttribution, load_windowed_counts
+
+
+def event_streams(n_users=5000, seed=0):
+    """Repeat exposures and conversions spread over a month."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-05-01')
+    users = rng.integers(0, n_users, 3 * n_users)
+    exposures = pd.DataFrame({
+        'user_id': users.astype(str),
+        'group': np.where(users % 2 == 0, 'A', 'B'),
+        'timestamp': start + pd.to_timedelta(rng.uniform(0, 30 * 86400, len(users)), unit='s'),
+    })
+    conversions = pd.DataFrame({
+        'user_id': rng.integers(0, 2 * n_users, 2 * n_users).astype(str),
+        'timestamp': start + pd.to_timedelta(rng.uniform(0, 32 * 86400, 2 * n_users), unit='s'),
+    })
+    return exposures, conversions
+
+
+def merge_asof_counts(exposures, conversions, hours):
+    """Reference counts from pandas.merge_asof on the first exposure per user."""
+    first = exposures.sort_values('timestamp', kind='stable').groupby('user_id').first().reset_index()
+    joined = pd.merge_asof(conversions.sort_values('timestamp'),
+                           first.rename(columns={'timestamp': 'exposed'}).sort_values('exposed'),
+                           left_on='timestamp', right_on='exposed', by='user_id',
+                           direction='backward', tolerance=pd.Timedelta(hours=hours))
+    first['converted'] = first['user_id'].isin(joined.dropna(subset=['exposed'])['user_id'])
+    a, b = first[first['group'] == 'A'], first[first['group'] == 'B']
+    return int(a['converted'].sum()), len(a), int(b['converted'].sum()), len(b)
+
+
+class TestWindowedAttribution(unittest.TestCase):
+
+    def test_matches_merge_asof(self):
+        """Streamed attribution equals merge_asof on the first exposures, for several windows."""
+        exposures, conversions = event_streams()
+        for hours in (1, 24, 24 * 7):
+            counts = load_windowed_counts(io.StringIO(exposures.to_csv(index=False)),
+                                          io.StringIO(conversions.to_csv(index=False)), hours, chunksize=2000)
+            self.assertEqual(counts, merge_asof_counts(exposures, conversions, hours))
+
+    def test_spills_to_disk(self):
+        """A tiny budget spills both streams and gives the same counts."""
+        exposures, conversions = event_streams(seed=1)
+        with tempfile.TemporaryDirectory() as spill_dir:
+            with WindowedAttribution("1D", max_memory="64KB", partitions=4, spill_dir=spill_dir) as attribution:
+                for start in range(0, len(conversions), 3000):
+                    attribution.add_conversions(conversions[start:start + 3000])
+                for start in range(0, len(exposures), 3000):
+                    attribution.add_exposures(exposures[start:start + 3000])
+                self.assertGreater(attribution.spilled_rows, 0)
+                self.assertEqual(attribution.counts(), merge_asof_counts(exposures, conversions, 24))
+            self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_repartitions_large_spills(self):
+        """Partitions over budget are split again, even around one user with thousands of exposures."""
+        exposures, conversions = event_streams(seed=2)
+        heavy = pd.DataFrame({'user_id': 'heavy', 'group': 'B',
+                              'timestamp': pd.Timestamp('2024-05-02') + pd.to_timedelta(np.arange(6000), unit='s')})
+        exposures = pd.concat([exposures, heavy], ignore_index=True)
+        conversions = pd.concat([conversions, pd.DataFrame({'user_id': ['heavy'],
+                                                            'timestamp': [pd.Timestamp('2024-05-02T12:00')]})],
+                                ignore_index=True)
+        with tempfile.TemporaryDirectory() as spill_dir:
+            with WindowedAttribution(24, max_memory="64KB", partitions=2, spill_dir=spill_dir) as attribution:
+                for start in range(0, len(exposures), 4000):
+                    attribution.add_exposures(exposures[start:start + 4000])
+                for start in range(0, len(conversions), 4000):
+                    attribution.add_conversions(conversions[start:start + 4000])
+                self.assertEqual(attribution.counts(), merge_asof_counts(exposures, conversions, 24))
+            self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_window_edges(self):
+        """Conversions before the first exposure or after the window do not count."""
+        exposures = pd.DataFrame({'user_id': ['u1', 'u2', 'u3', 'u1'], 'group': ['A', 'B', 'B', 'A'],
+                                  'timestamp': [0, 0, 0, 100]})
+        conversions = pd.DataFrame({'user_id': ['u1', 'u2', 'u3', 'u4'], 'timestamp': [3600, 3601, -1, 10]})
+        attribution = WindowedAttribution(1)
+        attribution.add_exposures(exposures)
+        attribution.add_conversions(conversions)
+        self.assertEqual(attribution.counts(), (1, 1, 0, 2))
+
+    def test_errors(self):
+        """Bad windows, timestamps and missing variants raise ValueError."""
+        for window in (-1, "soon"):
+            with self.assertRaises(ValueError):
+                WindowedAttribution(window)
+        with self.assertRaises(ValueError):
+            WindowedAttribution(1).add_conversions(pd.DataFrame({'user_id': ['u1'], 'timestamp': ['not a time']}))
+        with self.assertRaises(ValueError):
+            load_windowed_counts(io.StringIO("user_id,group,timestamp\nu1,A,2024-05-01\n"),
+                                 io.StringIO("user_id,timestamp\n"), 24)
+        with self.assertRaises(ValueError):
+            load_windowed_counts(io.StringIO("user_id,group\nu1,A\n"), io.StringIO("user_id,timestamp\n"), 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
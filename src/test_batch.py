@@ -0,0 +1,354 @@
+"""
+Unit tests for vectorized A/B test statistics and the batch CLI.
+"""
+
+import unittest
+import asyncio
+import time
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from abtest import ztest_two_prop, power, ztest_two_prop_batch, power_batch, analyze_counts, analyze_files
+from abtest import srm_test, srm_test_batch, adjust_pvalues, add_adjusted_pvalues, cumulative_power, forecast_duration
+from abtest import iter_load_aggregated, load_aggregated_table, load_row_level_data, load_row_level_experiments
+from abtest.cli import expand_inputs, main
+import numpy as np
+import pandas as pd
+
+
+class TestZTestBatch(unittest.TestCase):
+    
+    def test_matches_scalar(self):
+        """Batch z-test matches ztest_two_prop element by element."""
+        sa = np.array([123, 100, 10, 500])
+        ta = np.array([5000, 1000, 200, 20000])
+        sb = np.array([155, 120, 15, 480])
+        tb = np.array([5000, 1000, 180, 21000])
+        
+        batch = ztest_two_prop_batch(sa, ta, sb, tb, alpha=0.01)
+        for i in range(len(sa)):
+            scalar = ztest_two_prop(int(sa[i]), int(ta[i]), int(sb[i]), int(tb[i]), alpha=0.01)
+            self.assertAlmostEqual(batch['z'][i], scalar['z'], places=10)
+            self.assertAlmostEqual(batch['p'][i], scalar['p'], places=10)
+            self.assertAlmostEqual(batch['lift'][i], scalar['lift'], places=12)
+            self.assertAlmostEqual(batch['ci_lower'][i], scalar['ci'][0], places=12)
+            self.assertAlmostEqual(batch['ci_upper'][i], scalar['ci'][1], places=12)
+    
+    def test_ci_methods(self):
+        """Every interval method matches statsmodels and the scalar z-test."""
+        from statsmodels.stats.proportion import confint_proportions_2indep
+        sa, ta = np.array([0, 123, 10, 1]), np.array([50, 5000, 10, 1000])
+        sb, tb = np.array([3, 155, 0, 4]), np.array([60, 5000, 5, 900])
+        for method, name in (('wald', 'wald'), ('newcombe', 'newcomb'), ('agresti-caffo', 'agresti-caffo')):
+            batch = ztest_two_prop_batch(sa, ta, sb, tb, alpha=0.1, ci_method=method)
+            for i in range(len(sa)):
+                expected = confint_proportions_2indep(sb[i], tb[i], sa[i], ta[i], method=name, alpha=0.1)
+                scalar = ztest_two_prop(int(sa[i]), int(ta[i]), int(sb[i]), int(tb[i]), alpha=0.1, ci_method=method)
+                self.assertAlmostEqual(batch['ci_lower'][i], expected[0], places=12)
+                self.assertAlmostEqual(batch['ci_upper'][i], expected[1], places=12)
+                self.assertAlmostEqual(scalar['ci'][0], expected[0], places=12)
+        # Unlike Wald, the score interval does not collapse with zero conversions
+        self.assertEqual(ztest_two_prop_batch(0, 50, 0, 50)['ci_upper'], 0)
+        self.assertGreater(ztest_two_prop_batch(0, 50, 0, 50, ci_method='newcombe')['ci_upper'], 0.05)
+        with self.assertRaises(ValueError):
+            ztest_two_prop_batch(1, 10, 2, 10, ci_method='exact')
+    
+    def test_invalid_inputs(self):
+        """Any invalid element raises ValueError."""
+        with self.assertRaises(ValueError):
+            ztest_two_prop_batch([1, 150], [100, 100], [1, 1], [100, 100])
+        with self.assertRaises(ValueError):
+            ztest_two_prop_batch([1, 1], [100, 0], [1, 1], [100, 100])
+
+
+class TestPowerBatch(unittest.TestCase):
+    
+    def test_matches_scalar(self):
+        """Batch power matches power() including unequal allocation."""
+        n_a = np.array([5000, 1000, 2000])
+        n_b = np.array([5000, 1000, 3000])
+        p_control = np.array([0.0246, 0.05, 0.1])
+        mde = np.array([0.02, 0.01, 0.005])
+        
+        batch = power_batch(n_a, n_b, p_control, mde, alpha=0.05)
+        for i in range(len(n_a)):
+            self.assertAlmostEqual(batch[i], power(int(n_a[i]), int(n_b[i]), p_control[i], mde[i]), places=10)
+    
+    def test_broadcasting(self):
+        """Scalar sample sizes broadcast against an MDE grid."""
+        result = power_batch(1000, 1000, 0.05, np.array([0.01, 0.02, 0.05]))
+        self.assertEqual(result.shape, (3,))
+        self.assertTrue(np.all(np.diff(result) > 0))
+    
+    def test_forecast_duration(self):
+        """Each scenario's day is the first whose cumulative traffic gives target power."""
+        week = [1000, 1100, 1050, 1000, 900, 500, 450]
+        mde, share = np.array([0.005, 0.01, 0.02]), np.array([0.5, 0.8])
+        forecast = forecast_duration(week, 0.1, mde, share, horizon=98)
+        users = np.cumsum(np.resize(week, 98))
+        
+        self.assertEqual(len(forecast), 6)
+        self.assertTrue(forecast['days'].isna()[0])
+        for row in forecast.dropna().itertuples():
+            at = lambda day: power(users[day - 1] * (1 - row.share_b), users[day - 1] * row.share_b, 0.1, row.mde)
+            self.assertGreaterEqual(at(row.days), 0.8)
+            self.assertAlmostEqual(row.power, at(row.days), places=10)
+            if row.days > 1:
+                self.assertLess(at(row.days - 1), 0.8)
+        # Unequal splits need longer
+        days = forecast.set_index(['mde', 'share_b'])['days']
+        self.assertGreater(days[(0.01, 0.8)], days[(0.01, 0.5)])
+        
+        curves = cumulative_power([0, 0, 500], 0.1, mde, share)
+        self.assertEqual(curves.shape, (3, 2, 3))
+        self.assertTrue(np.all(curves[..., :2] == 0))
+        for kwargs in ({'share_b': 1.0}, {'min_detectable_diff': 0.95}, {'target_power': 1.0}, {'horizon': 0}):
+            with self.assertRaises(ValueError):
+                forecast_duration(week, 0.1, **{'min_detectable_diff': 0.01, **kwargs})
+        with self.assertRaises(ValueError):
+            forecast_duration([100, -1], 0.1)
+
+
+class TestSRM(unittest.TestCase):
+    
+    def test_scalar_matches_chisquare(self):
+        """srm_test agrees with scipy's chi-square goodness-of-fit test."""
+        from scipy import stats
+        result = srm_test([50_800, 49_200])
+        expected = stats.chisquare([50_800, 49_200])
+        self.assertAlmostEqual(result['chi2'], expected.statistic, places=10)
+        self.assertAlmostEqual(result['p'], expected.pvalue, places=12)
+        self.assertLess(result['p'], 0.001)
+        self.assertGreater(srm_test([2000, 8000], allocation=(20, 80))['p'], 0.99)
+    
+    def test_batch_matches_scalar(self):
+        """Batch SRM matches srm_test per row, for A/B/n and per-row allocations."""
+        totals = np.array([[5000, 5100, 4900], [1000, 1300, 1100], [200, 410, 390]])
+        allocation = np.array([[1, 1, 1], [1, 1, 1], [1, 2, 2]])
+        batch = srm_test_batch(totals, allocation)
+        for i in range(len(totals)):
+            scalar = srm_test(totals[i], allocation[i])
+            self.assertAlmostEqual(batch['chi2'][i], scalar['chi2'], places=10)
+            self.assertAlmostEqual(batch['p'][i], scalar['p'], places=12)
+    
+    def test_invalid_inputs(self):
+        """Bad arm counts or allocations raise ValueError."""
+        with self.assertRaises(ValueError):
+            srm_test([100])
+        with self.assertRaises(ValueError):
+            srm_test([0, 0])
+        with self.assertRaises(ValueError):
+            srm_test([10, 10], allocation=(1, 0))
+        with self.assertRaises(ValueError):
+            srm_test_batch([[10, 10], [10, 10]], allocation=(1, 1, 1))
+        with self.assertRaises(ValueError):
+            srm_test_batch([[10, -1]])
+    
+    def test_analyze_counts_flags_mismatch(self):
+        """analyze_counts flags a broken split and respects the designed allocation."""
+        counts = pd.DataFrame({
+            'success_a': [100, 100], 'total_a': [5000, 5000],
+            'success_b': [120, 50], 'total_b': [5050, 500],
+        })
+        result = analyze_counts(counts)
+        self.assertEqual(list(result['srm']), [False, True])
+        self.assertAlmostEqual(result['srm_p'][1], srm_test([5000, 500])['p'], places=12)
+        self.assertFalse(analyze_counts(counts, allocation=(10, 1))['srm'][1])
+
+
+class TestPValueCorrection(unittest.TestCase):
+    
+    def test_matches_statsmodels(self):
+        """BH, BY and Holm agree with statsmodels' multipletests, including ties."""
+        from statsmodels.stats.multitest import multipletests
+        rng = np.random.default_rng(7)
+        p = np.concatenate([rng.uniform(size=500), rng.uniform(0, 1e-3, size=50)])
+        p[::9] = p[4]
+        for method, name in (('bh', 'fdr_bh'), ('by', 'fdr_by'), ('holm', 'holm')):
+            np.testing.assert_allclose(adjust_pvalues(p, method), multipletests(p, method=name)[1], rtol=1e-12)
+    
+    def test_nan_and_invalid(self):
+        """NaN p-values stay NaN and are not counted; bad input raises ValueError."""
+        np.testing.assert_allclose(adjust_pvalues([0.01, np.nan, 0.04], 'bh'), [0.02, np.nan, 0.04])
+        self.assertEqual(adjust_pvalues([], 'holm').shape, (0,))
+        with self.assertRaises(ValueError):
+            adjust_pvalues([0.5, 1.5])
+        with self.assertRaises(ValueError):
+            adjust_pvalues([0.5], method='bonferroni')
+    
+    def test_add_adjusted_pvalues(self):
+        """The table gains p_adj and reject columns."""
+        table = pd.DataFrame({'experiment_id': ['a', 'b', 'c'], 'p': [0.001, 0.02, 0.03]})
+        result = add_adjusted_pvalues(table, 'holm', alpha=0.05)
+        np.testing.assert_allclose(result['p_adj'], [0.003, 0.04, 0.04])
+        self.assertEqual(list(result['reject']), [True, True, True])
+        self.assertEqual(list(add_adjusted_pvalues(table, 'by')['reject']), [True, False, False])
+        self.assertNotIn('p_adj', table.columns)
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        for i in range(3):
+            with open(os.path.join(self.dir, f"exp{i}.csv"), "w") as f:
+                f.write(f"group,success,total\nA,{100 + i},5000\nB,{150 + i},5000\n")
+        with open(os.path.join(self.dir, "rows.csv"), "w") as f:
+            f.write("user_id,group,converted\nu1,A,0\nu2,A,1\nu3,B,1\nu4,B,1\n")
+        with open(os.path.join(self.dir, "bad.csv"), "w") as f:
+            f.write("foo,bar\n1,2\n")
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_analyze_counts(self):
+        """analyze_counts adds statistics columns and keeps extra columns."""
+        counts = pd.DataFrame({
+            'experiment_id': ['x', 'y'],
+            'success_a': [123, 100], 'total_a': [5000, 1000],
+            'success_b': [155, 120], 'total_b': [5000, 1000],
+        })
+        result = analyze_counts(counts)
+        self.assertEqual(list(result['experiment_id']), ['x', 'y'])
+        self.assertAlmostEqual(result['p'][0], ztest_two_prop(123, 5000, 155, 5000)['p'], places=10)
+        self.assertAlmostEqual(result['power'][1], power(1000, 1000, 0.1), places=10)
+    
+    def test_analyze_files_records_errors(self):
+        """Bad files become error rows; good files are analyzed in order."""
+        paths = expand_inputs([self.dir])
+        table = analyze_files(paths, max_workers=2)
+        
+        self.assertEqual(list(table['experiment_id']), ['bad', 'exp0', 'exp1', 'exp2', 'rows'])
+        self.assertTrue(table['error'][0].startswith('ValueError'))
+        self.assertTrue(table['error'][1:].isna().all())
+        self.assertEqual(int(table['success_b'][4]), 2)
+        self.assertTrue(np.isnan(table['p'][0]))
+    
+    def test_multi_experiment_file(self):
+        """One export holding many experiments is split by experiment_id in one scan."""
+        import io
+        
+        rng = np.random.default_rng(0)
+        n = 3000
+        rows = pd.DataFrame({
+            'experiment_id': rng.choice(['checkout', 'onboarding', 'search'], n),
+            'user_id': np.arange(n),
+            'group': rng.choice(['A', 'B'], n),
+            'converted': rng.integers(0, 2, n),
+        })
+        # An experiment that only logged its control arm
+        rows = pd.concat([rows, pd.DataFrame({'experiment_id': ['pricing'] * 2, 'user_id': [-1, -2],
+                                              'group': ['A', 'A'], 'converted': [0, 1]})])
+        path = os.path.join(self.dir, "shared", "exposures.csv")
+        os.makedirs(os.path.dirname(path))
+        rows.to_csv(path, index=False)
+        
+        table = load_row_level_experiments(path, chunksize=500)
+        self.assertEqual(list(table.columns), ['experiment_id', 'success_a', 'total_a', 'success_b', 'total_b'])
+        for experiment_id, *counts in table.itertuples(index=False):
+            if experiment_id != 'pricing':
+                subset = rows[rows['experiment_id'] == experiment_id].drop(columns='experiment_id')
+                self.assertEqual(tuple(counts), load_row_level_data(io.StringIO(subset.to_csv(index=False))))
+        
+        results = analyze_files([path, path], max_workers=2, experiment_col='experiment_id').set_index(
+            ['experiment_id', 'path'], append=True)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(results['error'].xs('pricing', level=1).str.contains('Variant B').all())
+        self.assertEqual(int(results['p'].notna().sum()), 6)
+        
+        out = os.path.join(self.dir, "split.csv")
+        self.assertEqual(main(["batch", path, "-o", out, "-j", "1", "--experiment-col", "experiment_id"]), 1)
+        self.assertEqual(sorted(pd.read_csv(out)['experiment_id']), ['checkout', 'onboarding', 'pricing', 'search'])
+        self.assertEqual(main(["batch", path, "-o", out, "--experiment-col", "experiment_id", "--dedup", "any"]), 2)
+    
+    def test_cli_writes_each_format(self):
+        """The CLI writes CSV, JSON and Parquet results and exits non-zero on errors."""
+        inputs = [os.path.join(self.dir, "exp*.csv")]
+        
+        out_csv = os.path.join(self.dir, "out.csv")
+        self.assertEqual(main(["batch", *inputs, "-o", out_csv, "-j", "1"]), 0)
+        self.assertEqual(len(pd.read_csv(out_csv)), 3)
+        
+        out_json = os.path.join(self.dir, "out.json")
+        self.assertEqual(main(["batch", *inputs, "-o", out_json, "-j", "1"]), 0)
+        self.assertEqual(len(pd.read_json(out_json)), 3)
+        
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            out_parquet = os.path.join(self.dir, "out.parquet")
+            self.assertEqual(main(["batch", *inputs, "-o", out_parquet, "-j", "1"]), 0)
+            self.assertEqual(len(pd.read_parquet(out_parquet)), 3)
+        
+        out_srm = os.path.join(self.dir, "srm.csv")
+        self.assertEqual(main(["batch", *inputs, "-o", out_srm, "-j", "1", "--allocation", "9:1"]), 0)
+        self.assertTrue(pd.read_csv(out_srm)['srm'].all())
+        
+        out_adj = os.path.join(self.dir, "adjusted.csv")
+        self.assertEqual(main(["batch", *inputs, "-o", out_adj, "-j", "1", "--correction", "holm"]), 0)
+        self.assertEqual(list(pd.read_csv(out_adj).columns[-3:]), ['p_adj', 'reject', 'error'])
+        
+        out_ci = os.path.join(self.dir, "newcombe.csv")
+        self.assertEqual(main(["batch", *inputs, "-o", out_ci, "-j", "1", "--ci-method", "newcombe"]), 0)
+        self.assertAlmostEqual(pd.read_csv(out_ci)['ci_lower'][0],
+                               ztest_two_prop(100, 5000, 150, 5000, ci_method='newcombe')['ci'][0], places=10)
+        
+        self.assertEqual(main(["batch", self.dir, "-o", os.path.join(self.dir, "all.csv"), "-j", "1"]), 1)
+        self.assertEqual(main(["batch", self.dir, "-o", os.path.join(self.dir, "out.txt")]), 2)
+
+
+class TestAsyncLoading(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(20):
+            path = os.path.join(self.tmpdir.name, f"exp{i:02d}.csv")
+            with open(path, "w") as f:
+                f.write(f"group,success,total\nA,{i},1000\nB,{i + 1},1000\n")
+            self.paths.append(path)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_load_aggregated_table(self):
+        """Concurrent loading returns every file's counts in input order."""
+        table = load_aggregated_table(self.paths, max_concurrency=4)
+        self.assertEqual(list(table['experiment_id']), [f"exp{i:02d}" for i in range(20)])
+        self.assertEqual(list(table['success_b']), list(range(1, 21)))
+    
+    def test_reads_overlap(self):
+        """Slow reads overlap up to max_concurrency instead of adding up."""
+        from abtest import load_aggregated_data
+        
+        def slow_loader(path):
+            time.sleep(0.1)
+            return load_aggregated_data(path)
+        
+        start = time.perf_counter()
+        table = load_aggregated_table(self.paths, max_concurrency=10, loader=slow_loader)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(table), 20)
+        self.assertLess(elapsed, 1.0)
+    
+    def test_errors(self):
+        """Failures raise by default or are yielded with return_exceptions."""
+        paths = self.paths[:3] + [os.path.join(self.tmpdir.name, "missing.csv")]
+        with self.assertRaises(FileNotFoundError):
+            load_aggregated_table(paths)
+        
+        async def collect():
+            return {eid: result async for eid, result in iter_load_aggregated(paths, return_exceptions=True)}
+        
+        results = asyncio.run(collect())
+        self.assertIsInstance(results['missing'], FileNotFoundError)
+        self.assertEqual(results['exp00'], (0, 1000, 1, 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
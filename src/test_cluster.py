@@ -0,0 +1,86 @@
+"""
+Unit tests for cluster-robust z-tests.
+"""
+
+import unittest
+import sys
+import os
+import io
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from abtest import ClusterAggregator, cluster_robust_ztest, load_clustered, ztest_two_prop
+
+
+def clustered_rows(n_clusters=300, seed=0):
+    """Store-randomized visits with a per-store conversion effect."""
+    rng = np.random.default_rng(seed)
+    store_group = rng.choice(['A', 'B'], n_clusters)
+    store = np.repeat(np.arange(n_clusters), rng.integers(5, 200, n_clusters))
+    group = store_group[store]
+    p = np.clip(0.1 + rng.normal(0, 0.05, n_clusters)[store] + 0.01 * (group == 'B'), 0, 1)
+    return pd.DataFrame({
+        'user_id': np.arange(len(store)),
+        'group': group,
+        'converted': (rng.uniform(size=len(store)) < p).astype(int),
+        'store_id': store,
+    })
+
+
+class TestClusterRobust(unittest.TestCase):
+
+    def test_matches_statsmodels_cluster_ols(self):
+        """The standard error equals statsmodels' OLS cluster covariance."""
+        import statsmodels.api as sm
+
+        rows = clustered_rows()
+        result = load_clustered(io.StringIO(rows.to_csv(index=False)), 'store_id', chunksize=1000).ztest()
+
+        design = sm.add_constant((rows['group'] == 'B').astype(float))
+        fit = sm.OLS(rows['converted'].astype(float), design).fit(
+            cov_type='cluster', cov_kwds={'groups': rows['store_id']})
+        self.assertAlmostEqual(result['lift'], fit.params.iloc[1], places=12)
+        self.assertAlmostEqual(result['se'], fit.bse.iloc[1], places=12)
+        self.assertEqual(result['n_clusters'], 300)
+        # Store effects make the binomial variance far too small
+        self.assertGreater(result['design_effect'], 2)
+
+    def test_singleton_clusters_match_unpooled_variance(self):
+        """With one visitor per cluster the robust SE is the unpooled binomial SE."""
+        rows = clustered_rows(seed=1).assign(store_id=lambda df: np.arange(len(df)))
+        aggregator = ClusterAggregator('store_id')
+        aggregator.update(rows)
+        result = aggregator.ztest()
+        counts = aggregator.counts()
+        plain = ztest_two_prop(*counts)
+        self.assertAlmostEqual(result['lift'], plain['lift'], places=12)
+        self.assertAlmostEqual(result['design_effect'], 1.0, places=3)
+        self.assertAlmostEqual(result['ci'][0], plain['ci'][0], places=5)
+
+    def test_merge_shards(self):
+        """Shards merge into the same cluster totals as one pass."""
+        rows = clustered_rows(seed=2)
+        whole, left, right = (ClusterAggregator('store_id') for _ in range(3))
+        whole.update(rows)
+        left.update(rows[:5000])
+        right.update(rows[5000:])
+        left.merge(right)
+        self.assertEqual(left.ztest(), whole.ztest())
+        self.assertEqual(left.rows, len(rows))
+
+    def test_errors(self):
+        """Invalid counts and data raise ValueError."""
+        with self.assertRaises(ValueError):
+            cluster_robust_ztest([1], [10], [2], [10])
+        with self.assertRaises(ValueError):
+            cluster_robust_ztest([1, 0], [10, 0], [0, 0], [0, 0])
+        with self.assertRaises(ValueError):
+            load_clustered(io.StringIO("group,converted,store_id\nA,1,\nB,0,s2\n"), 'store_id')
+        with self.assertRaises(ValueError):
+            load_clustered(io.StringIO("group,converted\nA,1\nB,0\n"), 'store_id')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Unit tests for the benchmark regression guard (benchmarks/compare.py).
+"""
+
+import unittest
+import sys
+import os
+import io
+import json
+import tempfile
+import contextlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import numpy as np
+
+import compare
+
+MIB = 1 << 20
+
+
+def result(times, peak=10 * MIB, name="ztest_two_prop_batch", size=1000):
+    return {"name": name, "size": size, "times_s": list(times), "peak_traced_bytes": peak}
+
+
+def timings(median, n=10, spread=0.01, seed=0):
+    """n timings around median with a relative jitter of about ``spread``."""
+    rng = np.random.default_rng(seed)
+    return (median * (1 + spread * rng.uniform(-1, 1, n))).tolist()
+
+
+class TestCompareResult(unittest.TestCase):
+
+    def test_clear_slowdown_is_flagged(self):
+        """A 30% slowdown with low noise and enough repeats is a time regression."""
+        row = compare.compare_result(result(timings(1.0)), result(timings(1.3, seed=1)))
+        self.assertAlmostEqual(row["time_ratio"], 1.3, delta=0.02)
+        self.assertLess(row["p_value"], 0.01)
+        self.assertTrue(row["time_regression"])
+        self.assertFalse(row["memory_regression"])
+
+    def test_slowdown_below_threshold(self):
+        """A significant but 5% slowdown stays under the 10% threshold."""
+        row = compare.compare_result(result(timings(1.0, spread=0.001)), result(timings(1.05, spread=0.001, seed=1)))
+        self.assertLess(row["p_value"], 0.01)
+        self.assertFalse(row["time_regression"])
+        self.assertTrue(compare.compare_result(result(timings(1.0, spread=0.001)),
+                                               result(timings(1.05, spread=0.001, seed=1)),
+                                               time_threshold=0.03)["time_regression"])
+
+    def test_noise_gate(self):
+        """A significant 30% slowdown is not flagged when the runs' own noise is 20%."""
+        spread = 1 + 0.4 * np.linspace(-1, 1, 40)
+        base, cur = result(spread), result(1.3 * spread)
+        row = compare.compare_result(base, cur)
+        self.assertAlmostEqual(row["time_ratio"], 1.3)
+        self.assertAlmostEqual(row["noise"], 0.2, delta=0.01)
+        self.assertLess(row["p_value"], 0.01)
+        self.assertFalse(row["time_regression"])
+        self.assertTrue(compare.compare_result(base, cur, noise_factor=1.0)["time_regression"])
+
+    def test_mann_whitney_gate(self):
+        """With three runs each, Mann-Whitney can't reach alpha=0.01, so a 50% slowdown passes."""
+        row = compare.compare_result(result([1.0, 1.001, 0.999]), result([1.5, 1.501, 1.499]))
+        self.assertAlmostEqual(row["p_value"], 0.05)
+        self.assertFalse(row["time_regression"])
+        self.assertTrue(compare.compare_result(result([1.0, 1.001, 0.999]), result([1.5, 1.501, 1.499]),
+                                               alpha=0.1)["time_regression"])
+
+    def test_single_run_skips_mann_whitney(self):
+        """With one timing per side only the threshold decides."""
+        row = compare.compare_result(result([1.0]), result([1.2]))
+        self.assertTrue(np.isnan(row["p_value"]))
+        self.assertTrue(row["time_regression"])
+        self.assertFalse(compare.compare_result(result([1.0]), result([0.8]))["time_regression"])
+
+    def test_memory_gate(self):
+        """Peak memory must grow by more than 10% and by more than 1 MiB."""
+        base = timings(1.0)
+        cases = [
+            (10 * MIB, 12 * MIB, True),       # +20%, +2 MiB
+            (10 * MIB, 10.5 * MIB, False),    # +5%
+            (2 * MIB, 2.5 * MIB, False),      # +25% but only +0.5 MiB
+            (100 * MIB, 109 * MIB, False),    # +9 MiB but only +9%
+            (10 * MIB, 8 * MIB, False),       # less memory
+        ]
+        for base_peak, cur_peak, flagged in cases:
+            row = compare.compare_result(result(base, peak=base_peak), result(base, peak=int(cur_peak)))
+            self.assertEqual(row["memory_regression"], flagged, (base_peak, cur_peak))
+            self.assertFalse(row["time_regression"])
+
+
+class TestCompareMain(unittest.TestCase):
+
+    def run_main(self, baseline, current):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for label, report in (("baseline", baseline), ("current", current)):
+                paths.append(os.path.join(tmp, f"{label}.json"))
+                with open(paths[-1], "w") as f:
+                    json.dump(report, f)
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                return compare.main([paths[0], "--current", paths[1]])
+
+    def test_exit_status(self):
+        """Exit status 1 on any regression, 0 otherwise; unmatched benchmarks are ignored."""
+        baseline = {"results": [result(timings(1.0)), result(timings(1.0), name="power_batch")]}
+        same = {"results": [result(timings(1.0, seed=2)), result(timings(1.0, seed=3), name="power_batch")]}
+        slower = {"results": [result(timings(1.0, seed=2)), result(timings(2.0, seed=3), name="power_batch")]}
+        unmatched = {"results": [result(timings(1.0, seed=2)), result(timings(2.0), name="power_batch", size=10)]}
+        self.assertEqual(self.run_main(baseline, same), 0)
+        self.assertEqual(self.run_main(baseline, slower), 1)
+        self.assertEqual(self.run_main(baseline, unmatched), 0)
+        self.assertEqual(len(compare.compare_reports(baseline, unmatched)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Unit tests for continuous-metric Welch t-tests from streaming moments.
+"""
+
+import unittest
+import sys
+import os
+import io
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from abtest import CupedAggregator, MomentAggregator, RatioAggregator, analyze_moments, load_cuped, load_moments
+from abtest import load_ratios, welch_ttest_batch, ztest_means_batch
+
+
+def make_rows(n=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame({
+        'user_id': np.arange(n),
+        'group': rng.choice(['A', 'B'], n),
+        # A large offset breaks a naive sum-of-squares variance
+        'revenue': 1e9 + rng.exponential(5, n),
+        'seconds': rng.normal(60, 20, n),
+    })
+    rows.loc[rng.choice(n, 100, replace=False), 'seconds'] = np.nan
+    return rows
+
+
+class TestMomentAggregator(unittest.TestCase):
+
+    def test_streaming_matches_scipy(self):
+        """Chunked moments give the same Welch test as scipy on the raw values."""
+        rows = make_rows()
+        buf = io.StringIO(rows.to_csv(index=False))
+        result = analyze_moments(load_moments(buf, ['revenue', 'seconds'], chunksize=777).table())
+
+        self.assertEqual(list(result['metric']), ['revenue', 'seconds'])
+        for i, metric in enumerate(['revenue', 'seconds']):
+            a = rows.loc[rows['group'] == 'A', metric].dropna()
+            b = rows.loc[rows['group'] == 'B', metric].dropna()
+            expected = stats.ttest_ind(a, b, equal_var=False)
+            self.assertEqual(result['n_a'][i], len(a))
+            self.assertAlmostEqual(result['var_b'][i], b.var(), delta=1e-7 * b.var())
+            # Means near 1e9 carry about 1e-7 of rounding, so compare t relatively
+            self.assertAlmostEqual(result['t'][i], expected.statistic, delta=1e-3 * abs(expected.statistic))
+            self.assertAlmostEqual(result['p'][i], expected.pvalue, places=5)
+            self.assertAlmostEqual(result['df'][i], expected.df, places=3)
+            self.assertAlmostEqual(result['lift'][i], b.mean() - a.mean(), places=6)
+
+    def test_merge_shards(self):
+        """Merging shard aggregators equals aggregating all rows at once."""
+        rows = make_rows(5000, seed=2)
+        whole, left, right = (MomentAggregator(['revenue', 'seconds']) for _ in range(3))
+        whole.update(rows)
+        left.update(rows[:1234])
+        right.update(rows[1234:])
+        left.merge(right)
+        np.testing.assert_allclose(left.table().drop(columns='metric'), whole.table().drop(columns='metric'),
+                                   rtol=1e-7)
+        self.assertEqual(left.rows, 5000)
+
+    def test_errors(self):
+        """Missing variants, non-numeric metrics and tiny groups raise ValueError."""
+        with self.assertRaises(ValueError):
+            load_moments(io.StringIO("group,revenue\nA,1\nA,2\n"), ['revenue']).table()
+        with self.assertRaises(ValueError):
+            load_moments(io.StringIO("group,revenue\nA,x\nB,2\n"), ['revenue'])
+        with self.assertRaises(ValueError):
+            load_moments(io.StringIO("group,revenue\nA,1\nB,2\n"), ['clicks'])
+        with self.assertRaises(ValueError):
+            welch_ttest_batch(1, 0.0, 1.0, 10, 0.0, 1.0)
+
+
+class TestWelchBatch(unittest.TestCase):
+
+    def test_broadcasting(self):
+        """Kernel inputs broadcast across metrics and experiments."""
+        result = welch_ttest_batch(100, np.array([[1.0], [2.0]]), 4.0, 120, np.array([1.0, 1.5, 2.0]), 5.0)
+        self.assertEqual(result['p'].shape, (2, 3))
+        self.assertAlmostEqual(result['p'][0, 0], 1.0)
+        self.assertTrue(np.all(result['ci_lower'] < result['lift']))
+
+
+class TestCuped(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 40000
+        group = rng.choice(['A', 'B'], n)
+        pre = rng.gamma(2, 10, n)
+        self.rows = pd.DataFrame({
+            'user_id': np.arange(n),
+            'group': group,
+            'converted': (rng.uniform(size=n) < 0.05 + 0.002 * pre).astype(int),
+            'revenue': 0.8 * pre + rng.normal(0, 5, n) + (group == 'B') * 0.5,
+            'pre_revenue': pre,
+        })
+        self.rows.loc[rng.choice(n, 50, replace=False), 'pre_revenue'] = np.nan
+
+    def test_matches_in_memory_cuped(self):
+        """Streamed CUPED equals the adjustment computed on all rows at once."""
+        buf = io.StringIO(self.rows.to_csv(index=False))
+        cuped = load_cuped(buf, 'pre_revenue', ['converted', 'revenue'], chunksize=3001)
+        result = cuped.ztest('revenue')
+
+        rows = self.rows.dropna()
+        theta = np.cov(rows['pre_revenue'], rows['revenue'])[0, 1] / rows['pre_revenue'].var()
+        adjusted = rows['revenue'] - theta * (rows['pre_revenue'] - rows['pre_revenue'].mean())
+        a, b = adjusted[rows['group'] == 'A'], adjusted[rows['group'] == 'B']
+        se = np.sqrt(a.var() / len(a) + b.var() / len(b))
+
+        self.assertEqual(set(result), {'z', 'p', 'lift', 'ci', 'theta', 'variance_reduction'})
+        self.assertAlmostEqual(result['theta'], theta, places=10)
+        self.assertAlmostEqual(result['lift'], b.mean() - a.mean(), places=10)
+        self.assertAlmostEqual(result['z'], -(b.mean() - a.mean()) / se, places=8)
+        self.assertAlmostEqual(cuped.table()['mean_a'][1], a.mean(), places=10)
+        # corr(pre, revenue)^2 is about 0.84 here
+        self.assertGreater(result['variance_reduction'], 0.8)
+
+    def test_merge_and_zero_covariance(self):
+        """Shards merge exactly, and an unrelated covariate leaves the test unchanged."""
+        whole, left, right = (CupedAggregator(['revenue'], 'pre_revenue') for _ in range(3))
+        whole.update(self.rows)
+        left.update(self.rows[:10000])
+        right.update(self.rows[10000:])
+        left.merge(right)
+        np.testing.assert_allclose(left.table().drop(columns='metric'), whole.table().drop(columns='metric'),
+                                   rtol=1e-9)
+
+        constant = self.rows.assign(pre_revenue=1.0)
+        plain, cuped = MomentAggregator(['revenue']), CupedAggregator(['revenue'], 'pre_revenue')
+        plain.update(constant)
+        cuped.update(constant)
+        self.assertEqual(cuped.ztest()['theta'], 0.0)
+        self.assertAlmostEqual(cuped.ztest()['lift'], plain.table()['mean_b'][0] - plain.table()['mean_a'][0])
+        with self.assertRaises(ValueError):
+            cuped.ztest('clicks')
+
+
+class TestRatioMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n = 30000
+        group = rng.choice(['A', 'B'], n)
+        sessions = rng.poisson(3, n) + 1
+        self.rows = pd.DataFrame({
+            'group': group,
+            'sessions': sessions,
+            'revenue': rng.gamma(1, 2, n) * sessions * (1 + 0.05 * (group == 'B')),
+            'clicks': rng.binomial(sessions * 5, 0.1),
+            'pageviews': sessions * 5,
+        })
+        self.ratios = {'revenue_per_session': ('revenue', 'sessions'), 'ctr': ('clicks', 'pageviews')}
+
+    def test_delta_method_matches_in_memory(self):
+        """Streamed ratios and delta-method variances match the formula on all rows."""
+        buf = io.StringIO(self.rows.to_csv(index=False))
+        result = analyze_moments(load_ratios(buf, self.ratios, chunksize=4000).table(), test='z')
+
+        for i, (numerator, denominator) in enumerate(self.ratios.values()):
+            for group, suffix in (('A', 'a'), ('B', 'b')):
+                rows = self.rows[self.rows['group'] == group]
+                y, x = rows[numerator], rows[denominator]
+                ratio = y.mean() / x.mean()
+                variance = (y.var() - 2 * ratio * np.cov(x, y)[0, 1] + ratio ** 2 * x.var()) / x.mean() ** 2
+                self.assertAlmostEqual(result[f'mean_{suffix}'][i], ratio, places=12)
+                self.assertAlmostEqual(result[f'var_{suffix}'][i], variance, delta=1e-9 * variance)
+        self.assertLess(result['p'][0], 0.01)
+        self.assertIn('z', result.columns)
+
+    def test_merge_and_errors(self):
+        """Shards merge exactly; zero denominators and unknown tests raise ValueError."""
+        whole, left, right = (RatioAggregator(self.ratios) for _ in range(3))
+        whole.update(self.rows)
+        left.update(self.rows[:7000])
+        right.update(self.rows[7000:])
+        left.merge(right)
+        np.testing.assert_allclose(left.table().drop(columns='metric'), whole.table().drop(columns='metric'),
+                                   rtol=1e-9)
+
+        zeros = RatioAggregator({'r': ('clicks', 'none')})
+        zeros.update(self.rows.assign(none=0))
+        with self.assertRaises(ValueError):
+            zeros.table()
+        with self.assertRaises(ValueError):
+            analyze_moments(whole.table(), test='mann-whitney')
+
+    def test_z_kernel_broadcasts(self):
+        """ztest_means_batch agrees with the Welch kernel for large samples."""
+        z = ztest_means_batch(10 ** 6, np.array([1.0, 1.01]), 4.0, 10 ** 6, 1.02, 4.0)
+        t = welch_ttest_batch(10 ** 6, np.array([1.0, 1.01]), 4.0, 10 ** 6, 1.02, 4.0)
+        np.testing.assert_allclose(z['p'], t['p'], rtol=1e-2)
+        np.testing.assert_allclose(z['z'], t['t'])
+
+
+if __name__ == '__main__':
+    unittest.main()
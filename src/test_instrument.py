@@ -0,0 +1,87 @@
+"""
+Unit tests for opt-in instrumentation.
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from abtest import instrument, load_row_level_data, ztest_two_prop
+from abtest.cli import main
+
+
+class TestInstrument(unittest.TestCase):
+    
+    def setUp(self):
+        self.was_enabled = instrument.enabled()
+        instrument.reset()
+    
+    def tearDown(self):
+        (instrument.enable if self.was_enabled else instrument.disable)()
+        instrument.reset()
+    
+    def test_disabled_records_nothing(self):
+        instrument.disable()
+        with instrument.span("read"):
+            pass
+        instrument.count("rows", 10)
+        ztest_two_prop(100, 1000, 120, 1000)
+        self.assertEqual(instrument.snapshot(), {"spans": {}, "counters": {}})
+    
+    def test_loader_spans_and_counters(self):
+        instrument.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rows.csv")
+            with open(path, "w") as f:
+                f.write("user_id,group,converted\n")
+                f.writelines(f"{i},{'AB'[i % 2]},{i % 3 == 0:d}\n" for i in range(100))
+            load_row_level_data(path, chunksize=30)
+        ztest_two_prop(100, 1000, 120, 1000)
+        
+        data = instrument.snapshot()
+        self.assertEqual(data["counters"]["rows_read"], 100)
+        self.assertEqual(data["spans"]["read"]["count"], 5)  # 4 chunks + end of file
+        self.assertEqual(data["spans"]["aggregate"]["count"], 4)
+        self.assertEqual(data["spans"]["test"]["count"], 1)
+        self.assertEqual(data["spans"]["test"]["buckets"]["+Inf"], 1)
+    
+    def test_merge_and_prometheus(self):
+        instrument.enable()
+        instrument.observe("test", 0.002)
+        instrument.count("rows", 5)
+        other = instrument.snapshot()
+        instrument.merge(other)
+        
+        data = instrument.snapshot()
+        self.assertEqual(data["spans"]["test"]["count"], 2)
+        self.assertEqual(data["spans"]["test"]["buckets"]["0.001"], 0)
+        self.assertEqual(data["spans"]["test"]["buckets"]["0.005"], 2)
+        self.assertEqual(data["counters"]["rows"], 10)
+        
+        text = instrument.to_prometheus()
+        self.assertIn('abtest_span_duration_seconds_bucket{span="test",le="0.005"} 2', text)
+        self.assertIn('abtest_span_duration_seconds_count{span="test"} 2', text)
+        self.assertIn('abtest_events_total{name="rows"} 10', text)
+    
+    def test_cli_metrics_out_merges_workers(self):
+        instrument.disable()
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(3):
+                with open(os.path.join(tmp, f"exp{i}.csv"), "w") as f:
+                    f.write("group,success,total\nA,10,100\nB,12,100\n")
+            metrics_path = os.path.join(tmp, "metrics.json")
+            code = main(["batch", tmp, "-o", os.path.join(tmp, "out.csv"), "-j", "2",
+                         "--pattern", "exp*.csv", "--metrics-out", metrics_path])
+            self.assertEqual(code, 0)
+            with open(metrics_path) as f:
+                data = json.load(f)
+        self.assertEqual(data["counters"]["files_loaded"], 3)
+        self.assertEqual(data["spans"]["read"]["count"], 3)
+        self.assertEqual(data["spans"]["test_batch"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
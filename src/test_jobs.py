@@ -0,0 +1,167 @@
+"""
+Unit tests for the Streamlit app's background job runner.
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from jobs import JobRunner
+
+# Job arguments are hashed by pickling, so tests pass event names, not events
+EVENTS = {}
+
+
+def wait_done(job, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.done
+
+
+def add(a, b, progress=None):
+    progress(1, 1)
+    return a + b
+
+
+def report_until_cancelled(started, progress=None):
+    """Reports progress until the progress callback raises JobCancelled."""
+    EVENTS[started].set()
+    for i in range(1000):
+        progress(i, 1000)
+        time.sleep(0.01)
+    return "finished"
+
+
+def block(release, progress=None):
+    EVENTS[release].wait(10)
+    return "released"
+
+
+def fail(progress=None):
+    raise ValueError("bad input")
+
+
+class TestJobRunner(unittest.TestCase):
+
+    def setUp(self):
+        EVENTS.update(started=threading.Event(), release=threading.Event())
+        self.runner = JobRunner(max_workers=1, max_cached=4)
+
+    def tearDown(self):
+        EVENTS['release'].set()
+        self.runner.shutdown()
+
+    def test_cache_hit(self):
+        """Identical inputs return the same job; different inputs start a new one."""
+        job = self.runner.submit(add, 1, b=2)
+        self.assertTrue(wait_done(job))
+        self.assertEqual(job.result, 3)
+        self.assertEqual(job.progress, 1.0)
+        self.assertIs(self.runner.submit(add, 1, b=2), job)
+        self.assertIs(self.runner.lookup(add, 1, b=2), job)
+        self.assertIsNone(self.runner.lookup(add, 1, b=3))
+        self.assertNotEqual(self.runner.submit(add, 1, b=3).key, job.key)
+
+    def test_cancel_running(self):
+        """Cancelling a running job stops it at its next progress report."""
+        started = EVENTS['started']
+        job = self.runner.submit(report_until_cancelled, 'started')
+        self.assertTrue(started.wait(10))
+        job.cancel()
+        self.assertTrue(wait_done(job))
+        self.assertEqual(job.status, "cancelled")
+        self.assertIsNone(job.result)
+
+    def test_cancel_pending(self):
+        """A job still queued behind a busy worker is cancelled without running."""
+        release = EVENTS['release']
+        blocker = self.runner.submit(block, 'release')
+        pending = self.runner.submit(add, 2, b=2)
+        self.assertEqual(pending.status, "pending")
+        pending.cancel()
+        self.assertEqual(pending.status, "cancelled")
+        release.set()
+        self.assertTrue(wait_done(blocker))
+        self.assertEqual(blocker.result, "released")
+        self.assertEqual(pending.status, "cancelled")
+
+    def test_resubmit_replaces_failed_and_cancelled(self):
+        """Failed and cancelled jobs are replaced by a fresh run on resubmit."""
+        failed = self.runner.submit(fail)
+        self.assertTrue(wait_done(failed))
+        self.assertEqual(failed.status, "failed")
+        self.assertIsInstance(failed.error, ValueError)
+        retried = self.runner.submit(fail)
+        self.assertIsNot(retried, failed)
+        self.assertIs(self.runner.lookup(fail), retried)
+
+        started = EVENTS['started']
+        cancelled = self.runner.submit(report_until_cancelled, 'started')
+        self.assertTrue(started.wait(10))
+        cancelled.cancel()
+        self.assertTrue(wait_done(cancelled))
+        started.clear()
+        rerun = self.runner.submit(report_until_cancelled, 'started')
+        self.assertIsNot(rerun, cancelled)
+        self.assertTrue(started.wait(10))
+        self.assertEqual(rerun.status, "running")
+        rerun.cancel()
+
+    def test_evicts_oldest_finished(self):
+        """Beyond max_cached, the least recently used finished jobs are dropped."""
+        jobs = [self.runner.submit(add, i, b=0) for i in range(4)]
+        for job in jobs:
+            self.assertTrue(wait_done(job))
+        self.runner.lookup(add, 0, b=0)
+        self.runner.submit(add, 4, b=0)
+        self.assertIs(self.runner.lookup(add, 0, b=0), jobs[0])
+        self.assertIsNone(self.runner.lookup(add, 1, b=0))
+        self.assertIs(self.runner.lookup(add, 2, b=0), jobs[2])
+
+    def test_lookup_after_eviction(self):
+        """An evicted job looks up as None, and resubmitting runs it afresh."""
+        first = self.runner.submit(add, 0, b=1)
+        self.assertTrue(wait_done(first))
+        for i in range(1, 5):
+            self.assertTrue(wait_done(self.runner.submit(add, i, b=1)))
+        self.assertIsNone(self.runner.lookup(add, 0, b=1))
+        again = self.runner.submit(add, 0, b=1)
+        self.assertIsNot(again, first)
+        self.assertTrue(wait_done(again))
+        self.assertEqual(again.result, 1)
+
+    def test_release_cancels_only_unwatched_jobs(self):
+        """Releasing a shared job cancels it only after its last watcher lets go."""
+        started = EVENTS['started']
+        job = self.runner.submit(report_until_cancelled, 'started')
+        self.runner.watch(job)
+        self.runner.watch(self.runner.submit(report_until_cancelled, 'started'))
+        self.assertEqual(job.watchers, 2)
+        self.assertTrue(started.wait(10))
+        self.runner.release(job)
+        time.sleep(0.05)
+        self.assertEqual(job.status, "running")
+        self.runner.release(job)
+        self.assertTrue(wait_done(job))
+        self.assertEqual(job.status, "cancelled")
+
+        done = self.runner.submit(add, 5, b=5)
+        self.assertTrue(wait_done(done))
+        self.runner.watch(done)
+        self.runner.release(done)
+        self.assertEqual(done.status, "done")
+
+    def test_unfinished_jobs_are_not_evicted(self):
+        """Pending and running jobs stay cached even past max_cached."""
+        release = EVENTS['release']
+        jobs = [self.runner.submit(block, 'release')] + [self.runner.submit(add, i, b=0) for i in range(5)]
+        self.assertTrue(all(self.runner.lookup(add, i, b=0) is jobs[i + 1] for i in range(5)))
+        release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()
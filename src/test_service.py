@@ -0,0 +1,126 @@
+"""
+Unit tests for the local HTTP analysis service.
+"""
+
+import unittest
+import sys
+import os
+import json
+import threading
+import http.client
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from abtest import ztest_two_prop, power
+from abtest.service import AnalysisServer
+
+
+class TestAnalysisService(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = AnalysisServer(("127.0.0.1", 0), workers=4, max_body=10000)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def setUp(self):
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=10)
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def request(self, method, path, body=None, content_type="application/json"):
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        headers = {"Content-Type": content_type} if body is not None else {}
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+    
+    def test_health(self):
+        """GET /health answers ok."""
+        self.assertEqual(self.request("GET", "/health"), (200, {"status": "ok"}))
+    
+    def test_metrics(self):
+        """GET /metrics serves Prometheus text; /metrics.json the snapshot."""
+        self.conn.request("GET", "/metrics")
+        response = self.conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.getheader("Content-Type").startswith("text/plain"))
+        self.assertIn("# TYPE abtest_span_duration_seconds histogram", response.read().decode())
+        status, body = self.request("GET", "/metrics.json")
+        self.assertEqual(status, 200)
+        self.assertEqual(set(body), {"spans", "counters"})
+    
+    def test_ztest_and_power(self):
+        """/ztest and /power match the library functions."""
+        status, body = self.request("POST", "/ztest", {"success_a": 123, "total_a": 5000, "success_b": 155, "total_b": 5000})
+        expected = ztest_two_prop(123, 5000, 155, 5000)
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(body["p"], expected["p"], places=12)
+        self.assertAlmostEqual(body["ci"][0], expected["ci"][0], places=12)
+        
+        status, body = self.request("POST", "/power", {"n_a": 5000, "n_b": 5000, "p_control": 0.0246, "min_detectable_diff": 0.005})
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(body["power"], power(5000, 5000, 0.0246, min_detectable_diff=0.005), places=10)
+    
+    def test_batch_keep_alive(self):
+        """Many comparisons in one request, several requests on one connection."""
+        comparisons = [{"success_a": 100 + i, "total_a": 1000, "success_b": 110 + i, "total_b": 1000} for i in range(50)]
+        for _ in range(3):
+            status, body = self.request("POST", "/batch", {"comparisons": comparisons, "alpha": 0.01})
+            self.assertEqual(status, 200)
+            self.assertEqual(len(body["results"]), 50)
+        expected = ztest_two_prop(149, 1000, 159, 1000, alpha=0.01)
+        self.assertAlmostEqual(body["results"][49]["z"], expected["z"], places=10)
+        self.assertAlmostEqual(body["results"][49]["ci"][1], expected["ci"][1], places=12)
+    
+    def test_load(self):
+        """/load aggregates a CSV body."""
+        status, body = self.request("POST", "/load", "user_id,group,converted\nu1,A,0\nu2,A,1\nu3,B,1\n", "text/csv")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {"success_a": 1, "total_a": 2, "success_b": 1, "total_b": 1})
+    
+    def test_errors(self):
+        """Bad input is a 400, unknown paths a 404, oversized bodies a 413."""
+        status, body = self.request("POST", "/ztest", {"success_a": 150, "total_a": 100, "success_b": 1, "total_b": 100})
+        self.assertEqual(status, 400)
+        self.assertIn("error", body)
+        self.assertEqual(self.request("POST", "/ztest", "not json")[0], 400)
+        self.assertEqual(self.request("POST", "/batch", {"comparisons": [{"success_a": 1}]})[0], 400)
+        self.assertEqual(self.request("POST", "/nope", {})[0], 404)
+        self.assertEqual(self.request("POST", "/load", "x" * 20000, "text/csv")[0], 413)
+    
+    def test_non_integer_counts(self):
+        """/ztest, /power and /batch reject fractional, string and boolean counts alike."""
+        valid = {"success_a": 10, "total_a": 100, "success_b": 12, "total_b": 100}
+        for bad in (1.5, "3", True, None):
+            payload = dict(valid, success_a=bad)
+            status, body = self.request("POST", "/ztest", payload)
+            self.assertEqual(status, 400, bad)
+            self.assertIn("success_a", body["error"])
+            self.assertEqual(self.request("POST", "/batch", {"comparisons": [valid, payload]})[0], 400, bad)
+        self.assertEqual(self.request("POST", "/power", {"n_a": 100.5, "n_b": 100, "p_control": 0.1})[0], 400)
+        self.assertEqual(self.request("POST", "/ztest", dict(valid, total_a=100.0))[0], 200)
+    
+    def test_content_length(self):
+        """Missing, non-integer and negative Content-Length headers are a 400."""
+        for length in (None, "abc", "-5", "1e3", ""):
+            conn = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=10)
+            conn.putrequest("POST", "/ztest")
+            if length is not None:
+                conn.putheader("Content-Length", length)
+            conn.endheaders()
+            response = conn.getresponse()
+            self.assertEqual(response.status, 400, length)
+            self.assertIn("Content-Length", json.loads(response.read())["error"])
+            conn.close()
+        self.assertEqual(self.request("POST", "/ztest", {"success_a": 1, "total_a": 10, "success_b": 2, "total_b": 10})[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Unit tests for HyperLogLog unique-user sketches.
+"""
+
+import unittest
+import sys
+import os
+import io
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from abtest import HyperLogLog, SketchAggregator, load_row_level_data, load_row_level_sketches
+from abtest.dedup import hash_user_ids
+
+
+def user_hashes(prefix, n):
+    return hash_user_ids(np.array([f"{prefix}{i}" for i in range(n)], dtype=object), n_hashes=1)[0]
+
+
+class TestHyperLogLog(unittest.TestCase):
+    
+    def test_estimate_within_error_bounds(self):
+        """Estimates stay within four standard errors across the range."""
+        for precision in (10, 14):
+            for n in (0, 50, 5000, 200000):
+                sketch = HyperLogLog(precision)
+                sketch.add_hashes(user_hashes("u", n))
+                sketch.add_hashes(user_hashes("u", n // 2))  # repeats don't count
+                self.assertLessEqual(abs(sketch.estimate() - n), 4 * sketch.relative_error * n + 1e-9)
+    
+    def test_merge_equals_union(self):
+        """Merging shard sketches gives exactly the sketch of all the data."""
+        hashes = user_hashes("m", 30000)
+        whole, left, right = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+        whole.add_hashes(hashes)
+        left.add_hashes(hashes[:20000])
+        right.add_hashes(hashes[10000:])
+        left.merge(right)
+        np.testing.assert_array_equal(left.registers, whole.registers)
+        self.assertEqual(HyperLogLog.from_bytes(whole.to_bytes()).estimate(), whole.estimate())
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(10))
+    
+    def test_invalid_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(19)
+
+
+class TestSketchAggregator(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        users = rng.integers(0, 40000, 100000)
+        self.rows = pd.DataFrame({
+            'user_id': [f"user{u}" for u in users],
+            'group': np.where(users % 2, 'A', 'B'),
+            'converted': (rng.random(100000) < 0.1).astype(int),
+        })
+    
+    def test_counts_close_to_exact(self):
+        """Unique-user estimates match exact 'any' deduplication within the error bound."""
+        content = self.rows.to_csv(index=False)
+        exact = load_row_level_data(io.StringIO(content), dedup="any")
+        sketches = load_row_level_sketches(io.StringIO(content), precision=14, chunksize=30000)
+        tolerance = 4 * HyperLogLog(14).relative_error
+        for estimate, truth in zip(sketches.counts(), exact):
+            self.assertLessEqual(abs(estimate - truth), tolerance * truth)
+        self.assertEqual(sketches.rows, 100000)
+    
+    def test_shards_merge_and_serialize(self):
+        """Aggregators built on shards merge to the single-pass result, also via bytes."""
+        whole = SketchAggregator(12)
+        whole.update(self.rows)
+        merged = SketchAggregator(12)
+        for shard in np.array_split(np.arange(len(self.rows)), 3):
+            part = SketchAggregator(12)
+            part.update(self.rows.iloc[shard])
+            merged.merge(SketchAggregator.from_bytes(part.to_bytes()))
+        self.assertEqual(merged.counts(), whole.counts())
+        self.assertEqual(merged.rows, whole.rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Unit tests for stratified Cochran-Mantel-Haenszel analysis.
+"""
+
+import unittest
+import sys
+import os
+import io
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from abtest import analyze_stratified, cmh_test_batch, load_stratified, ztest_two_prop
+
+
+def segmented_rows(n=40000, seed=0):
+    """Device base rates differ, and B gets far more mobile traffic than A."""
+    rng = np.random.default_rng(seed)
+    group = rng.choice(['A', 'B'], n)
+    mobile = rng.uniform(size=n) < np.where(group == 'B', 0.8, 0.2)
+    device = np.where(mobile, 'mobile', 'desktop')
+    p = np.where(mobile, 0.02, 0.10) + 0.005 * (group == 'B')
+    return pd.DataFrame({
+        'group': group,
+        'converted': (rng.uniform(size=n) < p).astype(int),
+        'device': device,
+    })
+
+
+class TestCmhBatch(unittest.TestCase):
+
+    def test_matches_statsmodels(self):
+        """The CMH statistic equals statsmodels' StratifiedTable test."""
+        from statsmodels.stats.contingency_tables import StratifiedTable
+
+        rng = np.random.default_rng(1)
+        total_a, total_b = rng.integers(50, 500, 6), rng.integers(50, 500, 6)
+        success_a, success_b = rng.binomial(total_a, 0.1), rng.binomial(total_b, 0.13)
+        result = cmh_test_batch(success_a, total_a, success_b, total_b)
+
+        tables = [np.array([[sa, ta - sa], [sb, tb - sb]])
+                  for sa, ta, sb, tb in zip(success_a, total_a, success_b, total_b)]
+        expected = StratifiedTable(tables).test_null_odds(correction=False)
+        self.assertAlmostEqual(result['cmh'], expected.statistic, places=10)
+        self.assertAlmostEqual(result['p'], expected.pvalue, places=10)
+
+    def test_single_stratum_is_wald(self):
+        """One stratum gives the plain lift and Wald interval."""
+        result = cmh_test_batch([120], [1000], [150], [1000])
+        expected = ztest_two_prop(120, 1000, 150, 1000)
+        self.assertAlmostEqual(result['lift'], expected['lift'], places=12)
+        self.assertAlmostEqual(result['ci_lower'], expected['ci'][0], places=6)
+        self.assertAlmostEqual(result['ci_upper'], expected['ci'][1], places=6)
+        self.assertLess(result['z'], 0)
+
+    def test_errors(self):
+        """Invalid counts and experiments without a comparable stratum raise ValueError."""
+        with self.assertRaises(ValueError):
+            cmh_test_batch([5], [4], [1], [10])
+        with self.assertRaises(ValueError):
+            cmh_test_batch([1, 0], [10, 0], [0, 1], [0, 10])
+        with self.assertRaises(ValueError):
+            analyze_stratified(pd.DataFrame({'device': ['x']}), stratum_col='device')
+
+
+class TestStratifiedAnalysis(unittest.TestCase):
+
+    def test_corrects_simpsons_paradox(self):
+        """Streaming strata recover the within-device lift that pooling hides."""
+        rows = segmented_rows()
+        buf = io.StringIO(rows.to_csv(index=False))
+        strata = load_stratified(buf, 'device', chunksize=3001).table()
+        result = analyze_stratified(strata, stratum_col='device')
+
+        pooled = ztest_two_prop(*result.loc[0, ['success_a', 'total_a', 'success_b', 'total_b']])
+        self.assertLess(pooled['lift'], -0.03)
+        self.assertEqual(result['n_strata'][0], 2)
+        self.assertEqual(result['total_a'][0] + result['total_b'][0], len(rows))
+        self.assertLess(result['ci_lower'][0], 0.005)
+        self.assertGreater(result['ci_upper'][0], 0.005)
+
+    def test_many_experiments_vectorized(self):
+        """Experiments with different strata match separate runs."""
+        tables = []
+        for i, seed in enumerate([2, 3, 4]):
+            table = load_stratified(io.StringIO(segmented_rows(5000, seed).to_csv(index=False)), 'device').table()
+            if i == 2:
+                table = table[table['device'] == 'mobile']
+            tables.append(table.assign(experiment_id=f'exp{i}'))
+        combined = analyze_stratified(pd.concat(tables), stratum_col='device', experiment_col='experiment_id')
+
+        self.assertEqual(list(combined['experiment_id']), ['exp0', 'exp1', 'exp2'])
+        self.assertEqual(list(combined['n_strata']), [2, 2, 1])
+        for i, table in enumerate(tables):
+            alone = analyze_stratified(table, stratum_col='device')
+            for column in ['cmh', 'p', 'lift', 'ci_lower', 'ci_upper']:
+                self.assertAlmostEqual(combined[column][i], alone[column][0], places=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for cumulative lift time series.
+"""
+
+import unittest
+import sys
+import os
+import io
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from abtest import PeriodAggregator, analyze_timeseries, load_timeseries, ztest_two_prop
+
+
+def timestamped_rows(n=20000, days=10, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': np.arange(n),
+        'group': rng.choice(['A', 'B'], n),
+        'converted': (rng.uniform(size=n) < 0.1).astype(int),
+        'timestamp': (pd.Timestamp('2024-05-01') + pd.to_timedelta(rng.uniform(0, days * 86400, n), unit='s'))
+        .astype(str),
+    })
+
+
+class TestTimeseries(unittest.TestCase):
+
+    def test_matches_daily_snapshots(self):
+        """Every cumulative point equals a z-test on all rows up to the end of that day."""
+        rows = timestamped_rows()
+        series = analyze_timeseries(load_timeseries(io.StringIO(rows.to_csv(index=False)), chunksize=3001))
+
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series['period'][0], pd.Timestamp('2024-05-01', tz='UTC'))
+        times = pd.to_datetime(rows['timestamp'], utc=True)
+        for i, period in enumerate(series['period']):
+            upto = rows[times < period + pd.Timedelta(days=1)]
+            a, b = upto[upto['group'] == 'A'], upto[upto['group'] == 'B']
+            expected = ztest_two_prop(a['converted'].sum(), len(a), b['converted'].sum(), len(b))
+            self.assertEqual(series['total_a'][i], len(a))
+            self.assertAlmostEqual(series['z'][i], expected['z'], places=10)
+            self.assertAlmostEqual(series['ci_lower'][i], expected['ci'][0], places=10)
+
+    def test_hourly_bins_and_late_variant(self):
+        """Hourly bins are UTC-aligned, and periods before B starts have NaN statistics."""
+        strings = pd.DataFrame({'group': ['A', 'A'], 'converted': [1, 0],
+                                'timestamp': ['2024-05-01T00:10:00+02:00', '2024-04-30T22:59:59Z']})
+        epoch_seconds = pd.DataFrame({'group': ['B', 'B'], 'converted': [1, 1], 'timestamp': [1714525200, 1714525201]})
+        aggregator = PeriodAggregator('1h')
+        aggregator.update(strings)
+        aggregator.update(epoch_seconds)
+        series = analyze_timeseries(aggregator.table())
+
+        self.assertEqual(list(series['period'].dt.hour), [22, 1])
+        self.assertEqual(list(series['total_a']), [2, 2])
+        self.assertTrue(np.isnan(series['p'][0]))
+        self.assertAlmostEqual(series['lift'][1], 0.5)
+
+    def test_errors(self):
+        """Bad frequencies, timestamps and columns raise ValueError."""
+        for freq in ('soon', '0h', '-1D'):
+            with self.assertRaises(ValueError):
+                PeriodAggregator(freq)
+        with self.assertRaises(ValueError):
+            load_timeseries(io.StringIO("group,converted,timestamp\nA,1,yesterday-ish\n"))
+        with self.assertRaises(ValueError):
+            load_timeseries(io.StringIO("group,converted\nA,1\n"))
+        with self.assertRaises(ValueError):
+            analyze_timeseries(pd.DataFrame({'period': [1], 'success_a': [1]}))
+
+
+if __name__ == '__main__':
+    unittest.main()